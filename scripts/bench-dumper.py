@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare marshmallow and precompiled dumper throughput for model JSON serialization."""
+import datetime as dt
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+import click
+from flask import Flask
+from flask import json
+
+from basingse.attachments import Attachment
+from basingse.attachments import Attachments
+from basingse.auth.models import User
+from basingse.models import Model
+from basingse.models.dumper import Dumper
+
+# Attachments must be mapped before their schema can be built.
+attachments_extension = Attachments(registry=Model.registry)
+
+
+def users(count: int) -> list[User]:
+    now = dt.datetime.now(dt.UTC)
+    items = []
+    for i in range(count):
+        user = User(id=uuid.uuid4(), email=f"user-{i}@example.com", active=bool(i % 2), created=now, updated=now)
+        user.roles = []
+        items.append(user)
+    return items
+
+
+def attachments(count: int) -> list[Attachment]:
+    items = []
+    for i in range(count):
+        attachment = Attachment(filename=f"file-{i}.txt", content_type="text/plain", content_length=i)
+        attachment.id = uuid.uuid4()
+        attachment.digest = uuid.uuid4().hex
+        attachment.digest_algorithm = "sha256"
+        items.append(attachment)
+    return items
+
+
+def measure(label: str, count: int, func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    rate = count / best
+    click.echo(f"  {label:<12} {rate:>12,.0f} objects/s")
+    return rate
+
+
+@click.command()
+@click.option("-n", "--count", default=10_000, help="Number of objects to serialize")
+@click.option("-r", "--repeat", default=5, help="Number of repetitions, the best is reported")
+def main(count: int, repeat: int) -> None:
+    """Benchmark JSON serialization of admin models."""
+    from basingse.attachments.views import AttachmentSchema
+
+    app = Flask(__name__)
+    app.config["ATTACHMENTS_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["ATTACHMENTS_CACHE_DIRECTORY"] = tempfile.mkdtemp()
+    attachments_extension.init_app(app)
+
+    with app.app_context():
+        run(count, repeat, AttachmentSchema)
+
+
+def run(count: int, repeat: int, attachment_schema: Any) -> None:
+    for name, items, schema in [
+        ("User", users(count), User.__schema__()(many=True)),
+        ("Attachment", attachments(count), attachment_schema(many=True)),
+    ]:
+        dumper = Dumper(schema)
+        click.echo(f"{name} ({dumper!r})")
+        baseline = measure("marshmallow", count, lambda: json.dumps(schema.dump(items)), repeat)
+        compiled = measure("compiled", count, lambda: dumper.dumps_many(items), repeat)
+        click.echo(f"  speedup      {compiled / baseline:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
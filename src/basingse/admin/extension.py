@@ -1,4 +1,5 @@
 import contextlib
+import enum
 import os.path
 import re
 from collections.abc import Callable
@@ -25,6 +26,7 @@ from flask import Flask
 from flask import jsonify
 from flask import render_template
 from flask import request
+from flask import stream_with_context
 from flask import url_for
 from flask.cli import with_appcontext
 from flask.typing import ResponseReturnValue as IntoResponse
@@ -34,6 +36,7 @@ from jinja2 import FileSystemLoader
 from jinja2 import Template
 from marshmallow import ValidationError
 from sqlalchemy import delete
+from sqlalchemy import Select
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
@@ -48,6 +51,8 @@ from basingse.auth.permissions import check_permissions
 from basingse.auth.permissions import require_permission
 from basingse.auth.utils import redirect_next
 from basingse.models import Model as ModelBase
+from basingse.models.dumper import Dumper
+from basingse.models.dumper import json_dumps
 from basingse.models.schema import Schema
 from basingse.svcs import get
 
@@ -62,6 +67,10 @@ on_new = signal("new")
 on_update = signal("update")
 on_delete = signal("delete")
 
+#: Sent once for each bulk request, with the ``ids`` of every item, rather than once per item
+on_bulk_update = signal("bulk-update")
+on_bulk_delete = signal("bulk-delete")
+
 
 @attrs.define
 class NoItemFound(Exception):
@@ -93,7 +102,7 @@ def format_error_dictionary(errors: dict[str, str]) -> str:
 def handle_notfound(exc: NoItemFound) -> IntoResponse:
     if request_accepts_json():
         return jsonify(error=str(exc)), 404
-    return render_template(["admin/404.html", "admin/not_found.html"], error=exc), 404
+    return render_template(select_template(["admin/404.html", "admin/not_found.html"]), error=exc), 404
 
 
 def handle_validation(exc: ValidationError) -> IntoResponse:
@@ -103,13 +112,14 @@ def handle_validation(exc: ValidationError) -> IntoResponse:
             return jsonify(errors=exc.messages, error=format_error_dictionary(exc.messages)), 400
         return jsonify(error=str(exc)), 400
 
-    return render_template(["admin/validation_error.html", "admin/400.html", "admin/bad_request.html"], error=exc), 400
+    template = select_template(["admin/validation_error.html", "admin/400.html", "admin/bad_request.html"])
+    return render_template(template, error=exc), 400
 
 
 def handle_integrity(exc: IntegrityError) -> IntoResponse:
     if request_accepts_json():
         return jsonify(error=str(exc)), 400
-    return render_template(["admin/400.html", "admin/bad_request.html"], error=exc), 400
+    return render_template(select_template(["admin/400.html", "admin/bad_request.html"]), error=exc), 400
 
 
 def handle_form_validation(exc: FormValidationError) -> IntoResponse:
@@ -128,7 +138,7 @@ def handle_http_exception(exc: HTTPException) -> IntoResponse:
 
     if request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json":
         return jsonify(error=str(exc)), getattr(exc, "code", 400)
-    return render_template(["admin/400.html", "admin/bad_request.html"], error=exc), exc.code or 400
+    return render_template(select_template(["admin/400.html", "admin/bad_request.html"]), error=exc), exc.code or 400
 
 
 @contextlib.contextmanager
@@ -222,10 +232,71 @@ class ViewKey:
         return f"<{self.argtype}:{self.name}>"
 
 
+_SchemaKey = tuple["type[AdminView]", bool, tuple[str, ...] | None, tuple[str, ...]]
+_schemas: dict[_SchemaKey, Schema] = {}
+_dumpers: dict["type[AdminView]", Dumper] = {}
+
+
+def _pooled_schema(
+    view: "type[AdminView]",
+    many: bool,
+    only: tuple[str, ...] | None,
+    exclude: tuple[str, ...],
+) -> Schema:
+    key = (view, many, only, exclude)
+    if (schema := _schemas.get(key)) is None:
+        schema = _schemas.setdefault(key, view.schema(many=many, only=only, exclude=exclude))
+    return schema
+
+
+def _pooled_dumper(view: "type[AdminView]") -> Dumper:
+    if (dumper := _dumpers.get(view)) is None:
+        dumper = _dumpers.setdefault(view, Dumper(view.cached_schema()))
+    return dumper
+
+
+def select_template(names: Sequence[str | Template]) -> Template:
+    """Select the first template which exists from a list of candidates, caching the choice.
+
+    Resolving a list of candidates probes every loader for every missing name, so the
+    resolved template is cached per application. When the jinja environment is set to
+    ``auto_reload``, a cached template is resolved again once its source changes.
+    """
+    if any(isinstance(name, Template) for name in names):
+        return current_app.jinja_env.select_template(names)
+
+    cache: dict[tuple[str, ...], Template] = current_app.extensions.setdefault("basingse.admin.templates", {})
+    key = cast(tuple[str, ...], tuple(names))
+    template = cache.get(key)
+    if template is None or (current_app.jinja_env.auto_reload and not template.is_up_to_date):
+        template = cache[key] = current_app.jinja_env.select_template(key)
+    return template
+
+
 def request_accepts_json() -> bool:
     return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
 
 
+class StreamFormat(enum.Enum):
+    """Formats supported for streaming list responses"""
+
+    #: Newline delimited JSON, one object per line
+    NDJSON = "application/x-ndjson"
+
+    #: A single JSON document, ``{"data": [...]}``, sent in chunks
+    JSON = "application/json"
+
+
+def request_stream_format() -> StreamFormat | None:
+    """Determine whether the client asked for a streamed list response"""
+    best = request.accept_mimetypes.best_match(["text/html", "application/json", StreamFormat.NDJSON.value])
+    if best == StreamFormat.NDJSON.value:
+        return StreamFormat.NDJSON
+    if best == "application/json" and request.args.get("stream", "").lower() in {"1", "true", "yes"}:
+        return StreamFormat.JSON
+    return None
+
+
 def _get_model_attributes(parameters: Mapping[str, Any], model: type[ModelBase]) -> Iterator[tuple[str, Any]]:
     for key, value in parameters.items():
         if key in model.__mapper__.attrs:
@@ -273,6 +344,15 @@ class AdminView(View, Generic[M, I]):
     #: The registered actions for this view
     actions: dict[str, Callable[..., IntoResponse]]
 
+    #: Whether to render JSON responses with a precompiled dumper instead of marshmallow
+    compiled_json: ClassVar[bool] = False
+
+    #: Number of rows fetched from the database, and sent to the client, at a time when streaming
+    stream_chunk_size: ClassVar[int] = 500
+
+    #: Number of items resolved by a single ``IN`` query, and committed together, by bulk actions
+    bulk_chunk_size: ClassVar[int] = 500
+
     @property
     def logger(self) -> structlog.stdlib.BoundLogger:
         return structlog.get_logger(model=self.name)
@@ -295,6 +375,31 @@ class AdminView(View, Generic[M, I]):
     def schema(cls, **options: Any) -> Schema:
         return cls.model.__schema__()(**options)
 
+    @classmethod
+    def cached_schema(
+        cls,
+        *,
+        many: bool = False,
+        only: Iterable[str] | None = None,
+        exclude: Iterable[str] = (),
+    ) -> Schema:
+        """A shared schema instance for this view and set of options.
+
+        Schemas returned here are shared between requests and threads, so they must not
+        be constructed with an ORM instance. Pass ``instance=`` to :meth:`Schema.load` instead.
+        """
+        return _pooled_schema(
+            cls,
+            many,
+            tuple(only) if only is not None else None,
+            tuple(exclude),
+        )
+
+    @classmethod
+    def dumper(cls) -> Dumper:
+        """A shared, precompiled JSON dumper for this view's schema"""
+        return _pooled_dumper(cls)
+
     @classmethod
     def table(cls) -> Table:
         return cls.model.__listview__()()
@@ -340,14 +445,29 @@ class AdminView(View, Generic[M, I]):
 
         return method(self, **kwargs)
 
+    def select(self) -> Select:
+        """The statement used to list items for this view"""
+        return select(self.model).order_by(self.model.created)
+
     def query(self) -> Iterable[M]:
         filters = _get_model_attrs_from_request(self.model)
         log.debug(f"query multiple {self.name}", filters=filters)
 
         session = get(Session)
-        results = session.execute(select(self.model).order_by(self.model.created)).scalars()
+        results = session.execute(self.select()).scalars()
         return cast(Iterable[M], results)
 
+    def stream(self) -> Iterator[M]:
+        """Iterate over the items for this view, fetching rows from the database in chunks"""
+        if type(self).query is not AdminView.query:
+            # A custom query can't be re-issued with yield_per, so we just iterate over it.
+            yield from self.query()
+            return
+
+        session = get(Session)
+        statement = self.select().execution_options(yield_per=self.stream_chunk_size)
+        yield from session.execute(statement).scalars()
+
     def single(self, id: I) -> M:
         assert request.view_args is not None, f"Processing unknown view, expected endpoint in {self.bp}"
         filters = _get_model_attrs_from_request(self.model)
@@ -358,6 +478,51 @@ class AdminView(View, Generic[M, I]):
             raise NoItemFound(self.model, filters)
         return single
 
+    def _bulk_ids(self) -> list[I]:
+        if request.is_json:
+            data = request.json
+            ids = data.get("ids") if isinstance(data, dict) else data
+        else:
+            ids = request.form.getlist("ids") or request.args.getlist("ids")
+
+        if not isinstance(ids, list) or not ids:
+            raise BadRequest("No ids provided")
+
+        converter = current_app.url_map.converters[self._bss_key.argtype](current_app.url_map)
+        try:
+            return list(dict.fromkeys(converter.to_python(str(id)) for id in ids))
+        except ValueError as exc:
+            raise BadRequest(f"Invalid id: {exc}") from exc
+
+    def many(self, ids: Sequence[I]) -> Iterator[list[M]]:
+        """Resolve items by id, yielding chunks of at most :attr:`bulk_chunk_size` items
+
+        Each chunk is resolved with a single ``IN`` query. All ids must exist, and they are all
+        checked before the first chunk is yielded, so callers can commit each chunk as it arrives.
+        """
+        filters = _get_model_attrs_from_request(self.model)
+        column = getattr(self.model, self._bss_key.name)
+        session = get(Session)
+
+        found: set[I] = set()
+        for start in range(0, len(ids), self.bulk_chunk_size):
+            chunk = ids[start : start + self.bulk_chunk_size]
+            found.update(session.scalars(select(column).filter_by(**filters).where(column.in_(chunk))))
+        if missing := [id for id in ids if id not in found]:
+            raise NoItemFound(self.model, {**filters, self._bss_key.name: missing})
+
+        for start in range(0, len(ids), self.bulk_chunk_size):
+            chunk = ids[start : start + self.bulk_chunk_size]
+            log.debug(f"query many {self.name}", filters=filters, count=len(chunk))
+            items = {
+                getattr(item, self._bss_key.name): item
+                for item in session.scalars(select(self.model).filter_by(**filters).where(column.in_(chunk)))
+            }
+            if missing := [id for id in chunk if id not in items]:
+                # Removed since the ids were checked.
+                raise NoItemFound(self.model, {**filters, self._bss_key.name: missing})
+            yield [items[id] for id in chunk]
+
     def blank(self, **kwargs: Any) -> M:
         assert request.view_args is not None, f"Processing unknown view, expected endpoint in {self.bp}"
         attrs = _get_model_attrs_from_request(self.model)
@@ -366,10 +531,53 @@ class AdminView(View, Generic[M, I]):
 
     def render_json(self, item: M | Iterable[M]) -> IntoResponse:
         log.debug(f"Rendering JSON for {self.name}", item=item)
+        if self.compiled_json:
+            dumper = self.dumper()
+            if isinstance(item, self.model):
+                body = dumper.dumps(item)
+            else:
+                body = json_dumps({"data": dumper.dump_many(cast(Iterable[M], item))})
+            return current_app.response_class(body, mimetype="application/json")
+
         if isinstance(item, self.model):
-            return jsonify(self.schema().dump(item))
+            return jsonify(self.cached_schema().dump(item))
+        else:
+            return jsonify(data=self.cached_schema(many=True).dump(item))
+
+    def _dump_json(self, item: M) -> Any:
+        if self.compiled_json:
+            return self.dumper().dump(item)
+        return self.cached_schema().dump(item)
+
+    def _stream_chunks(self, items: Iterable[M], format: StreamFormat) -> Iterator[bytes]:
+        if format == StreamFormat.JSON:
+            separator, opening, closing = b",", b'{"data":[', b"]}"
         else:
-            return jsonify(data=self.schema(many=True).dump(item))
+            separator, opening, closing = b"", b"", b""
+
+        buffer = [opening]
+        first = True
+        for count, item in enumerate(items, start=1):
+            row = json_dumps(self._dump_json(item))
+            if format == StreamFormat.NDJSON:
+                row += b"\n"
+            elif not first:
+                row = separator + row
+            first = False
+            buffer.append(row)
+
+            if count % self.stream_chunk_size == 0:
+                yield b"".join(buffer)
+                buffer.clear()
+
+        buffer.append(closing)
+        yield b"".join(buffer)
+
+    def render_stream(self, format: StreamFormat) -> IntoResponse:
+        """Stream the list of items as JSON, without buffering the full response"""
+        log.debug(f"Streaming {format.name} for {self.name}")
+        chunks = stream_with_context(self._stream_chunks(self.stream(), format))
+        return current_app.response_class(chunks, mimetype=format.value)
 
     def render_template(
         self,
@@ -392,7 +600,7 @@ class AdminView(View, Generic[M, I]):
         else:
             context["items"] = context[self.model.__tablename__] = item
 
-        return render_template(template_files, **context)
+        return render_template(select_template(template_files), **context)
 
     def render(
         self,
@@ -410,8 +618,7 @@ class AdminView(View, Generic[M, I]):
             data: dict[str, Any] | list[Any] | None = request.json
             if not isinstance(data, dict):
                 raise BadRequest("No JSON data provided")
-            schema = self.schema(instance=obj)
-            obj = schema.load(data)  # pyright: ignore
+            obj = self.cached_schema().load(data, instance=obj)  # pyright: ignore
             return obj
         else:
             form = self.form(obj=obj)
@@ -492,7 +699,7 @@ class AdminView(View, Generic[M, I]):
 
     def redirect(self, endpoint: str, *, item: M) -> IntoResponse:
         if request_accepts_json():
-            return jsonify(self.schema().dump(item))
+            return jsonify(self.cached_schema().dump(item))
         return redirect_next(endpoint)
 
     @action(permission="view", url="/<key>/preview/", methods=["GET"])
@@ -513,6 +720,9 @@ class AdminView(View, Generic[M, I]):
 
     @action(name="list", permission="view", url="/list/", methods=["GET"])
     def listview(self) -> IntoResponse:
+        if (format := request_stream_format()) is not None:
+            return self.render_stream(format)
+
         objects = self.query()
 
         return self.render("list", item=objects, context={"table": self.table()})
@@ -535,6 +745,50 @@ class AdminView(View, Generic[M, I]):
             return "", 204
         return redirect_next(".list")
 
+    @action(name="bulk-delete", permission="delete", methods=["POST", "DELETE"], url="/bulk/delete/")
+    def bulk_delete(self) -> IntoResponse:
+        ids = self._bulk_ids()
+        log.debug(f"deleting {len(ids)} {self.name}s")
+
+        session = get(Session)
+        for chunk in self.many(ids):
+            for obj in chunk:
+                session.delete(obj)
+            session.commit()
+        on_bulk_delete.send(self.__class__, ids=ids)
+
+        if request_accepts_json():
+            return jsonify({"success": True, "ids": ids}), 200
+
+        if request.method == "DELETE":
+            return "", 204
+        return redirect_next(".list")
+
+    @action(name="bulk-update", permission="edit", methods=["POST", "PATCH"], url="/bulk/update/")
+    def bulk_update(self) -> IntoResponse:
+        data = request.json if request.is_json else None
+        if not isinstance(data, dict) or not isinstance(patch := data.get("patch"), dict):
+            raise BadRequest("No JSON patch provided")
+        if self._bss_key.name in patch:
+            raise BadRequest(f"Bulk updates can't change {self._bss_key.name!r}")
+
+        ids = self._bulk_ids()
+        log.debug(f"updating {len(ids)} {self.name}s", patch=patch)
+
+        # Validate up front, so that a bad patch doesn't leave earlier chunks committed.
+        schema = self.cached_schema()
+        if errors := schema.validate(patch, partial=True):
+            raise ValidationError(errors)
+
+        session = get(Session)
+        for chunk in self.many(ids):
+            for obj in chunk:
+                session.add(schema.load(patch, instance=obj, partial=True))
+            session.commit()
+        on_bulk_update.send(self.__class__, ids=ids)
+
+        return jsonify({"success": True, "ids": ids}), 200
+
     @classmethod
     def _parent_redirect_to(cls, action: str, **kwargs: Any) -> IntoResponse:
         if request_accepts_json():
@@ -647,9 +901,9 @@ class AdminView(View, Generic[M, I]):
             items = data
 
         if isinstance(items, list):
-            schema = cls.schema(many=True)
+            schema = cls.cached_schema(many=True)
             return schema.load(items)  # pyright: ignore
-        schema = cls.schema()
+        schema = cls.cached_schema()
         return [schema.load(items)]  # pyright: ignore
 
     @classmethod
@@ -685,7 +939,7 @@ class AdminView(View, Generic[M, I]):
         session = get(Session)
 
         items = session.scalars(select(cls.model)).all()
-        schema = cls.schema(many=True)
+        schema = cls.cached_schema(many=True)
         return schema.dump(items)  # pyright: ignore
 
     @classmethod
@@ -711,6 +965,12 @@ class AdminView(View, Generic[M, I]):
 
 
 class AdminBlueprint(Blueprint):
+    """Blueprint which also finds templates in the ``admin`` blueprint's template folder"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._loaders: dict[tuple[str, ...], FileSystemLoader] = {}
+
     @property
     def jinja_loader(self) -> FileSystemLoader | None:  # type: ignore[override]
         searchpath = []
@@ -722,4 +982,9 @@ class AdminBlueprint(Blueprint):
             admin_template_folder = os.path.join(admin.root_path, admin.template_folder)  # type: ignore[arg-type]
             searchpath.append(admin_template_folder)
 
-        return FileSystemLoader(searchpath)
+        # The search path only depends on which admin blueprint is registered, so loaders
+        # (and the templates jinja caches against them) are reused across requests.
+        key = tuple(searchpath)
+        if (loader := self._loaders.get(key)) is None:
+            loader = self._loaders[key] = FileSystemLoader(searchpath)
+        return loader
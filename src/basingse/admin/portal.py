@@ -1,3 +1,4 @@
+from collections.abc import Hashable
 from typing import Any
 from typing import IO
 from typing import TYPE_CHECKING
@@ -19,6 +20,7 @@ from bootlace.util import MaybeTaggable
 from bootlace.util import render
 from flask import Blueprint
 from flask import current_app
+from flask import request
 from flask.cli import with_appcontext
 from flask_login import current_user
 from jinja2 import Template
@@ -28,6 +30,8 @@ from wtforms import FileField
 from wtforms import Form
 
 from basingse import svcs
+from basingse.auth.permissions import permission_fingerprint
+from basingse.auth.permissions import permissions_exempt
 from basingse.htmx import HtmxProperties
 from basingse.models import Session
 
@@ -37,6 +41,9 @@ if TYPE_CHECKING:
 
 logger = structlog.get_logger()
 
+#: Maximum number of rendered navigation menus cached per portal and application
+NAV_CACHE_SIZE = 256
+
 
 @attrs.define
 class PortalDropdown(Dropdown):
@@ -167,9 +174,37 @@ class Portal(Blueprint):
         ul.classes.add("flex-column", "mb-auto")
         return render(ul)
 
+    def _nav_cache_key(self) -> Hashable | None:
+        # Every item is enabled when permission checks are skipped, whatever the user's permissions.
+        if permissions_exempt() or (fingerprint := permission_fingerprint()) is None:
+            return None
+
+        # The rendered nav records the current endpoint, and items which aren't tied to a blueprint
+        # are only active for a single endpoint, so the endpoint must be part of the key too.
+        return (
+            fingerprint,
+            request.blueprint,
+            request.endpoint,
+            request.host,
+            request.script_root,
+            len(self.sidebar),
+        )
+
+    def _cached_nav(self) -> Markup:
+        """Render the navigation menu, cached by the user's permissions and the active blueprint"""
+        if not current_app.config.get("BASINGSE_ADMIN_NAV_CACHE", True) or (key := self._nav_cache_key()) is None:
+            return self._render_nav()
+
+        cache: dict[Hashable, Markup] = current_app.extensions.setdefault(f"basingse.portal.{self.name}.nav", {})
+        if (nav := cache.get(key)) is None:
+            if len(cache) >= NAV_CACHE_SIZE:
+                cache.clear()
+            nav = cache[key] = self._render_nav()
+        return nav
+
     def context(self) -> dict[str, Any]:
         return {
-            "nav": self._render_nav(),
+            "nav": self._cached_nav(),
             "hx": HtmxProperties,
             "base_template": base_template(),
             "form_encoding": get_form_encoding,
@@ -204,11 +239,11 @@ def import_all(ctx: click.Context, filename: list[IO[str]], clear: bool) -> None
 
         logger.info(f"Importing {cls.name}", model=cls.name, count=len(items))
         if isinstance(items, list):
-            schema = cls.schema(many=True)
+            schema = cls.cached_schema(many=True)
             for item in schema.load(items):
                 session.add(item)
         else:
-            schema = cls.schema()
+            schema = cls.cached_schema()
             session.add(schema.load(items))
         session.flush()
 
@@ -230,7 +265,7 @@ def export_all(ctx: click.Context, filename: IO[str]) -> None:
     for cls in portal.admins:
         logger.info(f"Exporting {cls.name}", model=cls.name)
         items = session.scalars(select(cls.model)).all()
-        schema = cls.schema(many=True)
+        schema = cls.cached_schema(many=True)
         data[cls.name] = schema.dump(items)
 
     yaml.safe_dump(data, filename)
@@ -24,6 +24,7 @@ from markupsafe import Markup
 from werkzeug.exceptions import NotFound
 
 from . import svcs
+from .sendfile import offload
 
 
 class AssetLogger(structlog.BoundLogger):
@@ -245,6 +246,10 @@ class AssetManifest(Mapping[str, Asset]):
             logger.debug("Asset not found at location", filename=filename, location=self.location)
             raise FileNotFoundError(filename)
 
+        # Assets installed as regular files can be sent by the web server.
+        if isinstance(asset, Path) and (response := offload(asset, download_name=asset.name)) is not None:
+            return response
+
         return send_file(
             cast(BinaryIO, asset.open("rb")),
             download_name=asset.name,
@@ -12,6 +12,8 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 from wtforms.form import Form
 
+from .dedup import detach
+from .dedup import release
 from basingse import svcs
 from basingse.admin.extension import action
 from basingse.admin.extension import AdminView
@@ -69,7 +71,7 @@ class AttachmentAdmin(AdminView[M, I]):
         obj = self.single(id=id)
         attachment = session.scalar(select(Attachment).where(Attachment.id == attachment_id))
         if attachment is not None:
-            session.delete(attachment)
+            release(session, attachment, detach(obj, attachment))
             session.commit()
             session.refresh(obj)
         if request.method == "DELETE":
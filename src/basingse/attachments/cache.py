@@ -0,0 +1,194 @@
+"""A size-bounded, least-recently-used cache of attachment contents on disk.
+
+Attachments are stored compressed in the database, and served from uncompressed copies in
+``ATTACHMENTS_CACHE_DIRECTORY``. :class:`AttachmentCache` keeps that directory below
+``ATTACHMENTS_CACHE_SIZE_MAX`` bytes by evicting the least recently used files whenever a new file
+is written. A file's modification time records when it was last used.
+
+This is the flask-attachments cache, not a second one: :class:`AttachmentCache` extends
+:class:`flask_attachments.services.AttachmentCache`, using the same directory and file names, and
+the ``warm`` and ``prune`` commands in ``flask attach`` are replaced with ones which use it.
+
+Files are written to a temporary file in the cache directory and then renamed into place, so
+a partially written file is never served. Hits, misses and evictions are counted in
+:class:`CacheStats`, and as OpenTelemetry metrics.
+"""
+
+import contextlib
+import dataclasses as dc
+import datetime as dt
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO
+
+import structlog
+from flask import current_app
+from flask import Flask
+from flask_attachments import Attachment
+from flask_attachments.extension import AttachmentSettings
+from flask_attachments.services import AttachmentCache as BaseAttachmentCache
+from opentelemetry import metrics
+
+log = structlog.get_logger(__name__)
+meter = metrics.get_meter(__name__)
+
+_CACHE_STATS_KEY = "basingse.attachments.cache"
+
+#: Prefix for files which are being written, and aren't yet part of the cache
+TEMPORARY_PREFIX = ".tmp-"
+
+_counters = {
+    "hits": meter.create_counter("attachments.cache.hits", description="Attachments served from the disk cache"),
+    "misses": meter.create_counter("attachments.cache.misses", description="Attachments written to the disk cache"),
+    "evictions": meter.create_counter("attachments.cache.evictions", description="Files evicted from the disk cache"),
+    "evicted_bytes": meter.create_counter("attachments.cache.evicted", unit="By", description="Bytes evicted"),
+}
+
+
+@dc.dataclass
+class CacheStats:
+    """Counters for the attachment cache in this process"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+
+    #: Estimated size of the cache in bytes, ``None`` until the directory has been scanned
+    size: int | None = None
+
+    _lock: threading.Lock = dc.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+        _counters[name].add(amount)
+
+    def resize(self, delta: int) -> int | None:
+        """Adjust the estimated size, returning the new estimate"""
+        with self._lock:
+            if self.size is not None:
+                self.size += delta
+            return self.size
+
+    def measured(self, size: int) -> None:
+        with self._lock:
+            self.size = size
+
+
+def get_stats(app: Flask | None = None) -> CacheStats:
+    if app is None:
+        app = current_app
+    return app.extensions.setdefault(_CACHE_STATS_KEY, CacheStats())
+
+
+class AttachmentCache(BaseAttachmentCache):
+    """The flask-attachments on-disk cache, with LRU eviction"""
+
+    def __init__(self, settings: AttachmentSettings | None = None, stats: CacheStats | None = None) -> None:
+        super().__init__(settings)
+        self.stats = get_stats() if stats is None else stats
+
+    @property
+    def directory(self) -> Path:
+        return self.settings.cache_directory()
+
+    def paths(self) -> Iterator[Path]:
+        return (path for path in super().paths() if not path.name.startswith(TEMPORARY_PREFIX))
+
+    def lookup(self, attachment: Attachment) -> Path:
+        """The cached file for an attachment, writing it to the cache if necessary"""
+        path = attachment.cached_filepath
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats.record("misses")
+            self.write(attachment)
+        else:
+            self.stats.record("hits")
+        return path
+
+    def write(self, attachment: Attachment) -> None:
+        """Decompress an attachment into the cache"""
+        with self.spool() as file:
+            with contextlib.closing(attachment.compression.read(io.BytesIO(attachment.contents))) as contents:
+                shutil.copyfileobj(contents, file)
+        self.commit(Path(file.name), attachment.cached_filepath)
+
+        attachment._empty_cache("cached_at")
+        attachment._empty_cache("size")
+
+    @contextlib.contextmanager
+    def spool(self) -> Iterator[IO[bytes]]:
+        """A temporary file in the cache directory, to be moved into place with :meth:`commit`"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix=TEMPORARY_PREFIX, delete=False) as file:
+            try:
+                yield file
+            except BaseException:
+                os.unlink(file.name)
+                raise
+
+    def commit(self, spooled: Path, path: Path) -> None:
+        """Atomically move a spooled file into the cache, then evict files if the cache is too large"""
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+
+        os.replace(spooled, path)
+        size = self.stats.resize(path.stat().st_size - replaced)
+        if size is None or size > self.settings.cache_size():
+            self.evict(keep=path)
+
+    def evict(self, keep: Path | None = None) -> int:
+        """Remove the least recently used files until the cache fits, returning the number removed"""
+        entries = []
+        for path in self.paths():
+            with contextlib.suppress(FileNotFoundError):
+                entries.append((path, path.stat()))
+
+        size = sum(stat.st_size for _, stat in entries)
+        limit = self.settings.cache_size()
+        evicted = 0
+
+        for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+            if size <= limit:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+            evicted += 1
+            self.stats.record("evictions")
+            self.stats.record("evicted_bytes", stat.st_size)
+
+        self.stats.measured(size)
+
+        if evicted:
+            log.info("Evicted attachments from the cache", evicted=evicted, size=size, limit=limit)
+        return evicted
+
+    def expire(self) -> int:
+        """Remove files which haven't been used within the cache age, including abandoned temporary files"""
+        cutoff = (dt.datetime.now() - self.settings.cache_age()).timestamp()
+        expired = 0
+        for path in super().paths():
+            with contextlib.suppress(FileNotFoundError):
+                stat = path.stat()
+                if stat.st_mtime < cutoff:
+                    path.unlink()
+                    expired += 1
+                    if not path.name.startswith(TEMPORARY_PREFIX):
+                        self.stats.resize(-stat.st_size)
+        return expired
+
+    def prune(self) -> None:
+        """Remove expired files, then evict files until the cache fits"""
+        self.expire()
+        self.evict()
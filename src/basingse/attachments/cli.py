@@ -0,0 +1,67 @@
+import datetime as dt
+
+import click
+import humanize
+import structlog
+from flask_attachments import Attachment
+from flask_attachments.cli import group
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .cache import AttachmentCache
+from basingse import svcs
+
+log = structlog.get_logger(__name__)
+
+# These commands extend the ``flask attach`` group from flask-attachments. ``warm`` and ``prune`` replace
+# the upstream commands of the same name, so that they respect the cache's size limit.
+
+
+def describe(cache: AttachmentCache) -> str:
+    limit = cache.settings.cache_size()
+    return f"The cache is now {humanize.naturalsize(cache.size())} of {humanize.naturalsize(limit)}"
+
+
+@group.command()
+@click.option("-C", "--content-type", default=None, help="Only warm attachments with this content type")
+def warm(content_type: str | None) -> None:
+    """Write attachments to the cache, most recently updated first"""
+    session = svcs.get(Session)
+    cache = AttachmentCache()
+
+    query = select(Attachment).order_by(Attachment.updated.desc())
+    if content_type:
+        query = query.where(Attachment.content_type == content_type)
+
+    warmed = 0
+    for attachment in session.scalars(query):
+        if not attachment.cached_filepath.exists():
+            cache.write(attachment)
+            warmed += 1
+        # Release the contents as we go
+        session.expunge(attachment)
+
+    click.echo(f"Warmed {warmed} attachments. {describe(cache)}")
+
+
+@group.command()
+def prune() -> None:
+    """Remove expired files, and evict the least recently used files until the cache fits"""
+    cache = AttachmentCache()
+    expired = cache.expire()
+    evicted = cache.evict()
+    click.echo(f"Expired {expired} and evicted {evicted} files. {describe(cache)}")
+
+
+@group.command()
+def stats() -> None:
+    """Show the size and contents of the cache"""
+    cache = AttachmentCache()
+    used = sorted(path.stat().st_mtime for path in cache.paths())
+
+    click.echo(f"Directory: {cache.directory}")
+    click.echo(f"Files: {len(used)}")
+    click.echo(f"Size: {humanize.naturalsize(cache.size())} of {humanize.naturalsize(cache.settings.cache_size())}")
+    if used:
+        click.echo(f"Least recently used: {humanize.naturaltime(dt.datetime.fromtimestamp(used[0]))}")
+        click.echo(f"Most recently used: {humanize.naturaltime(dt.datetime.fromtimestamp(used[-1]))}")
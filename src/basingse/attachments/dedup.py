@@ -0,0 +1,113 @@
+"""Content-addressed deduplication of attachments.
+
+Uploads are matched to existing attachments by digest, filename and content type, so identical files
+share a single stored attachment. A file uploaded again under another name or type is stored again, so
+that it is downloaded with the name and type it was uploaded with. Because a shared attachment may be used in several places, removing it from one place
+should :func:`detach` it and then :func:`release` it, which only deletes the attachment once
+nothing else refers to it.
+
+References are counted through every relationship to :class:`Attachment` in the model registry.
+References which are not relationships (e.g. attachment URLs stored in page contents) can be counted
+by registering a function with :func:`reference_counter`.
+"""
+
+from collections.abc import Callable
+from collections.abc import Iterator
+from typing import Any
+from uuid import UUID
+
+import structlog
+from flask_attachments import Attachment
+from sqlalchemy import ColumnElement
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.orm import RelationshipDirection
+from sqlalchemy.orm import Session
+
+from basingse.models import Model
+
+log = structlog.get_logger(__name__)
+
+#: Counts references to an attachment id which aren't relationships
+ReferenceCounter = Callable[[Session, UUID], int]
+
+_REFERENCE_COUNTERS: list[ReferenceCounter] = []
+
+
+def reference_counter(counter: ReferenceCounter) -> ReferenceCounter:
+    """Register a function which counts references to an attachment"""
+    _REFERENCE_COUNTERS.append(counter)
+    return counter
+
+
+def _attachment_columns() -> Iterator[tuple[type[Any], ColumnElement[Any]]]:
+    for mapper in Model.registry.mappers:
+        for relationship in mapper.relationships:
+            if relationship.mapper.class_ is Attachment and relationship.direction is RelationshipDirection.MANYTOONE:
+                for column in relationship.local_columns:
+                    yield mapper.class_, column
+
+
+def references(session: Session, attachment: Attachment) -> int:
+    """Count the places which refer to an attachment"""
+    count = 0
+    for model, column in _attachment_columns():
+        count += session.scalar(select(func.count()).select_from(model).where(column == attachment.id)) or 0
+    for counter in _REFERENCE_COUNTERS:
+        count += counter(session, attachment.id)
+    return count
+
+
+def find_duplicate(session: Session, attachment: Attachment) -> Attachment | None:
+    """Find an existing attachment with the same contents, filename and content type"""
+    query = select(Attachment).where(
+        Attachment.digest == attachment.digest,
+        Attachment.digest_algorithm == attachment.digest_algorithm,
+        Attachment.filename.is_not_distinct_from(attachment.filename),
+        Attachment.content_type.is_not_distinct_from(attachment.content_type),
+    )
+    if attachment.id is not None:
+        query = query.where(Attachment.id != attachment.id)
+
+    with session.no_autoflush:
+        return session.scalars(query.order_by(Attachment.created).limit(1)).first()
+
+
+def deduplicate(session: Session, attachment: Attachment) -> Attachment:
+    """Return an existing attachment with the same contents, filename and content type, or the attachment itself"""
+    duplicate = find_duplicate(session, attachment)
+    if duplicate is None:
+        return attachment
+
+    if attachment in session:
+        session.expunge(attachment)
+    log.debug("Deduplicated attachment", id=duplicate.id, digest=duplicate.digest, filename=attachment.filename)
+    return duplicate
+
+
+def detach(owner: Any, attachment: Attachment) -> int:
+    """Remove references from ``owner`` to ``attachment``, returning the number of required references left"""
+    required = 0
+    for relationship in inspect(type(owner)).relationships:
+        if relationship.mapper.class_ is not Attachment or getattr(owner, relationship.key) is not attachment:
+            continue
+
+        if all(column.nullable for column in relationship.local_columns):
+            setattr(owner, relationship.key, None)
+        else:
+            required += 1
+    return required
+
+
+def release(session: Session, attachment: Attachment, detached: int = 0) -> bool:
+    """Delete an attachment if nothing refers to it, returning whether it was deleted
+
+    ``detached`` references are ignored, for an owner which can't drop a required reference (see :func:`detach`).
+    """
+    if (count := references(session, attachment) - detached) > 0:
+        log.debug("Keeping shared attachment", id=attachment.id, references=count)
+        return False
+
+    session.delete(attachment)
+    return True
@@ -0,0 +1,26 @@
+from flask import Flask
+from flask_attachments import Attachments as BaseAttachments
+
+from .renditions import srcset
+from .serve import bp
+
+#: Set to ``False`` to serve attachments with the flask-attachments blueprint instead
+SERVE_CONFIG_KEY = "BASINGSE_ATTACHMENTS_SERVE"
+
+
+class Attachments(BaseAttachments):
+    """Attachments, served by :mod:`basingse.attachments.serve`"""
+
+    def init_app(self, app: Flask) -> None:
+        serve = app.config.setdefault(SERVE_CONFIG_KEY, True)
+        if serve:
+            app.config["ATTACHMENTS_BLUEPRINT"] = False
+
+        super().init_app(app)
+
+        # Extends the ``flask attach`` commands with the size-bounded cache
+        from . import cli  # noqa: F401
+
+        if serve:
+            app.register_blueprint(bp)
+        app.add_template_global(srcset, "attachment_srcset")
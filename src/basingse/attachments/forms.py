@@ -10,6 +10,7 @@ from flask_attachments import Attachment
 from flask_attachments import CompressionAlgorithm
 from flask_wtf.file import FileField
 from flask_wtf.form import FlaskForm
+from sqlalchemy.orm import Session
 from werkzeug.datastructures import FileStorage
 from wtforms import Field
 from wtforms import HiddenField
@@ -20,6 +21,10 @@ from wtforms.validators import Optional
 from wtforms.validators import UUID
 from wtforms.validators import ValidationError
 
+from .dedup import deduplicate
+from .ingest import receive
+from basingse import svcs
+
 log = structlog.get_logger(__name__)
 
 
@@ -43,9 +48,8 @@ class AttachmentField(FileField):
         if isinstance(self.data, Attachment):
             setattr(obj, name, self.data)
         elif isinstance(self.data, FileStorage):
-            attachment = Attachment()
-            attachment.receive(self.data)
-            setattr(obj, name, attachment)
+            attachment = receive(Attachment(), self.data)
+            setattr(obj, name, deduplicate(svcs.get(Session), attachment))
         else:
             log.error("Invalid data type", data=self.data)
 
@@ -121,4 +125,4 @@ class AttachmentForm(FlaskForm):
 
         super().populate_obj(obj)
         if self.attachment.data:
-            obj.receive(self.attachment.data)
+            receive(obj, self.attachment.data)
@@ -0,0 +1,140 @@
+"""Streaming ingestion of uploaded files into attachments.
+
+:meth:`Attachment.receive <flask_attachments.Attachment.receive>` reads the whole upload into memory
+and then compresses it into a second in-memory buffer. :func:`ingest` instead reads the upload one
+chunk at a time, updating the digest and the compressor as it goes. Compressed contents are spooled
+to a temporary file, and the uncompressed contents are written straight into the
+:class:`~basingse.attachments.cache.AttachmentCache`, so a new attachment can be served without first
+being decompressed again.
+
+The uncompressed upload is never held in memory. The compressed contents still are, once, when they
+are assigned to :attr:`Attachment.contents`: the column is an ordinary ``LargeBinary``, which the
+database drivers can only write from a ``bytes`` value. Peak memory is therefore proportional to the
+compressed size of the file, not to the chunk size.
+"""
+
+import contextlib
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import IO
+from typing import Protocol
+
+import structlog
+from flask_attachments import Attachment
+from flask_attachments import CompressionAlgorithm
+from flask_attachments.models import parse_compression
+from flask_attachments.models import parse_digest
+from werkzeug.datastructures import FileStorage
+
+from .cache import AttachmentCache
+
+log = structlog.get_logger(__name__)
+
+#: Bytes read from the upload at a time
+CHUNK_SIZE = 64 * 1024
+
+#: Compressed contents larger than this are spooled to disk rather than held in memory
+SPOOL_SIZE = 1024 * 1024
+
+#: Content types which say nothing about the file, and are replaced by a sniffed type
+GENERIC_CONTENT_TYPES = {"application/octet-stream", "binary/octet-stream"}
+
+_SIGNATURES: tuple[tuple[bytes, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+)
+
+
+class Readable(Protocol):
+    """A binary stream to ingest, only :meth:`read` is used"""
+
+    def read(self, size: int, /) -> bytes | None: ...
+
+
+def sniff(chunk: bytes) -> str | None:
+    """Guess a content type from the first bytes of a file"""
+    for signature, content_type in _SIGNATURES:
+        if chunk.startswith(signature):
+            return content_type
+    if chunk[:4] == b"RIFF" and chunk[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _compressor(compression: CompressionAlgorithm, stream: IO[bytes]) -> contextlib.AbstractContextManager[IO[bytes]]:
+    # Without compression, open() returns the stream itself, which must stay open to be read back.
+    if compression == CompressionAlgorithm.NONE:
+        return contextlib.nullcontext(stream)
+    return compression.open(stream, "wb")
+
+
+def _needs_sniffing(attachment: Attachment) -> bool:
+    return attachment.content_type is None or attachment.mimetype in GENERIC_CONTENT_TYPES
+
+
+def _clear_cached_properties(attachment: Attachment) -> None:
+    for name in ("etag", "cached_at", "cached_filepath", "size", "compressed_size"):
+        attachment._empty_cache(name)
+
+
+def ingest(
+    attachment: Attachment,
+    stream: Readable,
+    compression: CompressionAlgorithm | str | None = None,
+    digest_algorithm: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Attachment:
+    """Read a stream into an attachment, holding only the compressed contents in memory.
+
+    The digest is computed over the uncompressed contents, matching :meth:`Attachment.streamed`.
+    """
+    compression = parse_compression(compression)
+    digest_algorithm = parse_digest(digest_algorithm)
+    digest = hashlib.new(digest_algorithm)
+    length = 0
+
+    cache = AttachmentCache()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool, cache.spool() as cached:
+        with _compressor(compression, spool) as compressor:
+            while chunk := stream.read(chunk_size):
+                if length == 0 and _needs_sniffing(attachment):
+                    attachment.content_type = sniff(chunk) or attachment.content_type
+                length += len(chunk)
+                digest.update(chunk)
+                compressor.write(chunk)
+                cached.write(chunk)
+
+        # The column can only be written from bytes, so this is the one full copy held in memory.
+        spool.seek(0)
+        attachment.contents = spool.read()
+
+    attachment.content_length = length
+    attachment.compression = compression
+    attachment.digest = digest.hexdigest()
+    attachment.digest_algorithm = digest_algorithm
+    _clear_cached_properties(attachment)
+
+    cache.commit(Path(cached.name), attachment.cached_filepath)
+    log.debug("Ingested attachment", filename=attachment.filename, length=length, digest=attachment.digest)
+    return attachment
+
+
+def receive(
+    attachment: Attachment,
+    file: FileStorage,
+    compression: CompressionAlgorithm | str | None = None,
+    digest_algorithm: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Attachment:
+    """Ingest an uploaded file, like :meth:`Attachment.receive` but without buffering it in memory"""
+    if attachment.filename is None and file.filename:
+        attachment.filename = Path(file.filename).name
+
+    if attachment.content_type is None:
+        attachment.content_type = file.content_type
+
+    return ingest(attachment, file.stream, compression, digest_algorithm, chunk_size)
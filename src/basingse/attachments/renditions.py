@@ -0,0 +1,132 @@
+"""Resized renditions of image attachments.
+
+Uploaded images are usually far larger than the space they are shown in. Renditions bounded to each of
+``BASINGSE_ATTACHMENTS_RENDITION_WIDTHS`` are generated on first request, in the original format or as
+WebP, and kept in the attachment cache next to the original, named by digest and width. Templates use
+:func:`srcset` so the browser picks the smallest rendition which fills the space::
+
+    <img src="{{ attachment.link }}" srcset="{{ attachment_srcset(attachment) }}" sizes="400px">
+
+Renditions need Pillow (``pip install basingse[images]``). Without it, and for images which can't be
+resized (e.g. SVG or GIF), the original file is served at every width.
+"""
+
+from collections.abc import Sequence
+from pathlib import Path
+from uuid import UUID
+
+import structlog
+from flask import current_app
+from flask import Flask
+from flask import url_for
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from .cache import AttachmentCache
+from basingse import svcs
+
+try:
+    from PIL import Image
+    from PIL import ImageOps
+except ImportError:  # pragma: nocover
+    Image = None  # type: ignore[assignment]
+
+log = structlog.get_logger(__name__)
+
+WIDTHS_CONFIG_KEY = "BASINGSE_ATTACHMENTS_RENDITION_WIDTHS"
+QUALITY_CONFIG_KEY = "BASINGSE_ATTACHMENTS_RENDITION_QUALITY"
+
+#: Default rendition widths, in pixels
+WIDTHS: Sequence[int] = (320, 640, 960, 1280, 1920)
+
+#: Formats which renditions can be converted to, by file extension
+FORMATS: dict[str, tuple[str, str]] = {"webp": ("WEBP", "image/webp")}
+
+#: Image types which can be resized, and their Pillow format
+RESIZABLE: dict[str, str] = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+
+
+def available() -> bool:
+    """Whether Pillow is installed, so renditions can be generated"""
+    return Image is not None
+
+
+def widths(app: Flask | None = None) -> Sequence[int]:
+    if app is None:
+        app = current_app
+    return app.config.get(WIDTHS_CONFIG_KEY, WIDTHS)
+
+
+def resizable(attachment: Attachment) -> bool:
+    return available() and attachment.mimetype in RESIZABLE
+
+
+def mimetype(attachment: Attachment, format: str | None = None) -> str | None:
+    """The type of a rendition of this attachment"""
+    if format is None:
+        return attachment.mimetype
+    return FORMATS[format][1]
+
+
+def rendition_path(attachment: Attachment, width: int, format: str | None = None) -> Path:
+    """Where a rendition is cached, next to the original file"""
+    path = attachment.cached_filepath
+    suffix = f".{format}" if format is not None else path.suffix
+    return path.with_name(f"{path.stem}-w{width}{suffix}")
+
+
+def render(attachment: Attachment, width: int, format: str | None = None) -> Path:
+    """The cached rendition of an image, no wider than ``width``, generating it if necessary"""
+    cache = AttachmentCache()
+    path = rendition_path(attachment, width, format)
+    if path.exists():
+        path.touch()
+        cache.stats.record("hits")
+        return path
+
+    target = FORMATS[format][0] if format is not None else RESIZABLE.get(attachment.mimetype or "")
+    if target is None:
+        raise ValueError(f"Attachments of type {attachment.mimetype} can't be resized")
+
+    cache.stats.record("misses")
+    source = cache.lookup(attachment)
+    quality = current_app.config.get(QUALITY_CONFIG_KEY, 80)
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.width > width:
+            # Only ever shrink: thumbnail preserves the aspect ratio within the bounding box.
+            image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        if target == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        with cache.spool() as file:
+            image.save(file, format=target, quality=quality, optimize=True)
+
+    cache.commit(Path(file.name), path)
+    log.debug("Rendered attachment", id=attachment.id, width=width, format=target, size=path.stat().st_size)
+    return path
+
+
+def srcset(attachment: Attachment | UUID | str, format: str | None = None) -> str:
+    """A ``srcset`` attribute listing each rendition of an image attachment, or by its id
+
+    The ``srcset`` is empty for attachments which can't be resized, or without Pillow, since every
+    "rendition" would be the original file, and not in the requested format.
+    """
+    if "attachments.image" not in current_app.view_functions:
+        return ""
+
+    if not isinstance(attachment, Attachment):
+        # The contents are deferred, so this only loads the attachment's metadata
+        found = svcs.get(Session).get(Attachment, UUID(str(attachment)))
+        if found is None:
+            return ""
+        attachment = found
+
+    if not resizable(attachment):
+        return ""
+
+    return ", ".join(
+        f"{url_for('attachments.image', id=attachment.id, width=width, format=format)} {width}w" for width in widths()
+    )
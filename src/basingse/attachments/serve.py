@@ -0,0 +1,124 @@
+"""Serve attachments from the on-disk cache.
+
+:func:`send` uses a strong entity tag derived from the attachment's digest, so identical contents
+share a cache entry in the browser, and answers conditional requests before touching the stored
+contents. Responses are streamed from the cached file, with ``Range`` and ``If-Range`` support.
+Image attachments can also be sent as resized renditions, see :mod:`basingse.attachments.renditions`.
+"""
+
+from pathlib import Path
+from uuid import UUID
+
+import structlog
+from flask import abort
+from flask import Blueprint
+from flask import request
+from flask import send_file
+from flask.typing import ResponseReturnValue as IntoResponse
+from flask_attachments import Attachment
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from werkzeug import Response
+from werkzeug.http import is_resource_modified
+
+from . import renditions
+from .cache import AttachmentCache
+from basingse import svcs
+from basingse.sendfile import offload
+
+log = structlog.get_logger(__name__)
+
+bp = Blueprint("attachments", __name__, url_prefix="/attachments/")
+
+
+def etag(attachment: Attachment) -> str:
+    """A strong entity tag for the attachment's contents"""
+    return f"{attachment.digest_algorithm}-{attachment.digest}"
+
+
+def not_modified(attachment: Attachment, tag: str | None = None) -> Response:
+    response = Response(status=304)
+    response.set_etag(tag if tag is not None else etag(attachment))
+    response.last_modified = attachment.updated
+    return response
+
+
+def send(attachment: Attachment, as_download: bool = False) -> Response:
+    """Send an attachment, handling conditional and range requests"""
+    tag = etag(attachment)
+    if not is_resource_modified(request.environ, etag=tag, last_modified=attachment.updated, ignore_if_range=True):
+        return not_modified(attachment)
+
+    path = AttachmentCache().lookup(attachment)
+    return _send_path(path, attachment, tag, attachment.mimetype, as_download=as_download)
+
+
+def send_rendition(attachment: Attachment, width: int, format: str | None = None) -> Response:
+    """Send an image attachment, resized to fit within ``width`` and optionally converted to ``format``"""
+    if not renditions.resizable(attachment):
+        return send(attachment)
+
+    tag = f"{etag(attachment)}-w{width}{'.' + format if format else ''}"
+    if not is_resource_modified(request.environ, etag=tag, last_modified=attachment.updated, ignore_if_range=True):
+        return not_modified(attachment, tag)
+
+    path = renditions.render(attachment, width, format)
+    return _send_path(path, attachment, tag, renditions.mimetype(attachment, format))
+
+
+def _send_path(
+    path: Path, attachment: Attachment, tag: str, mimetype: str | None, as_download: bool = False
+) -> Response:
+    offloaded = offload(
+        path,
+        mimetype=mimetype,
+        last_modified=attachment.updated,
+        download_name=attachment.filename,
+        as_attachment=as_download,
+        etag=tag,
+    )
+    if offloaded is not None:
+        return offloaded
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        last_modified=attachment.updated,
+        download_name=attachment.filename,
+        as_attachment=as_download,
+        conditional=True,
+        etag=tag,
+    )
+
+    # Werkzeug only advertises range support on partial responses, so players wouldn't know they can seek.
+    response.accept_ranges = "bytes"
+    return response
+
+
+def _get_attachment_or_404(id: UUID) -> Attachment:
+    session = svcs.get(Session)
+    attachment = session.scalar(select(Attachment).where(Attachment.id == id))
+    if attachment is None:
+        abort(404)
+    return attachment
+
+
+@bp.route("/id/<uuid:id>/")
+def id(id: UUID) -> IntoResponse:
+    """Get a cached file by ID"""
+    return send(_get_attachment_or_404(id))
+
+
+@bp.route("/download/<uuid:id>/")
+def download(id: UUID) -> IntoResponse:
+    """Download an attached file by ID"""
+    return send(_get_attachment_or_404(id), as_download=True)
+
+
+@bp.route("/image/<uuid:id>/<int:width>/")
+@bp.route("/image/<uuid:id>/<int:width>.<format>")
+def image(id: UUID, width: int, format: str | None = None) -> IntoResponse:
+    """Get a resized rendition of an image by ID"""
+    if width not in renditions.widths() or (format is not None and format not in renditions.FORMATS):
+        abort(404)
+    return send_rendition(_get_attachment_or_404(id), width, format)
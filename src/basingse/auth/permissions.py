@@ -2,6 +2,7 @@ import dataclasses as dc
 import enum
 import uuid
 from collections.abc import Callable
+from collections.abc import Hashable
 from functools import wraps
 from typing import Any
 from typing import cast
@@ -287,6 +288,11 @@ def require_permission(
     return wrapper
 
 
+def permissions_exempt() -> bool:
+    """Whether the current request skips permission checks, because of its method or ``LOGIN_DISABLED``"""
+    return request.method in flask_login.config.EXEMPT_METHODS or current_app.config.get("LOGIN_DISABLED", False)
+
+
 def check_permissions(permission: Any, action: Any = None) -> bool:
     """Check if the current user has a permission"""
     if action is not None:
@@ -294,7 +300,7 @@ def check_permissions(permission: Any, action: Any = None) -> bool:
     elif not isinstance(permission, Permission):
         permission = Permission(permission)
 
-    if request.method in flask_login.config.EXEMPT_METHODS or current_app.config.get("LOGIN_DISABLED", False):
+    if permissions_exempt():
         return True
     elif not current_user.is_authenticated:
         return False
@@ -305,6 +311,29 @@ def check_permissions(permission: Any, action: Any = None) -> bool:
     return False
 
 
+def permission_fingerprint(user: Any = None) -> Hashable | None:
+    """A hashable summary of the permissions held by a user (default: the current user)
+
+    Two users with the same fingerprint will get the same answer from ``can`` for any
+    permission, so the fingerprint can be used to key caches of permission-filtered content.
+    Returns ``None`` if the user's permissions can't be summarized.
+    """
+    if user is None:
+        user = current_user
+
+    if not user.is_authenticated:
+        return ("anonymous", bool(current_app.config.get("LOGIN_DISABLED", False)))
+
+    roles = getattr(user, "roles", None)
+    if roles is None:
+        return None
+
+    if any(role.administrator for role in roles):
+        return ("administrator",)
+
+    return frozenset((permission.model, permission.action) for role in roles for permission in role.permissions)
+
+
 def create_administrator(email: str, password: str) -> "User":
     """Initialize the administrator user if it doesn't exist"""
     from .models import User
@@ -1,5 +1,11 @@
 import dataclasses as dc
+import importlib.util
+import json
+import os
+import time
 from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
 
 import structlog
 from flask import Flask
@@ -11,16 +17,110 @@ logger = structlog.get_logger(__name__)
 
 DEFAULT_AVOID = {"tests", "test", "testing", "wsgi", "app"}
 
+#: Default filename for the discovery manifest, relative to the auto-imported package
+DEFAULT_MANIFEST = "autoimport.json"
+
+#: Set to ``True`` in a module which registers nothing when imported, so that it can be deferred
+DEFER_ATTRIBUTE = "__autoimport_defer__"
+
+
+@dc.dataclass(frozen=True)
+class ManifestEntry:
+    """A module found during discovery"""
+
+    name: str
+
+    #: Whether the module defines ``init_app``
+    init_app: bool
+
+    #: Whether the module opted in to being deferred, with ``__autoimport_defer__ = True``
+    defer: bool = False
+
+    @property
+    def deferrable(self) -> bool:
+        return self.defer and not self.init_app
+
+
+def manifest_path(name: str, manifest: str) -> str:
+    """Resolve a manifest path, relative paths are relative to the package directory"""
+    if os.path.isabs(manifest):
+        return manifest
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.submodule_search_locations:
+        raise ValueError(f"Can't find a package directory for {name}")
+    return os.path.join(next(iter(spec.submodule_search_locations)), manifest)
+
+
+def deferrable(module: Any) -> bool:
+    """Whether a module opted in to being deferred
+
+    Importing a module can register routes, signal and event listeners, CLI commands or models,
+    none of which can be detected reliably, so modules are only deferred when they say so.
+    """
+    return getattr(module, DEFER_ATTRIBUTE, False) is True
+
+
+def discover(name: str, avoid: Iterable[str]) -> Iterator[ManifestEntry]:
+    """Find and import every module in a package, noting which define ``init_app`` or can be deferred"""
+    avoid = set(avoid)
+    for module_name in find_modules(name, include_packages=True, recursive=True):
+        if set(module_name.split(".")).intersection(avoid):
+            continue
+        module = import_string(module_name)
+        yield ManifestEntry(module_name, init_app=hasattr(module, "init_app"), defer=deferrable(module))
+
+
+def write_manifest(path: str, name: str, entries: Iterable[ManifestEntry]) -> None:
+    data = {"name": name, "modules": [dc.asdict(entry) for entry in entries]}
+    with open(path, "w") as stream:
+        json.dump(data, stream, indent=2)
+        stream.write("\n")
+
+
+def read_manifest(path: str, name: str) -> list[ManifestEntry] | None:
+    """Read a discovery manifest, returning ``None`` if it is missing or for another package"""
+    try:
+        with open(path) as stream:
+            data: dict[str, Any] = json.load(stream)
+    except FileNotFoundError:
+        logger.warning("AutoImport manifest not found, discovering modules", path=path)
+        return None
+
+    if data.get("name") != name:
+        logger.warning("AutoImport manifest is for another package", path=path, manifest=data.get("name"), name=name)
+        return None
+
+    return [
+        ManifestEntry(entry["name"], init_app=bool(entry["init_app"]), defer=entry.get("defer", False) is True)
+        for entry in data["modules"]
+    ]
+
 
 @dc.dataclass()
 class AutoImport:
     avoid: None | Iterable[str] = None
     name: str | None = None
 
+    #: A discovery manifest (see :func:`write_manifest`) to use instead of walking the package
+    manifest: str | None = None
+
+    #: When using a manifest, don't import modules which set ``__autoimport_defer__ = True``
+    defer: bool = False
+
     def init_app(self, app: Flask) -> None:
         name = self.name or app.import_name
         self.auto_import(app, name, self.avoid)
 
+    def _modules(self, name: str) -> Iterator[tuple[str, bool]]:
+        if self.manifest is not None and (entries := read_manifest(manifest_path(name, self.manifest), name)):
+            for entry in entries:
+                yield entry.name, entry.deferrable
+            return
+
+        for module_name in find_modules(name, include_packages=True, recursive=True):
+            yield module_name, False
+
     def auto_import(self, app: Flask, name: str, avoid: None | Iterable[str] = None) -> "AutoImportRecord":
         # Truncate .app if we are in a .app module (not package) so that users can pass __name__
         if name.endswith(".app"):
@@ -29,20 +129,43 @@ class AutoImport:
         avoid = DEFAULT_AVOID if avoid is None else set(avoid)
 
         records = []
+        start = time.perf_counter()
+        started_at = time.time_ns()
 
-        for module_name in find_modules(name, include_packages=True, recursive=True):
+        for module_name, deferrable in self._modules(name):
             if set(module_name.split(".")).intersection(avoid):
                 records.append(AutoImportModuleRecord(module_name, skipped=True, initialized=False))
                 continue
 
+            if self.defer and deferrable:
+                records.append(AutoImportModuleRecord(module_name, skipped=False, initialized=False, deferred=True))
+                continue
+
+            module_start = time.perf_counter()
             module = import_string(module_name)
+            imported = time.perf_counter()
             if hasattr(module, "init_app"):
                 module.init_app(app)
-                records.append(AutoImportModuleRecord(module_name, skipped=False, initialized=True))
+                records.append(
+                    AutoImportModuleRecord(
+                        module_name,
+                        skipped=False,
+                        initialized=True,
+                        import_time=imported - module_start,
+                        init_time=time.perf_counter() - imported,
+                    )
+                )
             else:
-                records.append(AutoImportModuleRecord(module_name, skipped=False, initialized=False))
-
-        record = AutoImportRecord(name, avoid, records)
+                records.append(
+                    AutoImportModuleRecord(
+                        module_name,
+                        skipped=False,
+                        initialized=False,
+                        import_time=imported - module_start,
+                    )
+                )
+
+        record = AutoImportRecord(name, avoid, records, duration=time.perf_counter() - start, started_at=started_at)
         app.extensions["autoimport"] = record
         return record
 
@@ -53,9 +176,24 @@ class AutoImportModuleRecord:
     skipped: bool
     initialized: bool
 
+    #: Seconds spent importing the module
+    import_time: float = 0.0
+
+    #: Seconds spent in the module's ``init_app``
+    init_time: float = 0.0
+
+    #: The module opted in to being deferred, and wasn't imported
+    deferred: bool = False
+
+    @property
+    def duration(self) -> float:
+        return self.import_time + self.init_time
+
     def __repr__(self) -> str:
         if self.skipped:
             return f"<{self.name} skipped>"
+        if self.deferred:
+            return f"<{self.name} deferred>"
         if self.initialized:
             return f"<{self.name} initialized>"
         return f"<{self.name} imported>"
@@ -67,6 +205,12 @@ class AutoImportRecord:
     avoid: set[str]
     modules: list[AutoImportModuleRecord]
 
+    #: Seconds spent finding, importing and initializing modules
+    duration: float = 0.0
+
+    #: When the auto import started, in nanoseconds since the epoch
+    started_at: int = 0
+
     def __len__(self) -> int:
         return len(self.modules)
 
@@ -75,3 +219,10 @@ class AutoImportRecord:
             if module.name == name:
                 return module
         raise KeyError(f"Module {name} not found in {self.name}")
+
+    def import_deferred(self) -> list[str]:
+        """Import any modules which were deferred, e.g. before forking workers"""
+        names = [module.name for module in self.modules if module.deferred]
+        for name in names:
+            import_string(name)
+        return names
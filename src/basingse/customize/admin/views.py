@@ -1,4 +1,5 @@
 import dataclasses as dc
+from typing import cast
 from uuid import UUID
 
 import structlog
@@ -26,6 +27,8 @@ from .forms import SettingsForm
 from basingse import svcs
 from basingse.admin.extension import AdminBlueprint
 from basingse.admin.portal import PortalMenuItem
+from basingse.attachments.dedup import detach
+from basingse.attachments.dedup import release
 from basingse.models import Session
 from basingse.utils.settings import BlueprintOptions
 
@@ -78,8 +81,10 @@ def delete_logo(attachment_id: UUID) -> IntoResponse:
     if settings is None:  # pragma: nocover
         abort(404)
 
-    attachment = session.get_or_404(Attachment, attachment_id)  # type: ignore[arg-type]
-    session.delete(attachment)
+    attachment = cast(Attachment, session.get_or_404(Attachment, attachment_id))  # type: ignore[arg-type]
+    if settings.logo is not None:
+        detach(settings.logo, attachment)
+    release(session, attachment)
     session.commit()
     session.refresh(settings)
 
@@ -96,7 +101,9 @@ def delete_social_image(id: UUID) -> IntoResponse:
     query = select(Attachment).where(Attachment.id == id)
     attachment = session.execute(query).scalar_one_or_none()
     if attachment is not None:
-        session.delete(attachment)
+        for link in session.scalars(select(SocialLink).where(SocialLink.image_id == id)):
+            detach(link, attachment)
+        release(session, attachment)
         session.commit()
 
     get_social_links.clear()
@@ -16,6 +16,7 @@ from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
+from basingse.attachments.renditions import srcset
 from basingse.models import Model
 from basingse.models import orm
 
@@ -133,6 +134,16 @@ class Logo(Model):
             return attachment.link
         return None
 
+    def srcset(self, size: LogoSize | str, format: str | None = None) -> str | None:
+        """Get a ``srcset`` of resized renditions of the best-fit logo for a given size"""
+
+        if isinstance(size, str):
+            size = LogoSize[size.upper()]
+        attachment = self.size(size)
+        if attachment is not None:
+            return srcset(attachment, format)
+        return None
+
 
 class SiteSettings(Model):
     """
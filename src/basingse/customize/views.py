@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from .models import LogoSize
 from .models import SiteSettings
 from basingse import svcs
+from basingse.attachments.serve import send
 from basingse.page.models import Page
 
 bp = Blueprint("customize", __name__, template_folder="templates")
@@ -30,7 +31,7 @@ def logo_endpoint(size: LogoSize) -> IntoResponse:
 
     session = svcs.get(Session)
     logo = session.merge(logo, load=False)
-    return logo.send()
+    return send(logo)
 
 
 @bp.route("/brand/logo/<size>")
@@ -0,0 +1,116 @@
+"""A shared, connection-pooled client for outbound HTTP requests."""
+
+import contextlib
+import dataclasses as dc
+import io
+import time
+from collections.abc import Iterator
+
+import httpx
+from flask import Flask
+
+from basingse import svcs
+
+
+class DownloadError(Exception):
+    """A remote download was rejected"""
+
+
+class DownloadTooLarge(DownloadError):
+    """The remote file is larger than allowed"""
+
+
+class DownloadTooSlow(DownloadError):
+    """The remote server didn't send the file quickly enough"""
+
+
+class BoundedReader(io.RawIOBase):
+    """A readable stream over a streamed response body, with a size limit and deadline.
+
+    The limits are checked as each chunk arrives, so a large or slow download is rejected
+    without first being buffered in memory.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], max_size: int | None, timeout: float | None) -> None:
+        super().__init__()
+        self._chunks = chunks
+        self._buffer = b""
+        self._received = 0
+        self._max_size = max_size
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        chunk = next(self._chunks, b"")
+        self._received += len(chunk)
+        if self._max_size is not None and self._received > self._max_size:
+            raise DownloadTooLarge(f"Download exceeded {self._max_size} bytes")
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise DownloadTooSlow("Download took too long")
+        return chunk
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        if not self._buffer:
+            self._buffer = self._next_chunk()
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+@dc.dataclass(frozen=True)
+class HTTPSettings:
+    """Settings for the shared outbound :class:`httpx.Client`"""
+
+    #: Seconds to wait to establish a connection
+    connect_timeout: float = 5.0
+
+    #: Seconds to wait between bytes received from the server
+    read_timeout: float = 10.0
+
+    #: Maximum number of open connections
+    max_connections: int = 20
+
+    #: Maximum number of idle connections kept open for reuse
+    max_keepalive_connections: int = 10
+
+    #: Use HTTP/2 when the server supports it (requires the ``h2`` package)
+    http2: bool = False
+
+    #: Largest file, in bytes, accepted from a remote download
+    max_download_size: int = 16 * 1024 * 1024
+
+    #: Seconds allowed for a whole remote download, to reject slow senders
+    download_timeout: float = 30.0
+
+    def client(self) -> httpx.Client:
+        timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+        )
+        return httpx.Client(timeout=timeout, limits=limits, http2=self.http2, follow_redirects=True)
+
+    def init_app(self, app: Flask) -> None:
+        client = self.client()
+        svcs.register_value(app, httpx.Client, client, on_registry_close=client.close)
+        svcs.register_value(app, HTTPSettings, self)
+
+
+@contextlib.contextmanager
+def download(client: httpx.Client, url: str, settings: HTTPSettings) -> Iterator[tuple[httpx.Response, BoundedReader]]:
+    """Stream a download, checking the declared size before any of the body is read"""
+    request = client.build_request("GET", url)
+    response = client.send(request, stream=True)
+    try:
+        response.raise_for_status()
+        length = response.headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > settings.max_download_size:
+            raise DownloadTooLarge(f"Download of {length} bytes exceeds {settings.max_download_size} bytes")
+
+        yield response, BoundedReader(response.iter_bytes(), settings.max_download_size, settings.download_timeout)
+    finally:
+        response.close()
@@ -12,7 +12,6 @@ from flask import request
 from flask import request_started
 from flask_login import user_loaded_from_cookie
 from flask_login import user_loaded_from_request
-from rich.traceback import install
 from sqlalchemy import Engine
 from sqlalchemy import event
 from sqlalchemy.engine.interfaces import DBAPIConnection
@@ -94,6 +93,8 @@ def configure_structlog() -> None:
         cache_logger_on_first_use=False,
     )
 
+    from rich.traceback import install
+
     install(show_locals=True)
 
 
@@ -1,13 +1,51 @@
+"""Markdown rendering, for the ``markdown`` template filter and the admin preview.
+
+Rendered HTML is kept in a bounded, least-recently-used cache, keyed by a digest of the text and of the
+renderer's configuration, so text which is shown repeatedly is only rendered once. Hits, misses and
+evictions are counted in :class:`CacheStats`, and as OpenTelemetry metrics.
+
+Documents longer than :attr:`MarkdownOptions.pool_threshold` characters can be rendered in a pool of
+worker processes instead. A document which takes longer than :attr:`MarkdownOptions.timeout` seconds is
+shown as escaped text, so one pathological document can't stall a request. The pool's workers are then
+terminated, so a runaway render doesn't keep using CPU, and a new pool is started on the next large
+document. The document is shown as text without rendering it again for :attr:`MarkdownOptions.retry_after`
+seconds.
+"""
+
+import collections
 import dataclasses as dc
+import hashlib
+import multiprocessing
+import multiprocessing.pool
+import threading
+import time
 from typing import Any
 
+import structlog
+from flask import current_app
 from flask import Flask
+from flask import has_app_context
 from jinja2 import Undefined
 from markdown_it import MarkdownIt
 from markdown_it.renderer import RendererHTML
 from markupsafe import Markup
 from mdit_py_plugins.footnote import footnote_plugin
 from mdit_py_plugins.front_matter import front_matter_plugin
+from opentelemetry import metrics
+
+from basingse import svcs
+
+log = structlog.get_logger(__name__)
+meter = metrics.get_meter(__name__)
+
+_MARKDOWN_EXTENSION_KEY = "basingse.markdown"
+
+_counters = {
+    "hits": meter.create_counter("markdown.cache.hits", description="Markdown served from the render cache"),
+    "misses": meter.create_counter("markdown.cache.misses", description="Markdown rendered and added to the cache"),
+    "evictions": meter.create_counter("markdown.cache.evictions", description="Markdown evicted from the cache"),
+    "timeouts": meter.create_counter("markdown.timeouts", description="Markdown which took too long to render"),
+}
 
 
 class BootstrapRender(RendererHTML):
@@ -18,13 +56,204 @@ class BootstrapRender(RendererHTML):
 md = MarkdownIt(renderer_cls=BootstrapRender).use(front_matter_plugin).use(footnote_plugin)
 
 
+def fingerprint(renderer: MarkdownIt) -> str:
+    """A digest of the renderer's configuration, which changes when its options, rules or plugins change"""
+    options = sorted((key, repr(value)) for key, value in renderer.options.items())
+    configuration = (type(renderer.renderer).__qualname__, options, renderer.get_active_rules())
+    return hashlib.sha256(repr(configuration).encode("utf-8")).hexdigest()
+
+
+def _render_text(text: str) -> str:
+    # Module level, so that it can be sent to worker processes
+    return md.render(text)
+
+
+@dc.dataclass
+class CacheStats:
+    """Counters for the markdown render cache in this process"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    timeouts: int = 0
+
+    _lock: threading.Lock = dc.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+        _counters[name].add(amount)
+
+
+class RenderCache:
+    """A least-recently-used cache of rendered HTML, keyed by a digest of the text"""
+
+    def __init__(self, size: int, configuration: str) -> None:
+        self.size = size
+        self.configuration = configuration
+        self.stats = CacheStats()
+        self._entries: collections.OrderedDict[str, str] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(self.configuration.encode("utf-8"))
+        digest.update(text.encode("utf-8", errors="surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+        self.stats.record("hits" if html is not None else "misses")
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        if self.size <= 0:
+            return
+
+        evicted = 0
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.record("evictions", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class Markdown:
+    """Renders markdown, through the cache and, for large documents, in worker processes"""
+
+    def __init__(
+        self,
+        cache_size: int = 512,
+        pool_threshold: int | None = None,
+        workers: int = 2,
+        timeout: float = 5.0,
+        retry_after: float = 60.0,
+    ) -> None:
+        self.cache = RenderCache(cache_size, fingerprint(md))
+        self.pool_threshold = pool_threshold
+        self.workers = workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool: multiprocessing.pool.Pool | None = None
+        self._lock = threading.Lock()
+
+        #: Keys of documents which timed out, and when they can be tried again
+        self._timeouts: dict[str, float] = {}
+
+    def pool(self) -> multiprocessing.pool.Pool:
+        with self._lock:
+            if self._pool is None:
+                # Spawned, rather than forked, as forking a process with running threads is unsafe.
+                self._pool = multiprocessing.get_context("spawn").Pool(self.workers)
+            return self._pool
+
+    def recycle(self, pool: multiprocessing.pool.Pool) -> bool:
+        """Terminate a pool whose worker is stuck, returning whether this call terminated it
+
+        The pool is terminated before a new one can be started, so there is only ever one pool.
+        """
+        with self._lock:
+            if self._pool is not pool:
+                return False
+            self._pool = None
+            pool.terminate()
+        return True
+
+    def timed_out(self, key: str) -> bool:
+        """Whether a document timed out recently, and shouldn't be rendered again yet"""
+        now = time.monotonic()
+        with self._lock:
+            self._timeouts = {pending: until for pending, until in self._timeouts.items() if until > now}
+            return key in self._timeouts
+
+    def render(self, text: str) -> str:
+        key = self.cache.key(text)
+        if (html := self.cache.get(key)) is not None:
+            return html
+
+        if self.pool_threshold is not None and len(text) > self.pool_threshold:
+            if self.timed_out(key):
+                return Markup("<pre>{}</pre>").format(text)
+
+            pool = self.pool()
+            result = pool.apply_async(_render_text, (text,))
+            try:
+                html = result.get(timeout=self.timeout)
+            except multiprocessing.TimeoutError:
+                # Another document may have stuck the pool first, in which case this one isn't to blame.
+                if self.recycle(pool):
+                    with self._lock:
+                        self._timeouts[key] = time.monotonic() + self.retry_after
+                self.cache.stats.record("timeouts")
+                log.warning("Markdown took too long to render, showing it as text", length=len(text))
+                return Markup("<pre>{}</pre>").format(text)
+        else:
+            html = _render_text(text)
+
+        self.cache.put(key, html)
+        return html
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+
+_default = Markdown()
+
+
+def get_markdown(app: Flask | None = None) -> Markdown:
+    if app is None:
+        if not has_app_context():
+            return _default
+        app = current_app
+    return app.extensions.get(_MARKDOWN_EXTENSION_KEY, _default)
+
+
 def render(text: str | None) -> Markup | Undefined:
     if text is None:
         return Undefined()
-    return Markup(md.render(text))
+    return Markup(get_markdown().render(text))
 
 
 @dc.dataclass(frozen=True)
 class MarkdownOptions:
+    #: Rendered documents kept in memory, ``0`` disables the cache
+    cache_size: int = 512
+
+    #: Documents longer than this many characters are rendered in worker processes, ``None`` renders all in-process
+    pool_threshold: int | None = None
+
+    #: Number of worker processes for large documents
+    pool_workers: int = 2
+
+    #: Seconds to wait for a worker to render a document before showing it as text
+    timeout: float = 5.0
+
+    #: Seconds to show a document which timed out as text, before trying to render it again
+    retry_after: float = 60.0
+
     def init_app(self, app: Flask) -> None:
+        renderer = Markdown(
+            cache_size=self.cache_size,
+            pool_threshold=self.pool_threshold,
+            workers=self.pool_workers,
+            timeout=self.timeout,
+            retry_after=self.retry_after,
+        )
+        app.extensions[_MARKDOWN_EXTENSION_KEY] = renderer
+        svcs.register_value(app, Markdown, renderer, on_registry_close=renderer.shutdown)
         app.add_template_filter(render, "markdown")
@@ -35,6 +35,7 @@ from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import Session as BaseSession
 from sqlalchemy.pool import ConnectionPoolEntry
 
+from . import dumper
 from . import info
 from . import orm
 from . import schema
@@ -130,6 +131,10 @@ class Model(TimestampsMixin, Base):
     def __schema__(cls) -> type[schema.Schema]:
         return schema.build_model_schema(cls)
 
+    @classmethod
+    def __dumper__(cls) -> dumper.Dumper:
+        return dumper.build_model_dumper(cls)
+
     @classmethod
     def __listview__(cls) -> type[ListView]:
         return schema.build_model_listview(cls)
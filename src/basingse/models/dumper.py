@@ -0,0 +1,191 @@
+"""Precompiled JSON dumpers for model schemas.
+
+Marshmallow walks every field of a schema for every object it serializes, which dominates
+the cost of large JSON exports. A :class:`Dumper` inspects a schema once, and for fields which
+map directly to a column type (as produced by :class:`~basingse.models.info.SchemaInfo`), it
+compiles a direct attribute-to-JSON converter. Any field it doesn't understand falls back to
+marshmallow's own serialization, so the output is identical to ``schema.dump``. Schemas with their own
+``pre_dump`` or ``post_dump`` hooks, or their own ``get_attribute``, are always dumped by marshmallow.
+"""
+
+import dataclasses as dc
+import datetime as dt
+import functools
+import json
+import uuid
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Any
+from typing import TYPE_CHECKING
+
+from marshmallow import fields
+from marshmallow import Schema as BaseSchema
+from marshmallow.utils import missing
+
+try:
+    import orjson
+except ImportError:  # pragma: nocover
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
+
+if TYPE_CHECKING:
+    from . import Model
+
+__all__ = ["Dumper", "build_model_dumper", "json_dumps"]
+
+
+def _datetime(value: dt.datetime | dt.date) -> str:
+    return value.isoformat()
+
+
+#: Direct converters for marshmallow field types which correspond to column types.
+#: Only exact type matches are used, so that subclasses with custom serialization fall back.
+CONVERTERS: dict[type[fields.Field], Callable[[Any], Any]] = {
+    fields.String: str,
+    fields.Email: str,
+    fields.Integer: int,
+    fields.Boolean: bool,
+    fields.UUID: str,
+    fields.DateTime: _datetime,
+    fields.Date: _datetime,
+}
+
+
+#: Dump hooks which the :class:`Dumper` reproduces itself, by qualified name
+COMPILED_HOOKS = {"EnvelopeSchema.wrap_envelope"}
+
+
+def _has_dump_hooks(schema: BaseSchema) -> bool:
+    """Whether a schema has ``pre_dump`` or ``post_dump`` hooks which a :class:`Dumper` can't reproduce"""
+    for tag, hooks in getattr(schema, "_hooks", {}).items():
+        # Hooks are keyed by tag, or by (tag, pass_many) in older versions of marshmallow
+        if (tag if isinstance(tag, str) else tag[0]) not in ("pre_dump", "post_dump"):
+            continue
+        for hook in hooks:
+            name = hook if isinstance(hook, str) else hook[0]
+            if getattr(getattr(type(schema), name, None), "__qualname__", None) not in COMPILED_HOOKS:
+                return True
+    return False
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(data: Any) -> bytes:
+    """Encode data as compact JSON, using :mod:`orjson` when it is installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+@dc.dataclass(frozen=True)
+class CompiledField:
+    """A single field, either compiled to a direct converter or deferred to marshmallow."""
+
+    #: The key in the serialized output
+    key: str
+
+    #: The attribute to read from the object
+    attribute: str
+
+    #: The marshmallow field, used when no direct converter applies
+    field: fields.Field
+
+    #: The direct converter, if this field could be compiled
+    converter: Callable[[Any], Any] | None
+
+    @classmethod
+    def compile(cls, name: str, field: fields.Field) -> "CompiledField":
+        attribute = field.attribute or name
+        key = field.data_key or name
+        converter = CONVERTERS.get(type(field))
+
+        if converter is not None:
+            if "." in attribute or field.dump_default is not missing:
+                converter = None
+            elif isinstance(field, fields.DateTime) and field.format not in (None, "iso", "iso8601"):
+                converter = None
+            elif isinstance(field, fields.Date) and field.format not in (None, "iso", "iso8601"):
+                converter = None
+
+        return cls(key=key, attribute=attribute, field=field, converter=converter)
+
+    @property
+    def compiled(self) -> bool:
+        return self.converter is not None
+
+
+class Dumper:
+    """A precompiled serializer for a marshmallow schema.
+
+    Dumpers are immutable after construction and safe to share between threads.
+    """
+
+    def __init__(self, schema: BaseSchema) -> None:
+        self.schema = schema
+        self.fields = [CompiledField.compile(name, field) for name, field in schema.dump_fields.items()]
+
+        # Schemas which aren't ours, or opt out in their Meta, are never compiled. Nor are schemas with their
+        # own dump hooks or attribute access, since we can't know what those do.
+        self.passthrough = (
+            not getattr(schema.opts, "compiled_dump", False)
+            or _has_dump_hooks(schema)
+            or type(schema).get_attribute is not BaseSchema.get_attribute
+        )
+
+    def __repr__(self) -> str:
+        compiled = sum(1 for field in self.fields if field.compiled)
+        return f"<Dumper {type(self.schema).__name__} compiled={compiled}/{len(self.fields)}>"
+
+    def _envelope(self, data: Any, many: bool) -> Any:
+        get_key = getattr(self.schema, "_get_envelope_key", None)
+        if get_key is not None and (key := get_key(many)):
+            return {key: data}
+        return data
+
+    def _dump_one(self, obj: Any) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for cf in self.fields:
+            if cf.converter is None:
+                value = cf.field.serialize(cf.attribute, obj, accessor=self.schema.get_attribute)
+                if value is missing:
+                    continue
+                result[cf.key] = value
+                continue
+
+            value = getattr(obj, cf.attribute, missing)
+            if value is missing:
+                continue
+            result[cf.key] = None if value is None else cf.converter(value)
+        return result
+
+    def dump(self, obj: Any) -> Any:
+        """Serialize a single object to JSON-compatible python data."""
+        if self.passthrough:
+            return self.schema.dump(obj, many=False)
+        return self._envelope(self._dump_one(obj), many=False)
+
+    def dump_many(self, objs: Iterable[Any]) -> Any:
+        """Serialize many objects to JSON-compatible python data."""
+        if self.passthrough:
+            return self.schema.dump(objs, many=True)
+        return self._envelope([self._dump_one(obj) for obj in objs], many=True)
+
+    def dumps(self, obj: Any) -> bytes:
+        """Serialize a single object directly to JSON bytes."""
+        return json_dumps(self.dump(obj))
+
+    def dumps_many(self, objs: Iterable[Any]) -> bytes:
+        """Serialize many objects directly to JSON bytes."""
+        return json_dumps(self.dump_many(objs))
+
+
+@functools.cache
+def build_model_dumper(model: "type[Model]") -> Dumper:
+    return Dumper(model.__schema__()())
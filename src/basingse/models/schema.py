@@ -1,8 +1,11 @@
 import enum
 import functools
 import warnings
+from collections.abc import Iterable
+from collections.abc import Mapping
 from collections.abc import Sequence
 from collections.abc import Set
+from contextvars import ContextVar
 from itertools import chain
 from typing import TYPE_CHECKING
 from typing import Any
@@ -52,6 +55,14 @@ class EnvelopeOptions(SchemaOpts):
     envelope: str | None = None
     plural_envelope: str | None = None
 
+    #: Whether a :class:`~basingse.models.dumper.Dumper` may compile this schema. Schemas with their own
+    #: dump hooks are never compiled, and others can opt out with ``compiled_dump = False`` in ``Meta``.
+    compiled_dump: bool = True
+
+    def __init__(self, meta: type, ordered: bool = False) -> None:
+        super().__init__(meta, ordered=ordered)
+        self.compiled_dump = getattr(meta, "compiled_dump", True)
+
 
 class EnvelopeSchema(BaseSchema):
     OPTIONS_CLASS = EnvelopeOptions
@@ -108,6 +119,10 @@ class EnvelopeSchema(BaseSchema):
         return data
 
 
+#: The ORM instance bound to a particular schema for the duration of a single :meth:`Schema.load` call.
+_load_instance: ContextVar[tuple["Schema", Any] | None] = ContextVar("_load_instance", default=None)
+
+
 class Schema(EnvelopeSchema):
     def __init__(
         self,
@@ -123,7 +138,7 @@ class Schema(EnvelopeSchema):
         context: dict[str, Any] | None = None,
         envelope: Envelope | None = None,
     ) -> None:
-        self._orm_instance = instance
+        self._instance = instance
         super().__init__(
             only=only,
             exclude=exclude,
@@ -136,6 +151,33 @@ class Schema(EnvelopeSchema):
             context=context,
         )
 
+    @property
+    def _orm_instance(self) -> Any | None:
+        if (bound := _load_instance.get()) is not None and bound[0] is self:
+            return bound[1]
+        return self._instance
+
+    def load(
+        self,
+        data: Mapping[str, Any] | Iterable[Mapping[str, Any]],
+        *,
+        instance: Any | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Deserialize data, optionally applying it to an existing ORM instance.
+
+        Passing ``instance`` here instead of to the constructor allows a single schema
+        object to be shared between threads and requests.
+        """
+        if instance is None:
+            return super().load(data, **kwargs)
+
+        token = _load_instance.set((self, instance))
+        try:
+            return super().load(data, **kwargs)
+        finally:
+            _load_instance.reset(token)
+
     @post_load
     def make_instance(self, data: dict[str, Any], **kwargs: Any) -> Any:
         instance = self._orm_instance
@@ -4,31 +4,23 @@ import importlib.metadata
 from collections.abc import Callable
 from typing import Generic
 from typing import ParamSpec
+from typing import TYPE_CHECKING
 from typing import TypedDict
 from typing import TypeVar
 
-import httpx  # noqa: F401
 from flask import Flask
 from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter as OTLPGRPCSpanExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as OTLPHTTPSpanExporter
-from opentelemetry.exporter.richconsole import RichConsoleSpanExporter
-from opentelemetry.instrumentation.flask import FlaskInstrumentor
-from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
-from opentelemetry.instrumentation.jinja2 import Jinja2Instrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from opentelemetry.instrumentation.system_metrics import SystemMetricsInstrumentor
-from opentelemetry.metrics import set_meter_provider
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from sqlalchemy.engine import Engine
 
 from basingse import svcs
 
+# Exporters, instrumentors and the SDK are imported only when they are configured, since
+# importing them (especially gRPC) is a significant part of application start up time.
+if TYPE_CHECKING:
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+
 
 class MetricsSettings(TypedDict):
     system: bool
@@ -76,26 +68,40 @@ def once(f: Callable[P, R]) -> Once[P, R]:
 
 
 @once
-def init_trace_provider(resource: Resource, otlp: OTLPSettings | None = None, console: bool = True) -> TracerProvider:
+def init_trace_provider(
+    resource: "Resource", otlp: OTLPSettings | None = None, console: bool = True
+) -> "TracerProvider":
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
     provider = TracerProvider(resource=resource)
     trace.set_tracer_provider(provider)
 
     if console:
+        from opentelemetry.exporter.richconsole import RichConsoleSpanExporter
+
         span_processor = BatchSpanProcessor(RichConsoleSpanExporter())
         provider.add_span_processor(span_processor)
 
     if otlp:
         otlp_exporter = None
         if otlp.get("http"):
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter as OTLPHTTPSpanExporter
+
             print(f"configuring with otlp/http {otlp['http']}")
             otlp_exporter = OTLPHTTPSpanExporter(endpoint=otlp["http"])
         elif otlp.get("grpc"):
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter as OTLPGRPCSpanExporter
+
             print(f"configuring with otlp/grpc {otlp['grpc']}")
             otlp_exporter = OTLPGRPCSpanExporter(endpoint=otlp["grpc"])
         if otlp_exporter:
             span_processor = BatchSpanProcessor(otlp_exporter)
             provider.add_span_processor(span_processor)
 
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.instrumentation.jinja2 import Jinja2Instrumentor
+
     HTTPXClientInstrumentor().instrument()
     Jinja2Instrumentor().instrument()
 
@@ -103,15 +109,23 @@ def init_trace_provider(resource: Resource, otlp: OTLPSettings | None = None, co
 
 
 @once
-def init_metrics_provider(system: bool = True, console: bool = True) -> MeterProvider:
+def init_metrics_provider(system: bool = True, console: bool = True) -> "MeterProvider":
+    from opentelemetry.metrics import set_meter_provider
+    from opentelemetry.sdk.metrics import MeterProvider
+
     exporters = []
     if console:
+        from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
         exporter = ConsoleMetricExporter()
         exporters.append(PeriodicExportingMetricReader(exporter=exporter))
     meter_provider = MeterProvider(exporters)
     set_meter_provider(meter_provider)
 
     if system:
+        from opentelemetry.instrumentation.system_metrics import SystemMetricsInstrumentor
+
         SystemMetricsInstrumentor().instrument()
     return meter_provider
 
@@ -146,6 +160,10 @@ class OpenTelemetry:
         self.init_metrics(app)
 
     def init_tracing(self, app: Flask) -> None:
+        from opentelemetry.instrumentation.flask import FlaskInstrumentor
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+        from opentelemetry.sdk.resources import Resource
+
         print(f"configuring with {self.tracing}")
         resource = Resource(attributes=attributes(app))
         init_trace_provider(resource=resource, **self.tracing)
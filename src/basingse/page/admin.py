@@ -6,6 +6,7 @@ from typing import TypeVar
 
 import httpx
 import structlog
+from flask import abort
 from flask import current_app
 from flask import jsonify
 from flask import request
@@ -15,15 +16,30 @@ from flask_login import user_loaded_from_request
 from flask_login import user_unauthorized
 from sqlalchemy import select
 from sqlalchemy.orm import Session
+from werkzeug.exceptions import BadRequest
 
 from .extension import get_extension
 from .models import Page
+from .models.blocks import BlockContent
+from .patch import apply
+from .patch import Operation
+from .patch import PatchError
+from .search import search
 from basingse import svcs
+from basingse.admin.extension import action
 from basingse.admin.extension import AdminView
+from basingse.admin.extension import NoItemFound
+from basingse.admin.extension import on_update
 from basingse.admin.portal import PortalMenuItem
 from basingse.admin.views import portal
+from basingse.attachments.dedup import deduplicate
+from basingse.attachments.ingest import ingest
+from basingse.attachments.ingest import receive
 from basingse.auth.extension import get_extension as get_auth_extension
 from basingse.auth.models import User
+from basingse.http import download
+from basingse.http import DownloadError
+from basingse.http import HTTPSettings
 
 logger = structlog.get_logger()
 
@@ -35,14 +51,54 @@ class PageAdmin(AdminView, blueprint=portal):
     model = Page
     nav = PortalMenuItem("Pages", "admin.page.list", "file-text", "page.view")
 
-    def query(self) -> Any:
-        session = svcs.get(Session)
-        return session.scalars(select(Page).order_by(Page.slug).execution_options(include_unpublished=True))
+    def select(self) -> Any:
+        if terms := request.args.get("q", "").strip():
+            return search(svcs.get(Session), terms).execution_options(include_unpublished=True)
+        return select(Page).order_by(Page.slug).execution_options(include_unpublished=True)
 
     def single(self, id: str) -> Any:
         session = svcs.get(Session)
         return session.scalar(select(Page).where(Page.id == id).execution_options(include_unpublished=True))
 
+    @action(permission="edit", url="/<key>/blocks/", methods=["GET", "PATCH"])
+    def blocks(self, id: str) -> ResponseReturnValue:
+        """The page's blocks, or apply block-level operations to them
+
+        ``PATCH`` accepts ``{"operations": [...]}`` (see :mod:`basingse.page.patch`), and returns the new
+        version of the contents. Send the version you edited in ``If-Match`` to reject conflicting edits.
+        """
+        page = self.single(id=id)
+        if page is None:
+            raise NoItemFound(Page, {"id": id})
+
+        if request.method == "PATCH":
+            if request.if_match and not request.if_match.contains(page.contents_version):
+                abort(412, description="The page has changed since it was loaded")
+
+            data = request.json
+            if not isinstance(data, dict):
+                raise BadRequest("No JSON data provided")
+
+            operations = Operation.Schema(many=True).load(data.get("operations", []))
+            content = apply(page.blocks, operations)
+
+            if operations:
+                page.blocks = content
+                session = svcs.get(Session)
+                session.commit()
+                on_update.send(self.__class__, id=id)
+            response = jsonify({"version": page.contents_version, "blocks": len(content.blocks)})
+        else:
+            response = jsonify({"version": page.contents_version, "contents": BlockContent.Schema().dump(page.blocks)})
+
+        response.set_etag(page.contents_version)
+        return response
+
+
+@portal.errorhandler(PatchError)
+def handle_patch_error(error: PatchError) -> ResponseReturnValue:
+    return jsonify({"error": str(error)}), 400
+
 
 F = TypeVar("F", bound=Callable[..., ResponseReturnValue])
 
@@ -119,9 +175,7 @@ def upload() -> ResponseReturnValue:
 
     session = svcs.get(Session)
 
-    attachment = Attachment()
-    attachment.receive(image)
-
+    attachment = deduplicate(session, receive(Attachment(), image))
     session.add(attachment)
     session.commit()
 
@@ -149,15 +203,20 @@ def fetch() -> ResponseReturnValue:
     if target_url is None:
         raise EditorJSException("No 'url' provided in JSON data")
 
-    client = svcs.get(httpx.Client)
-    response = client.get(target_url)
-    if response.status_code != 200:
-        raise EditorJSException(f"Failed to fetch file, got status code: {response.status_code}")
-
+    client, settings = svcs.get(httpx.Client, HTTPSettings)
     attachment = Attachment()
-    attachment.data(response.content)
+    try:
+        with download(client, target_url, settings) as (response, reader):
+            attachment.content_type = response.headers.get("content-type")
+            ingest(attachment, reader)
+    except httpx.HTTPStatusError as exc:
+        raise EditorJSException(f"Failed to fetch file, got status code: {exc.response.status_code}") from exc
+    except (httpx.HTTPError, DownloadError) as exc:
+        logger.warning("Failed to fetch file", url=target_url, error=str(exc))
+        raise EditorJSException(f"Failed to fetch file: {exc}") from exc
 
     session = svcs.get(Session)
+    attachment = deduplicate(session, attachment)
     session.add(attachment)
     session.commit()
 
@@ -0,0 +1,70 @@
+import datetime as dt
+from pathlib import Path
+
+import click
+import structlog
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.orm import Session
+
+from .export import export_site
+from .revisions import prune
+from .search import rebuild
+from basingse import svcs
+
+log = structlog.get_logger(__name__)
+
+page_cli = AppGroup("page", help="Tools for pages")
+
+
+@page_cli.command()
+def reindex() -> None:
+    """Rebuild the full text search index for pages"""
+    session = svcs.get(Session)
+    indexed = rebuild(session)
+    session.commit()
+    click.echo(f"Indexed {indexed} pages")
+
+
+@page_cli.command("export-static")
+@click.argument("output", type=click.Path(file_okay=False, path_type=Path))
+@click.option("-j", "--workers", type=int, default=None, help="Number of worker processes, defaults to the CPU count")
+@click.option("--prune/--no-prune", default=True, help="Remove files which are no longer part of the site")
+def export_static(output: Path, workers: int | None, prune: bool) -> None:
+    """Render published pages, and the files they use, to a static site in OUTPUT"""
+    report = export_site(current_app._get_current_object(), output, workers=workers, prune=prune)  # type: ignore
+
+    click.echo(
+        f"Exported {len(report.pages)} pages and {len(report.files)} files in {report.elapsed:.2f}s "
+        f"({report.rate:.1f} pages/s), {report.written} written, {len(report.removed)} removed"
+    )
+    for error in report.missing:
+        click.echo(f"Warning: {error}", err=True)
+    for error in report.failed:
+        click.echo(str(error), err=True)
+    if report.failed:
+        raise click.ClickException(f"{len(report.failed)} pages failed to export")
+
+
+@page_cli.group()
+def revisions() -> None:
+    """Manage the revision history of pages"""
+
+
+@revisions.command("prune")
+@click.option("--keep", type=click.IntRange(min=1), default=50, show_default=True, help="Revisions kept for each page")
+@click.option(
+    "--older-than",
+    type=click.IntRange(min=0),
+    default=None,
+    metavar="DAYS",
+    help="Only remove revisions older than DAYS",
+)
+def prune_revisions(keep: int, older_than: int | None) -> None:
+    """Remove old revisions of pages"""
+    before = dt.datetime.now(dt.UTC) - dt.timedelta(days=older_than) if older_than is not None else None
+
+    session = svcs.get(Session)
+    removed, pages = prune(session, keep=keep, before=before)
+    session.commit()
+    click.echo(f"Removed {removed} revisions from {pages} pages")
@@ -0,0 +1,324 @@
+"""Export published pages as a static site.
+
+Every published page, and the homepage, is rendered by its real view (through the test client), so
+the export matches what visitors see. Files referenced by the pages (attachments, logos and static
+files) are exported too, along with every asset in the :class:`~basingse.assets.Assets` manifests.
+
+Pages are rendered in a process pool. Each file's digest is recorded in ``.export.json`` in the output
+directory, and a file is only rewritten when its digest changes, so repeated exports touch only the
+pages which changed, which keeps syncing the output to a CDN cheap. Files which are no longer part of the
+site are removed.
+
+URLs ending in ``/`` are written as ``index.html``, or ``index`` with an extension for other types of
+files. The content type of each file is also recorded in ``.export.json``.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import attrs
+import structlog
+from flask import current_app
+from flask import Flask
+from flask import url_for
+from sqlalchemy import Engine
+from sqlalchemy import make_url
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+
+from .models import Page
+from basingse import svcs
+from basingse.assets import Assets
+
+log = structlog.get_logger(__name__)
+
+#: Name of the file which records the exported files
+MANIFEST = ".export.json"
+
+#: Endpoints whose URLs are exported when a page links to them
+FILE_ENDPOINTS = re.compile(r"^(assets|static|.*\.static|attachments\..*|customize\.(logo|favicon).*)$")
+
+_ATTRIBUTES = re.compile(r"""\b(src|srcset|href)\s*=\s*["']([^"']+)["']""")
+
+# The application used by worker processes, which inherit it when they are forked
+_app: Flask | None = None
+
+
+class ExportError(Exception):
+    """A page or file could not be exported"""
+
+    def __init__(self, url: str, status: int) -> None:
+        super().__init__(url, status)
+        self.url = url
+        self.status = status
+
+    def __str__(self) -> str:
+        return f"Unable to export {self.url}: {self.status}"
+
+
+@attrs.frozen
+class Exported:
+    """A single exported file"""
+
+    url: str
+    path: str
+    digest: str
+    content_type: str
+
+    #: Whether the file was written, or was unchanged since the last export
+    written: bool
+
+    #: URLs of files referenced by this file
+    references: tuple[str, ...] = ()
+
+
+@attrs.define
+class Report:
+    """The result of an export"""
+
+    pages: list[Exported] = attrs.field(factory=list)
+    files: list[Exported] = attrs.field(factory=list)
+    removed: list[str] = attrs.field(factory=list)
+
+    #: Pages which could not be rendered
+    failed: list[ExportError] = attrs.field(factory=list)
+
+    #: Files referenced by pages which could not be exported, usually broken links
+    missing: list[ExportError] = attrs.field(factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def written(self) -> int:
+        return sum(1 for item in self.pages + self.files if item.written)
+
+    @property
+    def rate(self) -> float:
+        return len(self.pages) / self.elapsed if self.elapsed else 0.0
+
+
+def target(url: str, content_type: str) -> str:
+    """The path in the export for a URL"""
+    path = urlsplit(url).path.lstrip("/")
+    if not path or path.endswith("/"):
+        extension = ".html" if content_type == "text/html" else mimetypes.guess_extension(content_type) or ""
+        path += f"index{extension}"
+    return path
+
+
+def references(html: str) -> Iterator[str]:
+    """Local URLs of files referenced by a page"""
+    server = current_app.config.get("SERVER_NAME")
+    adapter = current_app.url_map.bind(server or "localhost")
+
+    for attribute, value in _ATTRIBUTES.findall(html):
+        urls = (
+            [candidate.split()[0] for candidate in value.split(",") if candidate.strip()]
+            if attribute == "srcset"
+            else [value]
+        )
+        for url in urls:
+            parts = urlsplit(url)
+            if parts.scheme not in ("", "http", "https") or (parts.netloc and parts.netloc != server):
+                continue
+            if not parts.path.startswith("/"):
+                continue
+            if attribute == "href":
+                try:
+                    endpoint, _ = adapter.match(parts.path)
+                except HTTPException:
+                    continue
+                if not FILE_ENDPOINTS.match(endpoint):
+                    continue
+            yield parts.path
+
+
+def export(app: Flask, url: str, output: Path, previous: str | None = None) -> Exported:
+    """Render a URL and write it to the output directory, unless it is unchanged"""
+    with app.test_client() as client:
+        response = client.get(url)
+        try:
+            if response.status_code != 200:
+                raise ExportError(url, response.status_code)
+            data = response.get_data()
+        finally:
+            response.close()
+
+    content_type = response.mimetype or "application/octet-stream"
+    path = target(url, content_type)
+    digest = hashlib.sha256(data).hexdigest()
+    destination = output / path
+
+    written = digest != previous or not destination.exists()
+    if written:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=destination.parent, prefix=".export-", delete=False) as file:
+            file.write(data)
+        os.replace(file.name, destination)
+
+    found: tuple[str, ...] = ()
+    if content_type == "text/html":
+        with app.app_context():
+            charset = response.mimetype_params.get("charset", "utf-8")
+            found = tuple(dict.fromkeys(references(data.decode(charset, errors="replace"))))
+
+    return Exported(url, path, digest, content_type, written, found)
+
+
+def _export_in_worker(url: str, output: Path, previous: str | None) -> Exported:
+    assert _app is not None, "Worker process was not forked from the exporting process"
+    return export(_app, url, output, previous)
+
+
+def _initialize_worker() -> None:
+    # Connections inherited from the parent process can't be shared, so workers open their own.
+    assert _app is not None, "Worker process was not forked from the exporting process"
+    with _app.app_context():
+        svcs.get(Engine).dispose(close=False)
+
+
+def home_urls(app: Flask) -> list[str]:
+    """URL of the homepage, if the site has one"""
+    if "customize.home" not in app.view_functions:
+        return []
+    with app.test_request_context():
+        return [url_for("customize.home")]
+
+
+def page_urls(app: Flask) -> list[str]:
+    """URLs of every published page"""
+    with app.app_context():
+        session = svcs.get(Session)
+        slugs = session.scalars(select(Page.slug).where(Page.is_published).order_by(Page.slug)).all()
+
+    with app.test_request_context():
+        return [url_for("page.page", slug=slug) for slug in slugs]
+
+
+def asset_urls(app: Flask) -> list[str]:
+    """URLs of every asset in the application's manifests"""
+    if "assets" not in app.view_functions:
+        return []
+
+    with app.test_request_context():
+        assets = svcs.get(Assets)
+        return sorted({manifest.url(name) for manifest in assets.manifests for name in manifest})
+
+
+def _in_memory(app: Flask) -> bool:
+    with app.app_context():
+        databases = [svcs.get(Engine).url.database]
+    if attachments := app.config.get("ATTACHMENTS_DATABASE_URI"):
+        databases.append(make_url(attachments).database)
+    return any(database in (None, "", ":memory:") for database in databases)
+
+
+class _Inline(concurrent.futures.Executor):
+    def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def _executor(app: Flask, workers: int) -> concurrent.futures.Executor:
+    if workers <= 1:
+        return _Inline()
+    if "fork" not in multiprocessing.get_all_start_methods():
+        log.warning("Pages can only be rendered in parallel where processes can be forked, exporting serially")
+        return _Inline()
+    if _in_memory(app):
+        log.warning("An in-memory database can't be shared with worker processes, exporting serially")
+        return _Inline()
+
+    return concurrent.futures.ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("fork"), initializer=_initialize_worker
+    )
+
+
+def _run(
+    executor: concurrent.futures.Executor,
+    urls: Iterable[str],
+    output: Path,
+    previous: dict[str, Any],
+    failed: list[ExportError],
+) -> list[Exported]:
+    futures = []
+    for url in urls:
+        futures.append(executor.submit(_export_in_worker, url, output, previous.get(url, {}).get("digest")))
+
+    exported = []
+    for future in futures:
+        try:
+            exported.append(future.result())
+        except ExportError as exc:
+            log.warning("Unable to export", url=exc.url, status=exc.status)
+            failed.append(exc)
+    return exported
+
+
+def export_site(app: Flask, output: Path, workers: int | None = None, prune: bool = True) -> Report:
+    """Export the homepage, every published page and the files they use to ``output``"""
+    global _app
+
+    start = time.perf_counter()
+    output.mkdir(parents=True, exist_ok=True)
+    manifest = output / MANIFEST
+    previous = {entry["url"]: entry for entry in json.loads(manifest.read_text())["files"]} if manifest.exists() else {}
+
+    report = Report()
+    _app = app
+    try:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        with _executor(app, workers) as executor:
+            # The homepage is rendered first, as the site's default homepage is created on its first visit.
+            report.pages = _run(_Inline(), home_urls(app), output, previous, report.failed)
+            report.pages += _run(executor, page_urls(app), output, previous, report.failed)
+
+            pages = {page.url for page in report.pages}
+            files = dict.fromkeys(url for page in report.pages for url in page.references if url not in pages)
+            files.update(dict.fromkeys(asset_urls(app)))
+            report.files = _run(executor, files, output, previous, report.missing)
+    finally:
+        _app = None
+
+    exported = report.pages + report.files
+    current = {item.path for item in exported}
+    stale = [entry for entry in previous.values() if entry["path"] not in current]
+
+    # A page which couldn't be rendered keeps its last export, but the files it references aren't known,
+    # so nothing is pruned. Stale entries stay in the manifest, so that a later export can prune them.
+    if prune and not report.failed:
+        unavailable = {error.url for error in report.missing}
+        kept = [entry for entry in stale if entry["url"] in unavailable]
+        for entry in stale:
+            if entry["url"] not in unavailable:
+                (output / entry["path"]).unlink(missing_ok=True)
+                report.removed.append(entry["path"])
+    else:
+        kept = stale
+
+    entries = [
+        {"url": item.url, "path": item.path, "digest": item.digest, "content_type": item.content_type}
+        for item in exported
+    ]
+    manifest.write_text(json.dumps({"files": entries + kept}, indent=2))
+
+    report.elapsed = time.perf_counter() - start
+    log.info("Exported static site", pages=len(report.pages), files=len(report.files), written=report.written)
+    return report
@@ -10,7 +10,10 @@ class EditorWidget:
     def __call__(self, field: Field, **kwargs: Any) -> Markup:
         kwargs.setdefault("id", field.id)
         params = html_params(type="hidden", id=field.id, value=field._value(), name=field.name)
-        return Markup(f'<div class="editor-js"><input {params}/></div>')
+
+        # Data attributes configure the editor, e.g. data-blocks-url enables saving individual blocks.
+        data = {name: value for name, value in kwargs.items() if name.startswith("data-")}
+        return Markup(f"<div {html_params(class_='editor-js', **data)}><input {params}/></div>")
 
 
 class EditorField(StringField):
@@ -1,3 +1,4 @@
 from .page import Page
+from .revision import PageRevision
 
-__all__ = ["Page"]
+__all__ = ["Page", "PageRevision"]
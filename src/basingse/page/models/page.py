@@ -1,21 +1,33 @@
+import hashlib
+from uuid import UUID
+
 from bootlace.forms.fields import SLUG_VALIDATOR
 from bootlace.table.columns import ActionColumn
 from bootlace.table.columns import Column
 from flask import url_for
 from marshmallow import fields
+from sqlalchemy import func
+from sqlalchemy import select
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy.orm import Session
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from wtforms.validators import DataRequired
 
 from ..forms import EditorField
 from .blocks import BlockContent
+from basingse.attachments.dedup import reference_counter
 from basingse.models import Model
 from basingse.models import orm
 from basingse.publish import PublishMixin
 
 
+def contents_version(contents: str) -> str:
+    """Version of a page's contents, a digest of the editor.js document"""
+    return hashlib.sha256(contents.encode("utf-8")).hexdigest()[:32]
+
+
 class Page(Model, PublishMixin):
     title: Mapped[str] = mapped_column(
         String(),
@@ -52,6 +64,11 @@ class Page(Model, PublishMixin):
         """URL for this page"""
         return url_for("page.page", slug=self.slug)
 
+    @property
+    def contents_version(self) -> str:
+        """Version of the page's contents, used to detect conflicting edits"""
+        return contents_version(self.contents)
+
     @property
     def blocks(self) -> BlockContent:
         """List of block types in the page"""
@@ -63,3 +80,10 @@ class Page(Model, PublishMixin):
         """Set blocks from schema"""
         schema = BlockContent.Schema()
         self.contents = schema.dumps(value)
+
+
+@reference_counter
+def page_references(session: Session, id: UUID) -> int:
+    """Count pages which embed an attachment, e.g. in an image block"""
+    query = select(func.count()).select_from(Page).where(Page.contents.contains(str(id)))
+    return session.scalar(query.execution_options(include_unpublished=True)) or 0
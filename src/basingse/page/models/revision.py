@@ -0,0 +1,35 @@
+from uuid import UUID
+
+from sqlalchemy import Boolean
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import Text
+from sqlalchemy import UniqueConstraint
+from sqlalchemy import Uuid
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+
+from basingse.models import Model
+
+
+class PageRevision(Model):
+    """
+    A revision of a page's contents, stored as a full snapshot or as the changes since the previous revision
+    """
+
+    __table_args__ = (UniqueConstraint("page_id", "number"),)
+
+    page_id: Mapped[UUID] = mapped_column(Uuid(), ForeignKey("page.id", ondelete="CASCADE"), nullable=False, index=True)
+    number: Mapped[int] = mapped_column(Integer, nullable=False, doc="Revision number, counting from 1 for each page")
+    snapshot: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=False,
+        doc="Whether data holds the full contents, rather than operations applied to the previous revision",
+    )
+    version: Mapped[str] = mapped_column(String(32), nullable=False, doc="Version of the page's contents")
+    data: Mapped[str] = mapped_column(Text(), nullable=False, doc="Contents, or operations, as JSON")
+
+    def __repr__(self) -> str:
+        return f"<PageRevision page={self.page_id} number={self.number}>"
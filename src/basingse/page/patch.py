@@ -0,0 +1,104 @@
+"""Block-level changes to a page's contents.
+
+The editor saves a page by sending the operations made since its last save, rather than the whole
+editor.js document. Each operation refers to a block by its editor.js ``id``::
+
+    {"op": "insert", "block": {"id": "a1", "type": "paragraph", "data": {...}}, "index": 2}
+    {"op": "update", "block": {"id": "a1", "type": "paragraph", "data": {...}}}
+    {"op": "move", "id": "a1", "index": 0}
+    {"op": "delete", "id": "a1"}
+
+Operations are applied in order, and either all of them are applied or none are. Inserting without an
+``index`` appends the block.
+"""
+
+import dataclasses as dc
+import datetime as dt
+from typing import Any
+
+from marshmallow import fields
+from marshmallow import post_load
+from marshmallow import validate
+from marshmallow import validates_schema
+from marshmallow import ValidationError
+from marshmallow.schema import Schema as BaseSchema
+
+from .models.blocks import Block
+from .models.blocks import BlockContent
+
+#: Supported operations
+OPERATIONS = ("insert", "update", "move", "delete")
+
+
+class PatchError(ValueError):
+    """An operation could not be applied to the page's blocks"""
+
+
+@dc.dataclass
+class Operation:
+    op: str
+    id: str
+    block: Block | None = None
+    index: int | None = None
+
+    class Schema(BaseSchema):
+        op = fields.String(required=True, validate=validate.OneOf(OPERATIONS))
+        id = fields.String(load_default=None)
+        block = fields.Nested(Block.Schema, load_default=None)
+        index = fields.Integer(load_default=None, validate=validate.Range(min=0))
+
+        @validates_schema
+        def validate_operation(self, data: dict[str, Any], **kwargs: Any) -> None:
+            if data["op"] in ("insert", "update"):
+                if data["block"] is None:
+                    raise ValidationError(f"A block is required to {data['op']}", field_name="block")
+                if not data["block"].id:
+                    raise ValidationError("Blocks must have an id", field_name="block")
+            elif not data["id"]:
+                raise ValidationError(f"A block id is required to {data['op']}", field_name="id")
+            if data["op"] == "move" and data["index"] is None:
+                raise ValidationError("An index is required to move a block", field_name="index")
+
+        @post_load
+        def make(self, data: dict[str, Any], **kwargs: Any) -> "Operation":
+            if data["block"] is not None:
+                data["id"] = data["block"].id
+            return Operation(**data)
+
+
+def _position(blocks: list[Block], id: str) -> int:
+    for position, block in enumerate(blocks):
+        if block.id == id:
+            return position
+    raise PatchError(f"No block with id {id!r}")
+
+
+def _check_index(blocks: list[Block], index: int) -> int:
+    if index > len(blocks):
+        raise PatchError(f"Index {index} is out of range for {len(blocks)} blocks")
+    return index
+
+
+def apply(content: BlockContent, operations: list[Operation]) -> BlockContent:
+    """Apply operations to a copy of the content"""
+    blocks = list(content.blocks)
+
+    for operation in operations:
+        match operation.op:
+            case "insert":
+                assert operation.block is not None
+                if any(block.id == operation.id for block in blocks):
+                    raise PatchError(f"A block with id {operation.id!r} already exists")
+                index = len(blocks) if operation.index is None else _check_index(blocks, operation.index)
+                blocks.insert(index, operation.block)
+            case "update":
+                assert operation.block is not None
+                blocks[_position(blocks, operation.id)] = operation.block
+            case "move":
+                assert operation.index is not None
+                block = blocks.pop(_position(blocks, operation.id))
+                blocks.insert(_check_index(blocks, operation.index), block)
+            case "delete":
+                del blocks[_position(blocks, operation.id)]
+
+    return dc.replace(content, blocks=blocks, time=dt.datetime.now(dt.UTC))
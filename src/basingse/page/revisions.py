@@ -0,0 +1,274 @@
+"""Revision history for pages.
+
+A revision is recorded whenever a page's contents are flushed. Storing a full copy of the contents for
+every save would make history cost many times the size of the page, so most revisions only store the
+block-level operations (see :mod:`basingse.page.patch`) which turn the previous revision into this one.
+A full snapshot is stored for the first revision, every ``revision_snapshot_interval`` revisions (see
+:class:`~basingse.page.settings.PageSettings`), and whenever the operations would be larger than the
+contents. Reconstructing a revision loads the nearest snapshot at or before it and applies the
+operations after it, so it never reads more than ``revision_snapshot_interval`` rows.
+
+``flask page revisions prune`` removes old revisions, turning the oldest revision it keeps into a
+snapshot so that the remaining history can still be reconstructed.
+"""
+
+import dataclasses as dc
+import datetime as dt
+import itertools
+import json
+from typing import Any
+from uuid import UUID
+
+import structlog
+from flask import current_app
+from flask import has_app_context
+from marshmallow import ValidationError
+from sqlalchemy import Connection
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import UOWTransaction
+
+from .models import Page
+from .models import PageRevision
+from .models.blocks import Block
+from .models.blocks import BlockContent
+from .models.page import contents_version
+from .patch import apply
+from .patch import Operation
+from .settings import PageSettings
+from .settings import SETTINGS_KEY
+
+log = structlog.get_logger(__name__)
+
+#: Attempts to record a revision when another save takes the same revision number
+RECORD_ATTEMPTS = 3
+
+
+def snapshot_interval() -> int:
+    """Revisions between full snapshots for the current application"""
+    settings = current_app.extensions.get(SETTINGS_KEY) if has_app_context() else None
+    return (settings or PageSettings()).revision_snapshot_interval
+
+
+def diff(old: BlockContent, new: BlockContent) -> list[dict[str, Any]] | None:
+    """Operations which turn the old blocks into the new ones, or ``None`` if blocks can't be matched by id"""
+    ids = [block.id for block in itertools.chain(old.blocks, new.blocks)]
+    if not all(ids) or len({block.id for block in old.blocks}) != len(old.blocks):
+        return None
+    if len({block.id for block in new.blocks}) != len(new.blocks):
+        return None
+
+    schema = Block.Schema()
+    new_ids = {block.id for block in new.blocks}
+    operations: list[dict[str, Any]] = [{"op": "delete", "id": b.id} for b in old.blocks if b.id not in new_ids]
+
+    current = [block for block in old.blocks if block.id in new_ids]
+    previous = {block.id: block for block in current}
+
+    # After each step, the first ``index + 1`` blocks match the new blocks.
+    for index, block in enumerate(new.blocks):
+        if block.id not in previous:
+            operations.append({"op": "insert", "block": schema.dump(block), "index": index})
+            current.insert(index, block)
+            continue
+
+        if current[index].id != block.id:
+            operations.append({"op": "move", "id": block.id, "index": index})
+            current.remove(previous[block.id])
+            current.insert(index, previous[block.id])
+
+        if schema.dump(previous[block.id]) != schema.dump(block):
+            operations.append({"op": "update", "block": schema.dump(block)})
+
+    return operations
+
+
+def _load(revision: Any, content: BlockContent | None) -> BlockContent:
+    data = json.loads(revision.data)
+    if revision.snapshot:
+        return BlockContent.Schema().load(data)
+
+    if content is None:
+        raise ValueError(f"Revision {revision.number} of page {revision.page_id} has no snapshot to apply it to")
+    content = apply(content, Operation.Schema(many=True).load(data["operations"]))
+    metadata = BlockContent.Schema().load({"blocks": [], **data["metadata"]})
+    return dc.replace(content, version=metadata.version, time=metadata.time)
+
+
+def reconstruct(session: Session, page_id: UUID, number: int | None = None) -> BlockContent:
+    """The contents of a page at a revision, or at its latest revision"""
+    if number is None:
+        number = session.scalar(select(func.max(PageRevision.number)).where(PageRevision.page_id == page_id))
+        if number is None:
+            raise LookupError(f"Page {page_id} has no revisions")
+
+    start = (
+        select(func.max(PageRevision.number))
+        .where(PageRevision.page_id == page_id, PageRevision.snapshot, PageRevision.number <= number)
+        .scalar_subquery()
+    )
+    revisions = session.execute(
+        select(PageRevision.page_id, PageRevision.number, PageRevision.snapshot, PageRevision.data)
+        .where(PageRevision.page_id == page_id, PageRevision.number >= start, PageRevision.number <= number)
+        .order_by(PageRevision.number)
+    ).all()
+    if not revisions or revisions[-1].number != number:
+        raise LookupError(f"Page {page_id} has no revision {number}")
+
+    content = None
+    for revision in revisions:
+        content = _load(revision, content)
+    assert content is not None
+    return content
+
+
+def _snapshot(contents: str) -> str:
+    # Stored in the same form as the operations, so that sizes are comparable.
+    try:
+        return json.dumps(json.loads(contents), separators=(",", ":"))
+    except ValueError:
+        return contents
+
+
+def _latest(connection: Connection, page_id: UUID) -> tuple[int | None, int | None]:
+    """The number of the latest revision of a page, and of its latest snapshot"""
+    number, snapshot = connection.execute(
+        select(
+            func.max(PageRevision.number).label("number"),
+            func.max(PageRevision.number).filter(PageRevision.snapshot).label("snapshot"),
+        ).where(PageRevision.page_id == page_id)
+    ).one()
+    return number, snapshot
+
+
+def record(connection: Connection, page: Page, previous: str | None) -> None:
+    """Record a revision for the page's current contents, given its contents at the latest revision
+
+    Concurrent saves of a page take turns where the database can lock the page's row. Elsewhere, a save
+    which loses the race for a revision number retries in a savepoint, rather than failing the flush.
+    """
+    connection.execute(select(Page.id).where(Page.id == page.id).with_for_update())
+
+    for attempt in range(1, RECORD_ATTEMPTS + 1):
+        try:
+            with connection.begin_nested():
+                _record(connection, page, previous)
+        except IntegrityError:
+            if attempt == RECORD_ATTEMPTS:
+                raise
+            log.warning("Page revision number was taken, retrying", page=page.id, attempt=attempt)
+        else:
+            return
+
+
+def _record(connection: Connection, page: Page, previous: str | None) -> None:
+    latest, snapshot_number = _latest(connection, page.id)
+    number = (latest or 0) + 1
+    version = contents_version(page.contents)
+
+    data: str | None = None
+    if previous is not None and snapshot_number is not None and number - snapshot_number < snapshot_interval():
+        # The previous contents are only a base for the operations if they are the latest revision.
+        base = connection.scalar(
+            select(PageRevision.version).where(PageRevision.page_id == page.id, PageRevision.number == latest)
+        )
+        if base == contents_version(previous):
+            data = _delta(previous, page.contents)
+
+    snapshot = _snapshot(page.contents)
+    if data is None or len(data) >= len(snapshot):
+        data = None
+
+    connection.execute(
+        insert(PageRevision),
+        {
+            "page_id": page.id,
+            "number": number,
+            "snapshot": data is None,
+            "version": version,
+            "data": snapshot if data is None else data,
+        },
+    )
+
+
+def _delta(previous: str, contents: str) -> str | None:
+    schema = BlockContent.Schema()
+    try:
+        old, new = schema.loads(previous), schema.loads(contents)
+    except (ValueError, ValidationError):
+        return None
+
+    if (operations := diff(old, new)) is None:
+        return None
+    metadata = BlockContent.Schema(exclude=("blocks",)).dump(new)
+    return json.dumps({"operations": operations, "metadata": metadata}, separators=(",", ":"))
+
+
+def _previous_contents(page: Page) -> str | None:
+    history = inspect(page).attrs.contents.history
+    return history.deleted[0] if history.deleted else None
+
+
+@event.listens_for(Session, "after_flush")
+def _record_revisions(session: Session, flush_context: UOWTransaction) -> None:
+    changed = [
+        obj
+        for obj in itertools.chain(session.new, session.dirty)
+        if isinstance(obj, Page) and obj.contents is not None and inspect(obj).attrs.contents.history.has_changes()
+    ]
+    if not changed:
+        return
+
+    connection = session.connection()
+    for page in changed:
+        record(connection, page, _previous_contents(page))
+
+
+def prune(session: Session, keep: int, before: dt.datetime | None = None) -> tuple[int, int]:
+    """Remove all but the latest ``keep`` revisions of each page, returning the revisions and pages pruned
+
+    When ``before`` is given, only revisions created before it are removed.
+    """
+    if keep < 1:
+        raise ValueError(f"At least one revision must be kept, got {keep}")
+
+    pages = session.execute(
+        select(PageRevision.page_id, func.min(PageRevision.number), func.max(PageRevision.number))
+        .group_by(PageRevision.page_id)
+        .having(func.count() > keep)
+    ).all()
+
+    removed = pruned = 0
+    for page_id, first, latest in pages:
+        oldest = latest - keep + 1
+        if before is not None:
+            newer = session.scalar(
+                select(func.min(PageRevision.number)).where(
+                    PageRevision.page_id == page_id, PageRevision.created >= before
+                )
+            )
+            oldest = min(oldest, newer if newer is not None else latest)
+        if oldest <= first:
+            continue
+
+        # The oldest revision kept becomes a snapshot, as the revisions it is based on are removed.
+        condition = (PageRevision.page_id == page_id) & (PageRevision.number == oldest)
+        if not session.scalar(select(PageRevision.snapshot).where(condition)):
+            contents = BlockContent.Schema().dumps(reconstruct(session, page_id, oldest))
+            session.execute(update(PageRevision).where(condition).values(snapshot=True, data=_snapshot(contents)))
+
+        result = session.execute(
+            delete(PageRevision).where(PageRevision.page_id == page_id, PageRevision.number < oldest)
+        )
+        removed += result.rowcount
+        pruned += 1
+
+    log.info("Pruned page revisions", revisions=removed, pages=pruned)
+    return removed, pruned
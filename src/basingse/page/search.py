@@ -0,0 +1,216 @@
+"""Full-text search over pages.
+
+The plain text of each page's title and blocks is kept in a ``page_search`` index, which is an FTS5
+virtual table on SQLite and a table with a weighted ``tsvector`` column on Postgres. The index is
+created alongside the ``page`` table, and is updated whenever pages are flushed. Existing databases
+can build it with ``flask page reindex``.
+
+Drafts are indexed too: :func:`search` selects :class:`Page` objects, so visitors only find published
+pages, while the admin can search with ``include_unpublished``. On other databases, :func:`search`
+falls back to a (slow) ``LIKE`` query.
+"""
+
+import itertools
+import re
+from collections.abc import Iterable
+from typing import Any
+
+import structlog
+from markupsafe import Markup
+from marshmallow import ValidationError
+from sqlalchemy import column
+from sqlalchemy import Connection
+from sqlalchemy import DDL
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import false
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy import literal_column
+from sqlalchemy import or_
+from sqlalchemy import Select
+from sqlalchemy import select
+from sqlalchemy import table
+from sqlalchemy import Text
+from sqlalchemy import text
+from sqlalchemy import Uuid
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import UOWTransaction
+from sqlalchemy.sql.expression import ColumnClause
+
+from .models import Page
+from .models.blocks import BlockContent
+
+log = structlog.get_logger(__name__)
+
+#: Fields of block data which hold searchable text
+TEXT_FIELDS = ("text", "caption")
+
+#: Text search configuration used on Postgres
+POSTGRES_CONFIG = "english"
+
+#: Relative weights of the title and body columns in SQLite's bm25 ranking
+SQLITE_WEIGHTS = (10.0, 1.0)
+
+_INDEX_KEY = "basingse.page.search"
+
+page_search = table(
+    "page_search",
+    column("page_id", Uuid()),
+    column("title", Text()),
+    column("body", Text()),
+)
+
+_DDL: dict[str, list[DDL]] = {
+    "sqlite": [
+        DDL(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS page_search "
+            "USING fts5(page_id UNINDEXED, title, body, tokenize = 'porter unicode61')"
+        ),
+    ],
+    "postgresql": [
+        DDL(
+            "CREATE TABLE IF NOT EXISTS page_search ("
+            "page_id UUID PRIMARY KEY REFERENCES page (id) ON DELETE CASCADE, "
+            "title TEXT NOT NULL, "
+            "body TEXT NOT NULL, "
+            "document TSVECTOR GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{POSTGRES_CONFIG}', title), 'A') || "
+            f"setweight(to_tsvector('{POSTGRES_CONFIG}', body), 'B')"
+            ") STORED)"
+        ),
+        DDL("CREATE INDEX IF NOT EXISTS page_search_document ON page_search USING GIN (document)"),
+    ],
+}
+
+for _dialect, _statements in _DDL.items():
+    for _statement in _statements:
+        event.listen(Page.__table__, "after_create", _statement.execute_if(dialect=_dialect))
+    event.listen(Page.__table__, "before_drop", DDL("DROP TABLE IF EXISTS page_search").execute_if(dialect=_dialect))
+
+
+def extract_text(content: BlockContent) -> str:
+    """The plain text of a page's blocks, without markup"""
+    parts = []
+    for block in content.blocks:
+        for name in TEXT_FIELDS:
+            if isinstance(value := getattr(block.data, name, None), str) and value:
+                parts.append(Markup(value).striptags())
+    return "\n".join(parts)
+
+
+def _document(page: Page) -> dict[str, Any]:
+    try:
+        body = extract_text(page.blocks)
+    except (ValueError, ValidationError):
+        log.warning("Unable to extract text for search", page=page.id, exc_info=True)
+        body = ""
+    return {"page_id": page.id, "title": page.title or "", "body": body}
+
+
+def create_index(connection: Connection) -> bool:
+    """Create the search index, returning whether this database supports one"""
+    for statement in _DDL.get(connection.dialect.name, []):
+        connection.execute(statement)
+    return connection.dialect.name in _DDL
+
+
+def has_index(connection: Connection) -> bool:
+    """Whether the search index exists in this database"""
+    if connection.dialect.name not in _DDL:
+        return False
+    if connection.info.get(_INDEX_KEY):
+        return True
+
+    # Only remember that the index exists, so that it is picked up once it is created.
+    exists = inspect(connection).has_table(page_search.name)
+    if exists:
+        connection.info[_INDEX_KEY] = True
+    return exists
+
+
+def index(connection: Connection, pages: Iterable[Page]) -> int:
+    """Add or replace pages in the search index, returning the number indexed"""
+    documents = [_document(page) for page in pages]
+    if not documents:
+        return 0
+
+    connection.execute(delete(page_search).where(page_search.c.page_id.in_([doc["page_id"] for doc in documents])))
+    connection.execute(insert(page_search), documents)
+    return len(documents)
+
+
+def unindex(connection: Connection, ids: Iterable[Any]) -> None:
+    """Remove pages from the search index"""
+    if ids := list(ids):
+        connection.execute(delete(page_search).where(page_search.c.page_id.in_(ids)))
+
+
+def rebuild(session: Session, chunk_size: int = 100) -> int:
+    """Create the search index if necessary, and index every page, returning the number indexed"""
+    connection = session.connection()
+    if not create_index(connection):
+        log.warning("Full text search is not supported on this database", dialect=connection.dialect.name)
+        return 0
+
+    connection.execute(delete(page_search))
+    pages = session.scalars(select(Page).execution_options(include_unpublished=True, yield_per=chunk_size))
+    return sum(index(connection, chunk) for chunk in pages.partitions())
+
+
+def _needs_index(page: Page) -> bool:
+    state = inspect(page)
+    return state.attrs.title.history.has_changes() or state.attrs.contents.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _update_index(session: Session, flush_context: UOWTransaction) -> None:
+    changed = [
+        obj for obj in itertools.chain(session.new, session.dirty) if isinstance(obj, Page) and _needs_index(obj)
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Page)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    if not has_index(connection):
+        return
+
+    unindex(connection, deleted)
+    index(connection, changed)
+
+
+def _fts5_query(terms: str) -> str | None:
+    # Quote every word, so that FTS5 query syntax in user input is matched literally,
+    # and match the last word as a prefix so that results appear while typing.
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search(session: Session, terms: str) -> Select[tuple[Page]]:
+    """A statement selecting pages which match the search terms, best match first"""
+    connection = session.connection()
+    dialect = connection.dialect.name
+
+    if not has_index(connection):
+        pattern = "%{}%".format(terms.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+        return (
+            select(Page)
+            .where(or_(Page.title.ilike(pattern, escape="\\"), Page.contents.ilike(pattern, escape="\\")))
+            .order_by(Page.title)
+        )
+
+    query = select(Page).join(page_search, page_search.c.page_id == Page.id)
+
+    if dialect == "sqlite":
+        if (match := _fts5_query(terms)) is None:
+            return query.where(false())
+        rank = func.bm25(literal_column(page_search.name), 0.0, *SQLITE_WEIGHTS)
+        return query.where(text("page_search MATCH :match").bindparams(match=match)).order_by(rank)
+
+    tsquery = func.websearch_to_tsquery(POSTGRES_CONFIG, terms)
+    document: ColumnClause[Any] = literal_column("page_search.document")
+    return query.where(document.op("@@")(tsquery)).order_by(func.ts_rank(document, tsquery).desc())
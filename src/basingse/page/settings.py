@@ -4,17 +4,32 @@ from flask import Blueprint
 from flask import Flask
 
 from .extension import EditorJS
+from basingse.publish.sitemap import register as register_sitemap
+from basingse.publish.sitemap import Source
 from basingse.utils.settings import BlueprintOptions
 
+SETTINGS_KEY = "basingse.page.settings"
+
 
 @dc.dataclass(frozen=True)
 class PageSettings:
     blueprint: BlueprintOptions = BlueprintOptions()
     markdown: bool = False
 
+    #: Revisions of a page's contents between full snapshots, the others store changes to the previous revision
+    revision_snapshot_interval: int = 20
+
     def init_app(self, app: Flask | Blueprint) -> None:
         from .views import bp
+        from .cli import page_cli
+        from .models import Page
         from . import admin  # noqa: F401
+        from . import revisions  # noqa: F401
+
+        if self.revision_snapshot_interval < 1:
+            raise ValueError(f"Snapshot interval must be at least 1, got {self.revision_snapshot_interval}")
+
+        source = Source(Page, "page.page", arguments=("slug",), title="title")
 
         def markdown_in_context() -> bool:
             return self.markdown
@@ -24,7 +39,12 @@ class PageSettings:
 
         if isinstance(app, Flask):
             app.add_template_global(markdown_in_context, "use_markdown_in_page")
+            app.cli.add_command(page_cli)
+            app.extensions[SETTINGS_KEY] = self
+            register_sitemap(app, source)
         else:
             app.add_app_template_global(markdown_in_context, "use_markdown_in_page")
+            app.record_once(lambda state: register_sitemap(state.app, source))
+            app.record_once(lambda state: state.app.extensions.setdefault(SETTINGS_KEY, self))
 
         app.register_blueprint(bp, **dc.asdict(self.blueprint))
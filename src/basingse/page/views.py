@@ -1,15 +1,23 @@
 from flask import abort
 from flask import Blueprint
 from flask import flash
+from flask import jsonify
 from flask import render_template
+from flask import request
+from flask.typing import ResponseReturnValue as IntoResponse
 from sqlalchemy import select
 
 from .models import Page
+from .search import search as search_pages
 from basingse import svcs
+from basingse.admin.extension import request_accepts_json
 from basingse.models import Session
 
 bp = Blueprint("page", __name__, template_folder="templates")
 
+#: Maximum number of search results
+SEARCH_LIMIT = 20
+
 
 @bp.route("/page/<slug>/")
 def page(slug: str) -> str:
@@ -21,3 +29,23 @@ def page(slug: str) -> str:
         abort(404)
 
     return render_template("page.html", page=page)
+
+
+@bp.route("/search/")
+def search() -> IntoResponse:
+    terms = request.args.get("q", "").strip()
+
+    pages: list[Page] = []
+    if terms:
+        session = svcs.get(Session)
+        pages = list(session.scalars(search_pages(session, terms).limit(SEARCH_LIMIT)))
+
+    if request_accepts_json():
+        return jsonify(
+            {
+                "query": terms,
+                "results": [{"id": page.id, "title": page.title, "slug": page.slug, "url": page.url} for page in pages],
+            }
+        )
+
+    return render_template("search.html", terms=terms, pages=pages)
@@ -0,0 +1,343 @@
+"""Sitemaps and Atom feeds for published models.
+
+Models using :class:`~basingse.publish.PublishMixin` are added to the sitemap with :func:`register`,
+which names the endpoint that shows each item and the columns which build its URL::
+
+    register(app, Source(Page, "page.page", arguments=("slug",), title="title"))
+
+``/sitemap.xml`` lists every published item. Sitemaps are limited to 50,000 URLs, so larger sites get
+a sitemap index which points at ``/sitemap-<n>.xml``. ``/feed.xml`` is an Atom feed of the most recently
+published items.
+
+Rows are fetched in chunks and the XML is streamed. Generated documents are cached, keyed by a cheap
+fingerprint of each source (the number of published items and their latest update), so the cache is
+invalidated when an item is published, updated or unpublished, or when a scheduled item goes live.
+Changes made in this process are also tracked exactly, as ``updated`` may only have second resolution.
+Documents contain absolute URLs, so they are cached for each host, and only the most recently used
+documents are kept.
+"""
+
+import collections
+import dataclasses as dc
+import datetime as dt
+import functools
+import hashlib
+import threading
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Any
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
+
+import attrs
+import structlog
+from flask import abort
+from flask import Blueprint
+from flask import current_app
+from flask import Flask
+from flask import request
+from flask import stream_with_context
+from flask import url_for
+from flask.sansio.app import App
+from flask.typing import ResponseReturnValue as IntoResponse
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import Row
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+
+log = structlog.get_logger(__name__)
+
+_SITEMAP_EXTENSION_KEY = "basingse.sitemap"
+
+#: The most URLs allowed in a single sitemap by the sitemaps protocol
+MAX_URLS = 50_000
+
+#: Default number of generated documents to keep in the cache
+CACHE_SIZE = 64
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+
+bp = Blueprint("sitemap", __name__)
+
+#: The number of published items, and their latest update, for each source
+Counts = list[tuple[int, Any]]
+
+
+@attrs.frozen
+class Source:
+    """A published model which appears in the sitemap and feed"""
+
+    #: A model using :class:`~basingse.publish.PublishMixin`
+    model: type[Any]
+
+    #: The endpoint which shows a single item
+    endpoint: str
+
+    #: Columns passed as arguments to :func:`url_for` for the endpoint
+    arguments: Sequence[str] = ()
+
+    #: Column used as the title of feed entries, or ``None`` to leave the source out of the feed
+    title: str | None = None
+
+    def columns(self) -> list[Any]:
+        columns = [self.model.updated, self.model.published_at.label("published_at")]
+        columns.extend(getattr(self.model, name).label(name) for name in self.arguments)
+        if self.title is not None and self.title not in self.arguments:
+            columns.append(getattr(self.model, self.title).label(self.title))
+        return columns
+
+    def select(self) -> Any:
+        return (
+            select(*self.columns())
+            .where(self.model.is_published)
+            .order_by(self.model.published_at.desc(), self.model.id)
+            .execution_options(include_unpublished=True)
+        )
+
+    def url(self, row: Row) -> str:
+        return url_for(self.endpoint, _external=True, **{name: getattr(row, name) for name in self.arguments})
+
+
+# Changes seen by this process, for each model
+_generations: dict[type[Any], int] = {}
+
+
+def _changed(model: type[Any], mapper: Any, connection: Any, target: Any) -> None:
+    _generations[model] += 1
+
+
+def _watch(model: type[Any]) -> None:
+    if model in _generations:
+        return
+    _generations[model] = 0
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, functools.partial(_changed, model), propagate=True)
+
+
+@dc.dataclass
+class Sitemap:
+    """The sources and cached documents for an application"""
+
+    sources: list[Source] = dc.field(default_factory=list)
+
+    #: Cached documents, by name, with the fingerprint they were generated for, least recently used first
+    documents: collections.OrderedDict[str, tuple[tuple[Any, ...], bytes]] = dc.field(
+        default_factory=collections.OrderedDict
+    )
+
+    #: The most documents to keep in the cache
+    cache_size: int = CACHE_SIZE
+
+    _lock: threading.Lock = dc.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def counts(self, session: Session) -> Counts:
+        """The number of published items, and their latest update, for each source"""
+        counts = []
+        for source in self.sources:
+            query = select(func.count(), func.max(source.model.updated)).where(source.model.is_published)
+            count, updated = session.execute(query.execution_options(include_unpublished=True)).one()
+            counts.append((count, updated))
+        return counts
+
+    def fingerprint(self, counts: Counts) -> tuple[Any, ...]:
+        generations = tuple(_generations.get(source.model, 0) for source in self.sources)
+        return (generations, tuple((count, str(updated)) for count, updated in counts))
+
+    def cached(self, name: str, fingerprint: tuple[Any, ...]) -> bytes | None:
+        with self._lock:
+            if (entry := self.documents.get(name)) is not None and entry[0] == fingerprint:
+                self.documents.move_to_end(name)
+                return entry[1]
+        return None
+
+    def store(self, name: str, fingerprint: tuple[Any, ...], document: bytes) -> None:
+        with self._lock:
+            self.documents[name] = (fingerprint, document)
+            self.documents.move_to_end(name)
+            while len(self.documents) > self.cache_size:
+                self.documents.popitem(last=False)
+
+
+def get_sitemap(app: App | None = None) -> Sitemap:
+    if app is None:
+        app = current_app
+    return app.extensions.setdefault(_SITEMAP_EXTENSION_KEY, Sitemap())
+
+
+def register(app: App, source: Source) -> None:
+    """Add a published model to the sitemap and feed"""
+    _watch(source.model)
+    get_sitemap(app).sources.append(source)
+
+
+@dc.dataclass(frozen=True)
+class SitemapSettings:
+    """Settings for the sitemap and feed"""
+
+    #: URLs in each sitemap before it is split, and listed by a sitemap index
+    max_urls: int = MAX_URLS
+
+    #: Number of entries in the feed
+    feed_size: int = 50
+
+    #: Title of the feed, defaults to the application name
+    feed_title: str | None = None
+
+    #: Rows fetched from the database at a time
+    chunk_size: int = 1000
+
+    #: Generated documents kept in memory, across every host the site is served on
+    cache_size: int = CACHE_SIZE
+
+    def init_app(self, app: Flask) -> None:
+        if not 0 < self.max_urls <= MAX_URLS:
+            raise ValueError(f"Sitemaps can have at most {MAX_URLS} URLs, got {self.max_urls}")
+        get_sitemap(app).cache_size = self.cache_size
+        app.extensions[f"{_SITEMAP_EXTENSION_KEY}.settings"] = self
+        app.register_blueprint(bp)
+
+
+def get_settings() -> SitemapSettings:
+    return current_app.extensions[f"{_SITEMAP_EXTENSION_KEY}.settings"]
+
+
+def _timestamp(value: dt.datetime | None) -> str:
+    if value is None:
+        return ""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.UTC)
+    return value.isoformat(timespec="seconds")
+
+
+def _rows(session: Session, source: Source, offset: int, limit: int, chunk_size: int) -> Iterator[Row]:
+    query = source.select().offset(offset).limit(limit).execution_options(yield_per=chunk_size)
+    yield from session.execute(query)
+
+
+def _urlset(sitemap: Sitemap, counts: Counts, start: int, stop: int) -> Iterator[str]:
+    settings = get_settings()
+    session = svcs.get(Session)
+
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+    offset = 0
+    for source, (count, _) in zip(sitemap.sources, counts):
+        # Only query the sources which overlap this page of the sitemap
+        first, last = max(start - offset, 0), min(stop - offset, count)
+        offset += count
+        if first >= last:
+            continue
+
+        for row in _rows(session, source, first, last - first, settings.chunk_size):
+            yield f"<url><loc>{escape(source.url(row))}</loc><lastmod>{_timestamp(row.updated)}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def _index(pages: int, counts: Counts) -> Iterator[str]:
+    updated = max((updated for _, updated in counts if updated is not None), default=None)
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+    for page in range(1, pages + 1):
+        loc = escape(url_for("sitemap.sitemap_page", page=page, _external=True))
+        yield f"<sitemap><loc>{loc}</loc><lastmod>{_timestamp(updated)}</lastmod></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def _feed(sitemap: Sitemap) -> Iterator[str]:
+    settings = get_settings()
+    session = svcs.get(Session)
+
+    entries: list[tuple[Source, Row]] = []
+    for source in sitemap.sources:
+        if source.title is not None:
+            entries.extend((source, row) for row in _rows(session, source, 0, settings.feed_size, settings.chunk_size))
+    entries.sort(key=lambda entry: _timestamp(entry[1].published_at), reverse=True)
+    del entries[settings.feed_size :]
+
+    updated = max((_timestamp(row.updated) for _, row in entries), default=_timestamp(dt.datetime.now(dt.UTC)))
+    title = settings.feed_title or current_app.name
+
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="{ATOM_NAMESPACE}">\n'
+    yield f"<title>{escape(title)}</title>\n<id>{escape(request.url_root)}</id>\n"
+    yield f"<link rel=\"self\" href={quoteattr(url_for('sitemap.feed', _external=True))}/>\n"
+    yield f"<updated>{updated}</updated>\n"
+    for source, row in entries:
+        url = source.url(row)
+        yield (
+            f"<entry><title>{escape(str(getattr(row, source.title or '')))}</title>"
+            f"<link href={quoteattr(url)}/><id>{escape(url)}</id>"
+            f"<published>{_timestamp(row.published_at)}</published><updated>{_timestamp(row.updated)}</updated>"
+            "</entry>\n"
+        )
+    yield "</feed>\n"
+
+
+def _send(name: str, mimetype: str, generate: Callable[[Counts], Iterable[str]]) -> IntoResponse:
+    """Send a cached document, or stream it and cache the result"""
+    sitemap = get_sitemap()
+    counts = sitemap.counts(svcs.get(Session))
+    fingerprint = sitemap.fingerprint(counts)
+
+    # Documents contain absolute URLs, so they are cached for each host, in a bounded cache.
+    name = f"{request.host_url}{name}"
+
+    if (document := sitemap.cached(name, fingerprint)) is not None:
+        response = current_app.response_class(document, mimetype=mimetype)
+    else:
+        # Called before streaming starts, so that generate can still abort the request.
+        generated = generate(counts)
+
+        def stream() -> Iterator[bytes]:
+            chunks = []
+            for chunk in generated:
+                data = chunk.encode("utf-8")
+                chunks.append(data)
+                yield data
+            sitemap.store(name, fingerprint, b"".join(chunks))
+
+        response = current_app.response_class(stream_with_context(stream()), mimetype=mimetype)
+
+    response.set_etag(hashlib.sha256(repr((name, fingerprint)).encode()).hexdigest()[:32])
+    return response.make_conditional(request)
+
+
+def _pages(counts: Counts) -> int:
+    return -(-sum(count for count, _ in counts) // get_settings().max_urls)
+
+
+@bp.route("/sitemap.xml")
+def sitemap() -> IntoResponse:
+    """The sitemap, or a sitemap index if there are too many URLs for one sitemap"""
+    sitemap = get_sitemap()
+
+    def generate(counts: Counts) -> Iterable[str]:
+        if (pages := _pages(counts)) > 1:
+            return _index(pages, counts)
+        return _urlset(sitemap, counts, 0, get_settings().max_urls)
+
+    return _send("sitemap", "application/xml", generate)
+
+
+@bp.route("/sitemap-<int:page>.xml")
+def sitemap_page(page: int) -> IntoResponse:
+    """One sitemap listed in the sitemap index"""
+    sitemap = get_sitemap()
+    size = get_settings().max_urls
+
+    def generate(counts: Counts) -> Iterable[str]:
+        if not 1 <= page <= _pages(counts):
+            abort(404)
+        return _urlset(sitemap, counts, (page - 1) * size, page * size)
+
+    return _send(f"sitemap-{page}", "application/xml", generate)
+
+
+@bp.route("/feed.xml")
+def feed() -> IntoResponse:
+    """An Atom feed of recently published items"""
+    sitemap = get_sitemap()
+    return _send("feed", "application/atom+xml", lambda counts: _feed(sitemap))
@@ -0,0 +1,110 @@
+"""Offload file responses to a front-end web server.
+
+Behind nginx (``X-Accel-Redirect``) or Apache and lighttpd (``X-Sendfile``), files on disk can be
+sent by the web server, so the Python worker is free as soon as the headers are written. Assets and
+attachments are offloaded when ``BASINGSE_SENDFILE_MODE`` is set::
+
+    BASINGSE_SENDFILE_MODE = "x-accel-redirect"
+    BASINGSE_SENDFILE_LOCATIONS = {"/srv/app/instance/attachments": "/_attachments/"}
+
+nginx only sends files from ``internal`` locations, so ``locations`` maps directories on disk to
+the URL prefix of such a location::
+
+    location /_attachments/ {
+        internal;
+        alias /srv/app/instance/attachments/;
+    }
+
+Files outside of every configured location are still sent by Python.
+"""
+
+import dataclasses as dc
+import datetime as dt
+import os
+from collections.abc import Mapping
+from pathlib import Path
+
+import structlog
+from flask import current_app
+from flask import Flask
+from flask import request
+from werkzeug import Response
+from werkzeug.utils import send_file
+
+log = structlog.get_logger(__name__)
+
+_SENDFILE_EXTENSION_KEY = "basingse.sendfile"
+
+X_ACCEL_REDIRECT = "x-accel-redirect"
+X_SENDFILE = "x-sendfile"
+
+
+@dc.dataclass(frozen=True)
+class SendfileSettings:
+    """Settings for offloading file responses"""
+
+    #: ``"x-accel-redirect"`` for nginx, ``"x-sendfile"`` for Apache and lighttpd, or ``None`` to send files from Python
+    mode: str | None = None
+
+    #: Directories on disk, mapped to internal nginx locations which serve them
+    locations: Mapping[str, str] = dc.field(default_factory=dict)
+
+    def init_app(self, app: Flask) -> None:
+        if self.mode not in (None, X_ACCEL_REDIRECT, X_SENDFILE):
+            raise ValueError(f"Unknown sendfile mode: {self.mode!r}")
+        app.extensions[_SENDFILE_EXTENSION_KEY] = self
+
+    def header(self, path: Path) -> tuple[str, str] | None:
+        """The header which asks the web server to send a file, if it can"""
+        if self.mode == X_SENDFILE:
+            return ("X-Sendfile", os.fspath(path))
+
+        if self.mode == X_ACCEL_REDIRECT:
+            for directory, location in self.locations.items():
+                try:
+                    relative = path.relative_to(Path(directory).resolve())
+                except ValueError:
+                    continue
+                return ("X-Accel-Redirect", f"{location.rstrip('/')}/{relative.as_posix()}")
+            log.debug("No internal location for file", path=path)
+        return None
+
+
+def offload(
+    path: Path,
+    *,
+    mimetype: str | None = None,
+    download_name: str | None = None,
+    as_attachment: bool = False,
+    etag: str | bool = True,
+    last_modified: dt.datetime | float | None = None,
+) -> Response | None:
+    """Build a response which the web server will fill in with the file, or ``None`` if it can't be offloaded
+
+    Conditional and range requests are left to the web server, which sees the original request headers.
+    """
+    settings: SendfileSettings | None = current_app.extensions.get(_SENDFILE_EXTENSION_KEY)
+    if settings is None or settings.mode is None:
+        return None
+
+    path = path.resolve()
+    if not path.is_file() or (header := settings.header(path)) is None:
+        return None
+
+    response = send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=False,
+        etag=etag,
+        last_modified=last_modified,
+        max_age=current_app.get_send_file_max_age,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+    )
+    del response.headers["X-Sendfile"]
+    response.headers[header[0]] = header[1]
+    response.accept_ranges = "bytes"
+    return response
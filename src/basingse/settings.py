@@ -1,5 +1,5 @@
 import dataclasses as dc
-import functools
+import time
 from collections.abc import Callable
 from collections.abc import Iterator
 from collections.abc import Mapping
@@ -13,24 +13,15 @@ from bootlace import as_tag
 from bootlace import Bootlace
 from bootlace import render
 from flask import Flask
+from werkzeug.utils import import_string
 
 from . import svcs
-from .admin.settings import AdminSettings
-from .assets import Assets
-from .attachments import Attachments
-from .auth.extension import Authentication
-from .autoimport import AutoImport
-from .customize.settings import CustomizeSettings
-from .logging import Logging
-from .markdown import MarkdownOptions
-from .models import Model
-from .models import SQLAlchemy
-from .opentelemetry.settings import OpenTelemetry
-from .page.settings import PageSettings
+from .startup import add_startup_record
+from .startup import emit_span
+from .startup import StartupRecord
 from .utils.urls import rewrite_endpoint
 from .utils.urls import rewrite_update
 from .utils.urls import rewrite_url
-from .views import CoreSettings
 
 
 logger = structlog.get_logger(__name__)
@@ -59,30 +50,61 @@ class Settings(Protocol):
     def init_app(self, app: Flask) -> None: ...
 
 
+@dc.dataclass(frozen=True)
+class Lazy:
+    """An extension factory which only imports the extension when it is enabled"""
+
+    #: Import path of the extension, as ``module:attribute``
+    target: str
+
+    def __call__(self) -> Settings:
+        return import_string(self.target)()
+
+
+def attachments() -> Settings:
+    from .attachments import Attachments
+    from .models import Model
+
+    return Attachments(registry=Model.registry)
+
+
 class BaSingSe(Mapping[str, Settings]):
     EXTENSIONS: dict[str, Callable[[], Settings]] = {
-        "autoimport": AutoImport,
-        "assets": Assets,
-        "auth": Authentication,
-        "attachments": functools.partial(Attachments, registry=Model.registry),
-        "customize": CustomizeSettings,
-        "page": PageSettings,
-        "core": CoreSettings,
-        "sqlalchemy": SQLAlchemy,
-        "logging": Logging,
-        "opentelemetry": OpenTelemetry,
-        "markdown": MarkdownOptions,
+        "autoimport": Lazy("basingse.autoimport:AutoImport"),
+        "assets": Lazy("basingse.assets:Assets"),
+        "auth": Lazy("basingse.auth.extension:Authentication"),
+        "attachments": attachments,
+        "customize": Lazy("basingse.customize.settings:CustomizeSettings"),
+        "http": Lazy("basingse.http:HTTPSettings"),
+        "page": Lazy("basingse.page.settings:PageSettings"),
+        "sendfile": Lazy("basingse.sendfile:SendfileSettings"),
+        "sitemap": Lazy("basingse.publish.sitemap:SitemapSettings"),
+        "tasks": Lazy("basingse.tasks:TaskSettings"),
+        "core": Lazy("basingse.views:CoreSettings"),
+        "sqlalchemy": Lazy("basingse.models:SQLAlchemy"),
+        "logging": Lazy("basingse.logging:Logging"),
+        "opentelemetry": Lazy("basingse.opentelemetry.settings:OpenTelemetry"),
+        "markdown": Lazy("basingse.markdown:MarkdownOptions"),
         "context": Context,
         "bootlace": Bootlace,
-        "admin": AdminSettings,
+        "admin": Lazy("basingse.admin.settings:AdminSettings"),
     }
 
     def __init__(self, all: bool = False) -> None:
         self._extensions: dict[str, Settings] = {}
         self._initialized: set[str] = set()
+
+        #: Seconds spent importing and constructing each extension
+        self._import_times: dict[str, float] = {}
         if all:
             self.enable_all()
 
+    def _load(self, name: str) -> Settings:
+        start = time.perf_counter()
+        self._extensions[name] = settings = self.EXTENSIONS[name]()
+        self._import_times[name] = time.perf_counter() - start
+        return settings
+
     def __getitem__(self, key: object) -> Settings:
         if not isinstance(key, str):
             raise TypeError(f"Key must be a string, not {type(key).__name__}")
@@ -90,8 +112,7 @@ class BaSingSe(Mapping[str, Settings]):
             return self._extensions[key]
         except KeyError:
             if key in self.EXTENSIONS:
-                self._extensions[key] = settings = self.EXTENSIONS[key]()
-                return settings
+                return self._load(key)
             raise
 
     def __iter__(self) -> Iterator[str]:
@@ -119,7 +140,7 @@ class BaSingSe(Mapping[str, Settings]):
 
     def enable(self, *extensions: str) -> "BaSingSe":
         for extension in extensions:
-            self._extensions[extension] = self.EXTENSIONS[extension]()
+            self._load(extension)
         return self
 
     def enable_all(self) -> "BaSingSe":
@@ -135,16 +156,24 @@ class BaSingSe(Mapping[str, Settings]):
     def init_app(self, app: Flask) -> None:
         config = app.config.get_namespace(f"{NAMESPACE}_")
 
+        record = StartupRecord()
+        start = time.perf_counter()
+
         svcs.init_app(app)
         for ext in self._extensions.keys():
             if ext in self._initialized:
                 continue
             extension = apply_config(config, ext, self._extensions[ext])
-            extension.init_app(app)
+            with record.timing(ext, import_time=self._import_times.get(ext, 0.0)):
+                extension.init_app(app)
             self._initialized.add(ext)
 
         svcs.register_value(app, type(self), self)
 
+        record.duration = time.perf_counter() - start
+        add_startup_record(app, record)
+        emit_span(app, record)
+
 
 E = TypeVar("E", bound=Settings)
 
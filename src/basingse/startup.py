@@ -0,0 +1,153 @@
+"""Timings for application startup.
+
+:meth:`BaSingSe.init_app <basingse.settings.BaSingSe.init_app>` records how long each extension
+takes to import (when it is enabled) and to initialize, and :class:`~basingse.autoimport.AutoImport`
+records how long each module takes to import and initialize. The results are available from
+:func:`get_startup_record`, from the ``flask basingse startup-report`` command, and as a tree of
+OpenTelemetry spans.
+"""
+
+import time
+from collections.abc import Iterator
+from typing import cast
+
+import attrs
+from flask import Flask
+from opentelemetry import trace
+
+from basingse.autoimport import AutoImportRecord
+
+_STARTUP_EXTENSION_KEY = "basingse.startup"
+
+tracer = trace.get_tracer(__name__)
+
+
+@attrs.define
+class ExtensionTiming:
+    """Time spent initializing a single extension"""
+
+    name: str
+
+    #: When initialization started, in nanoseconds since the epoch
+    started_at: int
+
+    #: Seconds spent in the extension's ``init_app``
+    duration: float
+
+    #: Seconds spent importing and constructing the extension, when it was enabled
+    import_time: float = 0.0
+
+    @property
+    def ended_at(self) -> int:
+        return self.started_at + int(self.duration * 1e9)
+
+    @property
+    def total(self) -> float:
+        return self.import_time + self.duration
+
+
+@attrs.define
+class StartupRecord:
+    """Time spent in :meth:`BaSingSe.init_app <basingse.settings.BaSingSe.init_app>`"""
+
+    started_at: int = attrs.field(factory=time.time_ns)
+    extensions: list[ExtensionTiming] = attrs.field(factory=list)
+    duration: float = 0.0
+
+    @property
+    def ended_at(self) -> int:
+        return self.started_at + int(self.duration * 1e9)
+
+    def timing(self, name: str, import_time: float = 0.0) -> "Timer":
+        return Timer(self, name, import_time)
+
+
+@attrs.define
+class Timer:
+    """Context manager which adds an :class:`ExtensionTiming` to a :class:`StartupRecord`"""
+
+    record: StartupRecord
+    name: str
+    import_time: float = 0.0
+    _started_at: int = 0
+    _start: float = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._started_at = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        duration = time.perf_counter() - self._start
+        self.record.extensions.append(ExtensionTiming(self.name, self._started_at, duration, self.import_time))
+
+
+def get_startup_record(app: Flask) -> StartupRecord | None:
+    return cast(StartupRecord | None, app.extensions.get(_STARTUP_EXTENSION_KEY))
+
+
+def add_startup_record(app: Flask, record: StartupRecord) -> None:
+    """Add timings to the application's startup record, for apps initialized more than once"""
+    if (existing := get_startup_record(app)) is None:
+        app.extensions[_STARTUP_EXTENSION_KEY] = record
+        return
+
+    existing.extensions.extend(record.extensions)
+    existing.duration += record.duration
+
+
+def emit_span(app: Flask, record: StartupRecord) -> None:
+    """Emit startup timings as an OpenTelemetry span, with a child span for each extension and module.
+
+    The spans are created after the fact with explicit timestamps, so that they are exported by a tracer
+    provider which was itself configured during startup.
+    """
+    span = tracer.start_span("basingse.init_app", start_time=record.started_at, attributes={"app": app.name})
+    context = trace.set_span_in_context(span)
+    autoimport = app.extensions.get("autoimport")
+
+    for extension in record.extensions:
+        child = tracer.start_span(
+            f"init {extension.name}",
+            context=context,
+            start_time=extension.started_at,
+            attributes={"import_time": extension.import_time},
+        )
+        if extension.name == "autoimport" and isinstance(autoimport, AutoImportRecord):
+            _emit_autoimport_spans(autoimport, child)
+        child.end(end_time=extension.ended_at)
+
+    span.end(end_time=record.ended_at)
+
+
+def _emit_autoimport_spans(record: AutoImportRecord, parent: trace.Span) -> None:
+    context = trace.set_span_in_context(parent)
+    started_at = record.started_at
+    for module in record.modules:
+        if module.skipped:
+            continue
+
+        # Module timings are sequential, so we can reconstruct each module's start time.
+        span = tracer.start_span(
+            f"import {module.name}",
+            context=context,
+            start_time=started_at,
+            attributes={"import_time": module.import_time, "init_time": module.init_time},
+        )
+        started_at += int(module.duration * 1e9)
+        span.end(end_time=started_at)
+
+
+def iter_report(app: Flask, limit: int | None = None) -> Iterator[tuple[str, float]]:
+    """Yield (label, seconds) rows for a startup report, slowest first within each section"""
+    if (record := get_startup_record(app)) is not None:
+        yield ("init_app", record.duration)
+        for extension in sorted(record.extensions, key=lambda e: e.total, reverse=True):
+            yield (f"  {extension.name}", extension.total)
+
+    autoimport = app.extensions.get("autoimport")
+    if isinstance(autoimport, AutoImportRecord):
+        yield (f"autoimport {autoimport.name}", autoimport.duration)
+        modules = sorted((m for m in autoimport.modules if not m.skipped), key=lambda m: m.duration, reverse=True)
+        for module in modules[:limit]:
+            yield (f"  {module.name}", module.duration)
@@ -0,0 +1,454 @@
+"""Run slow work off the request path.
+
+A :class:`TaskExecutor` is registered with :mod:`basingse.svcs`, and runs functions in the
+background::
+
+    executor = svcs.get(TaskExecutor)
+    task = executor.submit(send_welcome_email, user.id, retries=3)
+    ...
+    executor.get(task.id).status
+
+The backend is chosen with ``BASINGSE_TASKS_BACKEND``:
+
+``thread``
+    A thread pool. Tasks run inside an application context, so they can use :func:`svcs.get`.
+``process``
+    A process pool, for CPU-bound work. Tasks and their arguments must be picklable, and run without
+    an application context.
+``durable``
+    A queue in a SQLite database, worked by threads in an application context. Queued tasks survive
+    a restart, so tasks are named by import path and their arguments must be JSON serializable.
+``inline``
+    Tasks run immediately on the calling thread, which is useful for tests.
+
+A task which fails is retried after ``BASINGSE_TASKS_RETRY_BACKOFF`` seconds, doubling for each
+further attempt.
+"""
+
+import abc
+import collections
+import contextlib
+import concurrent.futures
+import dataclasses as dc
+import enum
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import attrs
+import structlog
+from flask import Flask
+from opentelemetry import metrics
+from werkzeug.utils import import_string
+
+from basingse import svcs
+
+log = structlog.get_logger(__name__)
+meter = metrics.get_meter(__name__)
+
+_submitted = meter.create_counter("tasks.submitted", description="Background tasks submitted")
+_completed = meter.create_counter("tasks.completed", description="Background tasks finished, by status")
+_retried = meter.create_counter("tasks.retried", description="Background task attempts which were retried")
+_duration = meter.create_histogram("tasks.duration", unit="s", description="Time spent running background tasks")
+
+#: Number of finished tasks whose status is kept by the pool executors
+HISTORY_SIZE = 1000
+
+
+class TaskStatus(enum.StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@attrs.define
+class Task:
+    """The status of a background task"""
+
+    id: str
+    name: str
+    status: TaskStatus = TaskStatus.PENDING
+
+    #: Number of times the task has been started
+    attempts: int = 0
+
+    #: Number of times the task is retried after failing
+    retries: int = 0
+
+    #: The return value, for tasks run by a pool
+    result: Any = None
+
+    #: A description of the last failure
+    error: str | None = None
+
+    created: float = attrs.field(factory=time.time)
+    finished: float | None = None
+
+
+class TaskFailed(Exception):
+    """A task failed on every attempt"""
+
+    def __init__(self, attempts: int, error: str) -> None:
+        super().__init__(attempts, error)
+        self.attempts = attempts
+        self.error = error
+
+
+def task_name(func: Callable[..., Any]) -> str:
+    return f"{func.__module__}:{func.__qualname__}"
+
+
+def delay(backoff: float, attempts: int) -> float:
+    """Seconds to wait before retrying a task which has failed ``attempts`` times"""
+    return backoff * 2 ** (attempts - 1)
+
+
+def attempt(
+    name: str,
+    func: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    retries: int,
+    backoff: float = 0.0,
+) -> tuple[int, Any]:
+    """Call a function until it succeeds or runs out of retries, returning the attempts and result"""
+    for attempts in range(1, retries + 2):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            if attempts > retries:
+                raise TaskFailed(attempts, repr(exc)) from exc
+            log.warning("Retrying task", task=name, attempts=attempts, error=repr(exc))
+            _retried.add(1, {"task": name})
+            time.sleep(delay(backoff, attempts))
+        else:
+            return attempts, result
+        finally:
+            _duration.record(time.perf_counter() - start, {"task": name})
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def in_app_context(app: Flask, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    with app.app_context():
+        return func(*args, **kwargs)
+
+
+def _finish(task: Task, attempts: int, error: str | None = None) -> None:
+    task.attempts = attempts
+    task.error = error
+    task.status = TaskStatus.FAILED if error is not None else TaskStatus.SUCCEEDED
+    task.finished = time.time()
+    _completed.add(1, {"task": task.name, "status": task.status.value})
+
+
+class TaskExecutor(abc.ABC):
+    """Runs tasks in the background"""
+
+    @abc.abstractmethod
+    def submit(self, func: Callable[..., Any], /, *args: Any, retries: int = 0, **kwargs: Any) -> Task: ...
+
+    @abc.abstractmethod
+    def get(self, id: str) -> Task | None: ...
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+    def ping(self) -> None:
+        pass
+
+
+class InlineTaskExecutor(TaskExecutor):
+    """Runs tasks immediately, on the calling thread"""
+
+    def __init__(self, backoff: float = 0.0) -> None:
+        self.backoff = backoff
+        self.tasks: collections.OrderedDict[str, Task] = collections.OrderedDict()
+
+    def submit(self, func: Callable[..., Any], /, *args: Any, retries: int = 0, **kwargs: Any) -> Task:
+        task = Task(uuid.uuid4().hex, task_name(func), retries=retries)
+        _submitted.add(1, {"task": task.name})
+        try:
+            task.attempts, task.result = attempt(task.name, func, args, kwargs, retries, self.backoff)
+        except TaskFailed as exc:
+            _finish(task, exc.attempts, exc.error)
+        else:
+            _finish(task, task.attempts)
+
+        self.tasks[task.id] = task
+        while len(self.tasks) > HISTORY_SIZE:
+            self.tasks.popitem(last=False)
+        return task
+
+    def get(self, id: str) -> Task | None:
+        return self.tasks.get(id)
+
+
+class PoolTaskExecutor(TaskExecutor):
+    """Runs tasks with a :class:`concurrent.futures.Executor`"""
+
+    def __init__(self, pool: concurrent.futures.Executor, app: Flask | None = None, backoff: float = 0.0) -> None:
+        self.pool = pool
+        self.app = app
+        self.backoff = backoff
+        self.tasks: collections.OrderedDict[str, tuple[Task, concurrent.futures.Future]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[..., Any], /, *args: Any, retries: int = 0, **kwargs: Any) -> Task:
+        task = Task(uuid.uuid4().hex, task_name(func), retries=retries)
+        target = functools.partial(in_app_context, self.app, func) if self.app is not None else func
+
+        future = self.pool.submit(attempt, task.name, target, args, kwargs, retries, self.backoff)
+        with self._lock:
+            self.tasks[task.id] = (task, future)
+            while len(self.tasks) > HISTORY_SIZE and next(iter(self.tasks.values()))[1].done():
+                self.tasks.popitem(last=False)
+
+        _submitted.add(1, {"task": task.name})
+        future.add_done_callback(functools.partial(self._done, task))
+        return task
+
+    def _done(self, task: Task, future: concurrent.futures.Future) -> None:
+        if future.cancelled():
+            _finish(task, task.attempts, "cancelled")
+            return
+
+        try:
+            attempts, task.result = future.result()
+        except TaskFailed as exc:
+            _finish(task, exc.attempts, exc.error)
+        except Exception as exc:
+            log.exception("Task could not be run", task=task.name)
+            _finish(task, task.attempts + 1, repr(exc))
+        else:
+            _finish(task, attempts)
+
+    def get(self, id: str) -> Task | None:
+        with self._lock:
+            task, future = self.tasks.get(id, (None, None))
+        if task is not None and future is not None and task.status == TaskStatus.PENDING and future.running():
+            task.status = TaskStatus.RUNNING
+        return task
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class DurableTaskExecutor(TaskExecutor):
+    """Runs tasks from a queue stored in a SQLite database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS task (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            arguments TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            retries INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created REAL NOT NULL,
+            run_after REAL NOT NULL DEFAULT 0,
+            finished REAL
+        )
+    """
+
+    def __init__(
+        self, path: Path, app: Flask, workers: int = 1, poll_interval: float = 1.0, backoff: float = 0.0
+    ) -> None:
+        self.path = path
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Tasks which were running when the process stopped are run again. The connection is closed
+        # straight away, so that it isn't shared with processes forked after the app is created.
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute(
+                "UPDATE task SET status = ? WHERE status = ?", (TaskStatus.PENDING.value, TaskStatus.RUNNING.value)
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(self.SCHEMA)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread, and per process: a forked process gets a copy of the thread
+        # which forked it, including its connection, which must not be used in both processes.
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def submit(self, func: Callable[..., Any] | str, /, *args: Any, retries: int = 0, **kwargs: Any) -> Task:
+        name = func if isinstance(func, str) else task_name(func)
+        task = Task(uuid.uuid4().hex, name, retries=retries)
+        arguments = json.dumps({"args": args, "kwargs": kwargs})
+
+        self._connection().execute(
+            "INSERT INTO task (id, name, arguments, status, retries, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (task.id, task.name, arguments, task.status.value, task.retries, task.created),
+        )
+        _submitted.add(1, {"task": task.name})
+        self.start()
+        self._wakeup.set()
+        return task
+
+    def get(self, id: str) -> Task | None:
+        row = self._connection().execute("SELECT * FROM task WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            return None
+        return Task(
+            row["id"],
+            row["name"],
+            status=TaskStatus(row["status"]),
+            attempts=row["attempts"],
+            retries=row["retries"],
+            error=row["error"],
+            created=row["created"],
+            finished=row["finished"],
+        )
+
+    def start(self) -> None:
+        """Start the worker threads, if they aren't running"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads aren't copied into a forked process
+                self._threads, self._pid = [], os.getpid()
+            if self._threads or self._stop.is_set():
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"basingse-task-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _claim(self) -> sqlite3.Row | None:
+        return (
+            self._connection()
+            .execute(
+                """
+            UPDATE task SET status = ?, attempts = attempts + 1
+            WHERE id = (SELECT id FROM task WHERE status = ? AND run_after <= ? ORDER BY created LIMIT 1)
+            AND status = ?
+            RETURNING id, name, arguments, attempts, retries
+            """,
+                (TaskStatus.RUNNING.value, TaskStatus.PENDING.value, time.time(), TaskStatus.PENDING.value),
+            )
+            .fetchone()
+        )
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            if (row := self._claim()) is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run(row)
+
+    def run(self, row: sqlite3.Row) -> None:
+        connection = self._connection()
+        arguments = json.loads(row["arguments"])
+        start = time.perf_counter()
+        try:
+            func = import_string(row["name"].replace(":", "."))
+            in_app_context(self.app, func, *arguments["args"], **arguments["kwargs"])
+        except Exception as exc:
+            if row["attempts"] <= row["retries"]:
+                log.warning("Retrying task", task=row["name"], attempts=row["attempts"], error=repr(exc))
+                _retried.add(1, {"task": row["name"]})
+                connection.execute(
+                    "UPDATE task SET status = ?, error = ?, run_after = ? WHERE id = ?",
+                    (
+                        TaskStatus.PENDING.value,
+                        repr(exc),
+                        time.time() + delay(self.backoff, row["attempts"]),
+                        row["id"],
+                    ),
+                )
+                status = TaskStatus.PENDING
+            else:
+                log.exception("Task failed", task=row["name"], attempts=row["attempts"])
+                status = TaskStatus.FAILED
+                connection.execute(
+                    "UPDATE task SET status = ?, error = ?, finished = ? WHERE id = ?",
+                    (status.value, repr(exc), time.time(), row["id"]),
+                )
+        else:
+            status = TaskStatus.SUCCEEDED
+            connection.execute(
+                "UPDATE task SET status = ?, error = NULL, finished = ? WHERE id = ?",
+                (status.value, time.time(), row["id"]),
+            )
+        finally:
+            _duration.record(time.perf_counter() - start, {"task": row["name"]})
+
+        if status != TaskStatus.PENDING:
+            _completed.add(1, {"task": row["name"], "status": status.value})
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def ping(self) -> None:
+        self._connection().execute("SELECT 1").fetchone()
+
+
+@dc.dataclass(frozen=True)
+class TaskSettings:
+    """Settings for the background :class:`TaskExecutor`"""
+
+    #: One of ``"thread"``, ``"process"``, ``"durable"`` or ``"inline"``
+    backend: str = "thread"
+
+    #: Number of worker threads or processes
+    workers: int = 4
+
+    #: SQLite database for the durable queue, relative to the instance folder
+    database: str = "tasks.sqlite3"
+
+    #: Seconds between checks of the durable queue, when it is idle
+    poll_interval: float = 1.0
+
+    #: Seconds to wait before the first retry of a failed task, doubled for each further retry
+    retry_backoff: float = 1.0
+
+    def executor(self, app: Flask) -> TaskExecutor:
+        if self.backend == "thread":
+            pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="basingse-task")
+            return PoolTaskExecutor(pool, app=app, backoff=self.retry_backoff)
+        if self.backend == "process":
+            return PoolTaskExecutor(concurrent.futures.ProcessPoolExecutor(self.workers), backoff=self.retry_backoff)
+        if self.backend == "durable":
+            path = Path(app.instance_path) / self.database
+            return DurableTaskExecutor(
+                path, app, workers=self.workers, poll_interval=self.poll_interval, backoff=self.retry_backoff
+            )
+        if self.backend == "inline":
+            return InlineTaskExecutor(backoff=self.retry_backoff)
+        raise ValueError(f"Unknown task backend: {self.backend!r}")
+
+    def init_app(self, app: Flask) -> None:
+        executor = self.executor(app)
+        svcs.register_value(app, TaskExecutor, executor, ping=TaskExecutor.ping, on_registry_close=executor.shutdown)
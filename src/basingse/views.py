@@ -1,12 +1,132 @@
 import dataclasses as dc
+import os
 
+import click
+import structlog
 from flask import Blueprint
+from flask import current_app
 from flask import Flask
+from jinja2 import BytecodeCache
+from jinja2 import FileSystemBytecodeCache
+from jinja2 import TemplateSyntaxError
+
+log = structlog.get_logger(__name__)
 
 core = Blueprint("basingse", __name__, template_folder="templates", static_folder="static")
 
+#: File extensions considered templates when precompiling
+TEMPLATE_EXTENSIONS = ("html", "xml", "txt", "j2", "jinja", "jinja2")
+
 
 @dc.dataclass(frozen=True)
 class CoreSettings:
+    #: Directory for a shared, on-disk jinja bytecode cache. Disabled when ``None``.
+    bytecode_cache: str | None = None
+
     def init_app(self, app: Flask) -> None:
         app.register_blueprint(core)
+
+        if self.bytecode_cache is not None:
+            set_bytecode_cache(app, FileSystemBytecodeCache(ensure_directory(self.bytecode_cache)))
+
+
+def ensure_directory(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def set_bytecode_cache(app: Flask, cache: BytecodeCache) -> None:
+    """Use a jinja bytecode cache for this application's templates"""
+    if "jinja_env" in app.__dict__:
+        # The environment has already been created, so options won't be applied again.
+        app.jinja_env.bytecode_cache = cache
+    else:
+        app.jinja_options = {**app.jinja_options, "bytecode_cache": cache}
+
+
+def compile_templates(app: Flask) -> tuple[list[str], list[str]]:
+    """Compile every template known to the application, returning compiled and failed names.
+
+    With a bytecode cache configured, this writes each template's bytecode to the cache, so
+    that workers can skip compiling templates from source on first use.
+    """
+    if app.jinja_env.cache is not None:
+        # Templates already in memory are never loaded from source, so they would be skipped.
+        app.jinja_env.cache.clear()
+
+    compiled, failed = [], []
+    for name in sorted(app.jinja_env.list_templates(extensions=TEMPLATE_EXTENSIONS)):
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError as exc:
+            log.warning("Template failed to compile", template=name, error=str(exc))
+            failed.append(name)
+        else:
+            compiled.append(name)
+    return compiled, failed
+
+
+@core.cli.command("compile-templates")
+@click.option(
+    "-d",
+    "--directory",
+    type=click.Path(file_okay=False),
+    help="Bytecode cache directory (defaults to the application's configured cache)",
+)
+def compile_templates_command(directory: str | None) -> None:
+    """Precompile all templates into the jinja bytecode cache"""
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+
+    if directory is not None:
+        set_bytecode_cache(app, FileSystemBytecodeCache(ensure_directory(directory)))
+    elif app.jinja_env.bytecode_cache is None:
+        raise click.UsageError("No bytecode cache configured, set BASINGSE_CORE_BYTECODE_CACHE or pass --directory")
+
+    compiled, failed = compile_templates(app)
+    click.echo(f"Compiled {len(compiled)} templates")
+    if failed:
+        raise click.ClickException(f"{len(failed)} templates failed to compile: {', '.join(failed)}")
+
+
+@core.cli.command("warmup")
+@click.option("--templates/--no-templates", default=True, help="Compile all templates")
+@click.option("--freeze/--no-freeze", default=False, help="Freeze the garbage collector afterwards")
+def warmup_command(templates: bool, freeze: bool) -> None:
+    """Build schemas, forms, tables, mappers and templates, and report how long it took"""
+    from basingse.warmup import warmup
+
+    report = warmup(current_app._get_current_object(), templates=templates, freeze=freeze)  # type: ignore[attr-defined]
+    click.echo(f"Warmed up {len(report.admins)} admin views and {report.templates} templates in {report.duration:.2f}s")
+
+
+@core.cli.command("startup-report")
+@click.option("-n", "--limit", type=int, default=20, help="Number of auto-imported modules to show")
+def startup_report_command(limit: int) -> None:
+    """Show where time went while the application started"""
+    from basingse.startup import iter_report
+
+    for label, duration in iter_report(current_app._get_current_object(), limit=limit):  # type: ignore[attr-defined]
+        click.echo(f"{duration * 1000:10.1f}ms  {label}")
+
+
+@core.cli.command("autoimport-manifest")
+@click.option("-n", "--name", help="Package to discover (defaults to the application's package)")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Manifest file to write")
+def autoimport_manifest_command(name: str | None, output: str | None) -> None:
+    """Write a module discovery manifest for AutoImport"""
+    from basingse.autoimport import AutoImportRecord
+    from basingse.autoimport import DEFAULT_AVOID
+    from basingse.autoimport import DEFAULT_MANIFEST
+    from basingse.autoimport import discover
+    from basingse.autoimport import manifest_path
+    from basingse.autoimport import write_manifest
+
+    record = current_app.extensions.get("autoimport")
+    avoid = record.avoid if isinstance(record, AutoImportRecord) else DEFAULT_AVOID
+    if name is None:
+        name = record.name if isinstance(record, AutoImportRecord) else current_app.import_name.removesuffix(".app")
+
+    output = output or manifest_path(name, DEFAULT_MANIFEST)
+    entries = list(discover(name, avoid))
+    write_manifest(output, name, entries)
+    click.echo(f"Wrote {len(entries)} modules to {output}")
@@ -0,0 +1,107 @@
+"""Warm up an application before forking worker processes.
+
+Schemas, forms and tables are built lazily and cached, and SQLAlchemy configures mappers on
+first use. When a server like gunicorn forks workers from a preloaded application, any work
+left for the first request is repeated in every worker. Calling :func:`warmup` in the master
+process does that work once, and then freezes the garbage collector so that the objects it
+created stay shared copy-on-write between workers::
+
+    # gunicorn.conf.py
+    preload_app = True
+
+    def on_starting(server):
+        from basingse.warmup import warmup
+        warmup(server.app.wsgi())
+"""
+
+import gc
+import time
+
+import attrs
+import structlog
+from flask import Flask
+from sqlalchemy.orm import configure_mappers
+
+from basingse.admin.portal import Portal
+from basingse.assets import _ASSETS_EXTENSION_KEY
+from basingse.autoimport import AutoImportRecord
+from basingse.views import compile_templates
+
+log = structlog.get_logger(__name__)
+
+
+@attrs.define
+class WarmupReport:
+    """What was built during warm-up"""
+
+    #: Names of the admin views whose schemas, forms and tables were built
+    admins: list[str] = attrs.field(factory=list)
+
+    #: Auto-imported modules which were deferred, and are imported during warm-up
+    modules: list[str] = attrs.field(factory=list)
+
+    #: Number of asset manifests loaded
+    manifests: int = 0
+
+    #: Number of templates compiled
+    templates: int = 0
+
+    #: Number of objects moved to the permanent generation by :func:`gc.freeze`
+    frozen: int = 0
+
+    #: Wall time spent warming up, in seconds
+    duration: float = 0.0
+
+
+def warm_admins(app: Flask) -> list[str]:
+    """Build the schema, form and table classes for every admin view on a portal"""
+    names = []
+    for blueprint in app.iter_blueprints():
+        if not isinstance(blueprint, Portal):
+            continue
+
+        for view in blueprint.admins:
+            view.cached_schema()
+            view.cached_schema(many=True)
+            view.dumper()
+            view.table()
+
+            # Views may override form() with a static form class, which is already built.
+            if (build_form := getattr(view.model, "__form__", None)) is not None:
+                build_form()
+            names.append(view.name)
+    return names
+
+
+def warm_assets(app: Flask) -> int:
+    """Load the manifest for every asset collection"""
+    if (assets := app.extensions.get(_ASSETS_EXTENSION_KEY)) is None:
+        return 0
+    assets.reload()
+    return len(assets.manifests)
+
+
+def warmup(app: Flask, *, templates: bool = True, freeze: bool = True) -> WarmupReport:
+    """Do the work normally left for the first request, then freeze the garbage collector"""
+    start = time.perf_counter()
+    report = WarmupReport()
+
+    if isinstance(record := app.extensions.get("autoimport"), AutoImportRecord):
+        report.modules = record.import_deferred()
+
+    with app.app_context():
+        configure_mappers()
+        report.admins = warm_admins(app)
+        report.manifests = warm_assets(app)
+        if templates:
+            compiled, _ = compile_templates(app)
+            report.templates = len(compiled)
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        report.frozen = gc.get_freeze_count()
+
+    report.duration = time.perf_counter() - start
+    log.info("Warmed up application", **attrs.asdict(report))
+    return report
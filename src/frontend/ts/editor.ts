@@ -1,4 +1,4 @@
-import EditorJS from "@editorjs/editorjs";
+import EditorJS, { API, BlockMutationEvent } from "@editorjs/editorjs";
 import Header from "@editorjs/header";
 import Paragraph from "@editorjs/paragraph";
 import { BlockQuote } from "./blocks/blockquote";
@@ -20,10 +20,18 @@ export function createEditor(tools: object) {
 
         console.log("Editor setup for ", editorId!);
 
+        const autosave = element.dataset.blocksUrl
+            ? new BlockAutosave(
+                  element.dataset.blocksUrl,
+                  element.dataset.blocksVersion ?? null,
+              )
+            : null;
+
         const editor = new EditorJS({
             holder: element,
             inlineToolbar: true,
             data: input?.value ? JSON.parse(input.value) : undefined,
+            onChange: (api, event) => autosave?.record(api, event),
             tools: {
                 header: Header,
                 paragraph: {
@@ -71,6 +79,124 @@ export function createEditor(tools: object) {
     });
 }
 
+interface Operation {
+    op: "insert" | "update" | "move" | "delete";
+    id: string;
+    index?: number;
+    saved?: Promise<SavedData | void>;
+}
+
+interface SavedData {
+    tool: string;
+    data: object;
+}
+
+/**
+ * Save changes to individual blocks as they are made, instead of sending the whole document.
+ *
+ * Operations are collected from editor.js change events and sent together once editing pauses.
+ * Changed blocks are read when the operations are sent, so repeated changes to a block are sent once.
+ */
+class BlockAutosave {
+    private pending: Operation[] = [];
+    private timer: number | undefined;
+    private saving: Promise<void> = Promise.resolve();
+
+    constructor(
+        private url: string,
+        private version: string | null,
+        private delay: number = 1000,
+    ) {}
+
+    record(api: API, event: BlockMutationEvent | BlockMutationEvent[]) {
+        for (const mutation of Array.isArray(event) ? event : [event]) {
+            const target = mutation.detail.target;
+            switch (mutation.type) {
+                case "block-added":
+                    // Saved now, as the block may be removed before the operations are sent.
+                    this.pending.push({
+                        op: "insert",
+                        id: target.id,
+                        index: mutation.detail.index,
+                        saved: target.save(),
+                    });
+                    break;
+                case "block-changed":
+                    this.pending.push({ op: "update", id: target.id });
+                    break;
+                case "block-moved":
+                    this.pending.push({
+                        op: "move",
+                        id: target.id,
+                        index: mutation.detail.toIndex,
+                    });
+                    break;
+                case "block-removed":
+                    this.pending.push({ op: "delete", id: target.id });
+                    break;
+            }
+        }
+
+        window.clearTimeout(this.timer);
+        this.timer = window.setTimeout(() => {
+            this.saving = this.saving.then(() => this.flush(api));
+        }, this.delay);
+    }
+
+    private async flush(api: API) {
+        const pending = this.pending;
+        this.pending = [];
+
+        // Only the last update to each block is sent, with the block's current data.
+        const last = new Map<string, Operation>();
+        pending
+            .filter((operation) => operation.op === "update")
+            .forEach((operation) => last.set(operation.id, operation));
+
+        const operations = [];
+        for (const operation of pending) {
+            if (operation.op === "update" && last.get(operation.id) !== operation) {
+                continue;
+            }
+            const resolved = await this.resolve(api, operation);
+            if (resolved) operations.push(resolved);
+        }
+        if (!operations.length) return;
+
+        const headers: Record<string, string> = {
+            "Content-Type": "application/json",
+            Accept: "application/json",
+            "X-CSRFToken": get_csrf() ?? "",
+        };
+        if (this.version) headers["If-Match"] = `"${this.version}"`;
+
+        const response = await fetch(this.url, {
+            method: "PATCH",
+            headers,
+            body: JSON.stringify({ operations }),
+        });
+        if (!response.ok) {
+            console.error("Unable to save blocks", await response.text());
+            return;
+        }
+        this.version = (await response.json()).version;
+    }
+
+    private async resolve(api: API, operation: Operation) {
+        const { op, id, index } = operation;
+        if (op === "move" || op === "delete") {
+            return { op, id, index };
+        }
+
+        const saved = await (operation.saved ?? api.blocks.getById(id)?.save());
+        if (!saved) {
+            // The block was removed since it changed, the removal is sent instead.
+            return null;
+        }
+        return { op, index, block: { id, type: saved.tool, data: saved.data } };
+    }
+}
+
 function findParentBySelector<K extends HTMLElement>(
     element: HTMLElement,
     selector: string,
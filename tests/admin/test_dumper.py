@@ -0,0 +1,118 @@
+import datetime as dt
+import json
+from typing import Any
+from uuid import UUID
+
+import marshmallow
+import pytest
+from flask import Flask
+from marshmallow import post_dump
+from pytest_basingse.responses import Ok
+
+from .conftest import FakePost
+from basingse.admin.extension import AdminView
+from basingse.auth.models import User
+from basingse.models.dumper import Dumper
+from basingse.models.dumper import json_dumps
+
+
+@pytest.fixture
+def fake_post(app: Flask) -> FakePost:
+    now = dt.datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt.UTC)
+    return FakePost(id=UUID(int=3), title="Hello", content="World", created=now, updated=now)
+
+
+def test_dumper_compiles_column_fields(app: Flask) -> None:
+    dumper = FakePost.__dumper__()
+    compiled = {field.key for field in dumper.fields if field.compiled}
+    assert {"id", "title", "content", "created", "updated"} <= compiled
+    assert not dumper.passthrough
+
+
+def test_dumper_matches_schema(fake_post: FakePost) -> None:
+    schema = FakePost.__schema__()()
+    dumper = FakePost.__dumper__()
+
+    assert dumper.dump(fake_post) == schema.dump(fake_post)
+    assert dumper.dump_many([fake_post, fake_post]) == schema.dump([fake_post, fake_post], many=True)
+    assert json.loads(dumper.dumps(fake_post)) == schema.dump(fake_post)
+
+
+def test_dumper_falls_back_for_custom_fields(app: Flask) -> None:
+    user = User(email="hello@example.com", active=True)
+    user.roles = []
+    schema = User.__schema__()()
+    dumper = User.__dumper__()
+
+    roles = next(field for field in dumper.fields if field.key == "roles")
+    assert not roles.compiled
+    assert dumper.dump(user) == schema.dump(user)
+    assert "password" not in dumper.dump(user)
+
+
+def test_dumper_passthrough_for_dump_hooks(fake_post: FakePost) -> None:
+    class HookedSchema(FakePost.__schema__()):  # type: ignore[misc]
+        class Meta:
+            compiled_dump = False
+
+        @post_dump
+        def shout(self, data: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
+            return {**data, "title": data["title"].upper()}
+
+    dumper = Dumper(HookedSchema())
+    assert dumper.passthrough
+    assert dumper.dump(fake_post)["title"] == "HELLO"
+
+
+def test_dumper_passthrough_for_undeclared_dump_hooks(fake_post: FakePost) -> None:
+    class HookedSchema(FakePost.__schema__()):  # type: ignore[misc]
+        @post_dump(pass_original=True)
+        def shout(self, data: dict[str, Any], original: Any, **kwargs: Any) -> dict[str, Any]:
+            return {**data, "title": original.title.upper()}
+
+    class AttributeSchema(FakePost.__schema__()):  # type: ignore[misc]
+        def get_attribute(self, obj: Any, attr: str, default: Any) -> Any:
+            return "Attribute" if attr == "title" else super().get_attribute(obj, attr, default)
+
+    dumper = Dumper(HookedSchema())
+    assert dumper.passthrough, "Dump hooks are detected without Meta.compiled_dump"
+    assert dumper.dump(fake_post) == HookedSchema().dump(fake_post)
+    assert dumper.dump(fake_post)["title"] == "HELLO"
+
+    dumper = Dumper(AttributeSchema())
+    assert dumper.passthrough
+    assert dumper.dump(fake_post)["title"] == "Attribute"
+
+    assert not Dumper(FakePost.__schema__()()).passthrough, "The envelope hook is compiled"
+
+
+def test_dumper_passthrough_for_other_schemas(fake_post: FakePost) -> None:
+    class PlainSchema(marshmallow.Schema):
+        title = marshmallow.fields.String()
+
+    assert Dumper(PlainSchema()).passthrough
+
+
+def test_json_dumps() -> None:
+    assert json.loads(json_dumps({"id": UUID(int=1), "when": dt.date(2024, 1, 1)})) == {
+        "id": str(UUID(int=1)),
+        "when": "2024-01-01",
+    }
+
+
+@pytest.mark.usefixtures("post")
+def test_compiled_json_list(app: Flask, adminview: type[AdminView]) -> None:
+    adminview.compiled_json = True
+    assert isinstance(adminview.dumper(), Dumper)
+
+    with app.test_client() as client:
+        client.environ_base["HTTP_ACCEPT"] = "application/json"
+        response = client.get("/tests/admin/posts/list/")
+        assert response == Ok()
+        assert response.json is not None
+        assert response.json["data"][0]["title"] == "Hello"
+
+        response = client.get(f"/tests/admin/posts/{UUID(int=1)!s}/")
+        assert response == Ok()
+        assert response.json is not None
+        assert response.json["content"] == "World"
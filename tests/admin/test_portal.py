@@ -1,8 +1,15 @@
+from unittest.mock import patch
+
 from bootlace.icon import Icon
 from bootlace.links import View
 from flask import Flask
 
+from basingse.admin.portal import Portal
 from basingse.admin.portal import PortalMenuItem
+from basingse.auth.models import User
+from basingse.auth.permissions import Permission
+from basingse.auth.permissions import permission_fingerprint
+from basingse.auth.permissions import Role
 
 
 def test_portal_menu() -> None:
@@ -27,3 +34,62 @@ def test_portal_menu_no_permissions(app: Flask) -> None:
 
     with app.test_request_context("/"):
         assert menu.enabled, "Menu is enabled when no permissions are provided"
+
+
+def test_portal_nav_cache(app: Flask) -> None:
+    portal = Portal("nav_admin", __name__, url_prefix="/nav/")
+    portal.sidebar.append(PortalMenuItem("Test", "nav_admin.home", "test", "test.view"))
+    portal.add_url_rule("/", "home", lambda: "home")
+    app.register_blueprint(portal)
+    app.config["LOGIN_DISABLED"] = False
+
+    with patch.object(Portal, "_render_nav", autospec=True, side_effect=Portal._render_nav) as render_nav:
+        with app.test_request_context("/nav/"):
+            app.preprocess_request()
+            first = portal.context()["nav"]
+            assert portal.context()["nav"] == first
+        assert render_nav.call_count == 1
+
+        with app.test_request_context("/other/"):
+            app.preprocess_request()
+            portal.context()
+        assert render_nav.call_count == 2, "Different blueprints are cached separately"
+
+        with app.test_request_context("/nav/", method="OPTIONS"):
+            app.preprocess_request()
+            portal.context()
+            portal.context()
+        assert render_nav.call_count == 4, "Requests exempt from permission checks are not cached"
+
+        app.config["LOGIN_DISABLED"] = True
+        with app.test_request_context("/nav/"):
+            app.preprocess_request()
+            portal.context()
+        assert render_nav.call_count == 5, "Navigation is not cached when login is disabled"
+
+        app.config["LOGIN_DISABLED"] = False
+        app.config["BASINGSE_ADMIN_NAV_CACHE"] = False
+        with app.test_request_context("/nav/"):
+            app.preprocess_request()
+            portal.context()
+        assert render_nav.call_count == 6
+
+
+def test_permission_fingerprint(app: Flask) -> None:
+    role = Role(name="editor")
+    role.permissions.add(Permission("post", "view"))
+    admin = Role(name="admin", administrator=True)
+
+    user = User(email="editor@basingse.test", active=True)
+    user.roles = [role]
+    other = User(email="other@basingse.test", active=True)
+    other.roles = [role]
+
+    with app.test_request_context("/"):
+        assert permission_fingerprint(user) == permission_fingerprint(other)
+
+        other.roles = [role, admin]
+        assert permission_fingerprint(user) != permission_fingerprint(other)
+        assert permission_fingerprint(other) == ("administrator",)
+
+        assert permission_fingerprint() == ("anonymous", True)
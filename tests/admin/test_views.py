@@ -1,4 +1,7 @@
+import json
 from collections.abc import Iterator
+from unittest.mock import patch
+from unittest.mock import PropertyMock
 from uuid import UUID
 
 import pytest
@@ -11,6 +14,7 @@ from pytest_basingse.responses import BadRequest
 from pytest_basingse.responses import NotFound
 from pytest_basingse.responses import Ok
 from pytest_basingse.responses import Redirect
+from sqlalchemy import select
 from sqlalchemy.orm import make_transient
 from sqlalchemy.orm import Session
 
@@ -19,6 +23,11 @@ from basingse import svcs
 from basingse.admin import views
 from basingse.admin.extension import Action
 from basingse.admin.extension import AdminView
+from basingse.admin.extension import on_bulk_delete
+from basingse.admin.extension import on_bulk_update
+from basingse.admin.extension import on_delete
+from basingse.admin.extension import on_update
+from basingse.admin.extension import select_template
 
 ONE = UUID(int=1)
 
@@ -344,3 +353,179 @@ def test_routes(app: Flask) -> None:
     result = app.test_cli_runner().invoke(routes_command)
     assert result.exit_code == 0
     print(result.output)
+
+
+def test_cached_schema_is_shared(adminview: type[AdminView]) -> None:
+    assert adminview.cached_schema() is adminview.cached_schema()
+    assert adminview.cached_schema(many=True) is not adminview.cached_schema()
+    assert adminview.cached_schema(only=["title"]) is adminview.cached_schema(only=("title",))
+
+
+def test_cached_schema_load_instance(app: Flask, adminview: type[AdminView]) -> None:
+    with app.app_context():
+        post = FakePost(id=UUID(int=7), title="Hello", content="World")
+        schema = adminview.cached_schema()
+
+        loaded = schema.load({"title": "Goodbye"}, instance=post)
+        assert loaded is post
+        assert post.title == "Goodbye"
+        assert post.content == "World"
+
+        fresh = schema.load({"title": "New", "content": "Post"})
+        assert fresh is not post
+        assert schema._orm_instance is None
+
+
+@pytest.mark.usefixtures("post")
+class TestAdminViewStream:
+    def test_ndjson(self, client: FlaskClient) -> None:
+        response = client.get("/tests/admin/posts/list/", headers={"Accept": "application/x-ndjson"})
+        assert response == Ok()
+        assert response.mimetype == "application/x-ndjson"
+
+        lines = [json.loads(line) for line in response.data.splitlines()]
+        assert [line["title"] for line in lines] == ["Hello"]
+
+    def test_chunked_json(self, app: Flask, client: FlaskClient, adminview: type[AdminView]) -> None:
+        with app.app_context():
+            session = svcs.get(Session)
+            session.add_all(FakePost(title=f"Post {i}", content="More") for i in range(5))
+            session.commit()
+
+        adminview.stream_chunk_size = 2
+        response = client.get("/tests/admin/posts/list/?stream=1", headers={"Accept": "application/json"})
+        assert response == Ok()
+        assert response.json is not None
+        assert len(response.json["data"]) == 6
+
+
+@pytest.mark.usefixtures("post")
+class TestAdminViewBulk:
+    TWO = UUID(int=2)
+
+    @pytest.fixture(autouse=True)
+    def second(self, app: Flask) -> None:
+        with app.app_context():
+            session = svcs.get(Session)
+            session.add(FakePost(id=self.TWO, title="Second", content="Post"))
+            session.commit()
+
+    @pytest.fixture
+    def received(self) -> Iterator[list[dict]]:
+        events: list[dict] = []
+
+        def receiver(sender: type, **kwargs: object) -> None:
+            events.append(kwargs)
+
+        signals = [on_delete, on_update, on_bulk_delete, on_bulk_update]
+        for signal in signals:
+            signal.connect(receiver)
+        yield events
+        for signal in signals:
+            signal.disconnect(receiver)
+
+    def titles(self, app: Flask) -> list[str]:
+        with app.app_context():
+            session = svcs.get(Session)
+            return sorted(session.scalars(select(FakePost.title)))
+
+    def test_bulk_delete(self, app: Flask, client: FlaskClient, adminview: type[AdminView], received: list) -> None:
+        adminview.bulk_chunk_size = 1
+        response = client.delete("/tests/admin/posts/bulk/delete/", json={"ids": [str(ONE), str(self.TWO)]})
+        assert response == Ok(status=204)
+        assert self.titles(app) == []
+        assert received == [{"ids": [ONE, self.TWO]}], "One signal for the whole request"
+
+    def test_bulk_delete_form(self, app: Flask, client: FlaskClient) -> None:
+        response = client.post("/tests/admin/posts/bulk/delete/", data={"ids": [str(self.TWO)]})
+        assert response == Redirect("/tests/admin/posts/list/")
+        assert self.titles(app) == ["Hello"]
+
+    def test_bulk_delete_missing(self, app: Flask, client: FlaskClient) -> None:
+        response = client.delete(
+            "/tests/admin/posts/bulk/delete/",
+            json={"ids": [str(ONE), str(UUID(int=5))]},
+            headers={"Accept": "application/json"},
+        )
+        assert response == NotFound()
+        assert self.titles(app) == ["Hello", "Second"]
+
+    def test_bulk_missing_in_later_chunk(
+        self, app: Flask, client: FlaskClient, adminview: type[AdminView], received: list
+    ) -> None:
+        adminview.bulk_chunk_size = 1
+        ids = [str(ONE), str(self.TWO), str(UUID(int=5))]
+
+        response = client.delete(
+            "/tests/admin/posts/bulk/delete/", json={"ids": ids}, headers={"Accept": "application/json"}
+        )
+        assert response == NotFound()
+        assert self.titles(app) == ["Hello", "Second"]
+
+        response = client.patch("/tests/admin/posts/bulk/update/", json={"ids": ids, "patch": {"content": "Patched"}})
+        assert response == NotFound()
+        with app.app_context():
+            assert "Patched" not in svcs.get(Session).scalars(select(FakePost.content)).all()
+        assert received == []
+
+    def test_bulk_delete_invalid(self, client: FlaskClient) -> None:
+        response = client.delete("/tests/admin/posts/bulk/delete/", json={"ids": ["not-a-uuid"]})
+        assert response == BadRequest()
+
+        response = client.delete("/tests/admin/posts/bulk/delete/", json={"ids": []})
+        assert response == BadRequest()
+
+    def test_bulk_update(self, app: Flask, client: FlaskClient, received: list) -> None:
+        response = client.patch(
+            "/tests/admin/posts/bulk/update/",
+            json={"ids": [str(ONE), str(self.TWO)], "patch": {"content": "Patched"}},
+        )
+        assert response == Ok()
+        assert response.json is not None
+        assert response.json["ids"] == [str(ONE), str(self.TWO)]
+        assert received == [{"ids": [ONE, self.TWO]}], "One signal for the whole request"
+
+        with app.app_context():
+            session = svcs.get(Session)
+            assert set(session.scalars(select(FakePost.content))) == {"Patched"}
+            assert self.titles(app) == ["Hello", "Second"]
+
+    def test_bulk_update_invalid(self, app: Flask, client: FlaskClient, received: list) -> None:
+        response = client.patch(
+            "/tests/admin/posts/bulk/update/",
+            json={"ids": [str(ONE), str(self.TWO)], "patch": {"title": ""}},
+            headers={"Accept": "application/json"},
+        )
+        assert response == BadRequest()
+        assert self.titles(app) == ["Hello", "Second"]
+        assert received == []
+
+        response = client.patch(
+            "/tests/admin/posts/bulk/update/",
+            json={"ids": [str(ONE)], "patch": {"id": str(self.TWO)}},
+        )
+        assert response == BadRequest()
+
+
+def test_admin_blueprint_loader_is_reused(app: Flask, adminview: type[AdminView]) -> None:
+    with app.app_context():
+        loader = adminview.bp.jinja_loader
+        assert loader is not None
+        assert adminview.bp.jinja_loader is loader
+
+
+def test_select_template_cache(app: Flask) -> None:
+    names = ["admin/post/missing.html", "admin/portal/list.html"]
+    with app.app_context():
+        template = select_template(names)
+        assert template.name == "admin/portal/list.html"
+
+        with patch.object(app.jinja_env, "select_template") as jinja_select:
+            app.jinja_env.auto_reload = False
+            assert select_template(names) is template
+            jinja_select.assert_not_called()
+
+            app.jinja_env.auto_reload = True
+            with patch.object(type(template), "is_up_to_date", new_callable=PropertyMock, return_value=False):
+                select_template(names)
+            jinja_select.assert_called_once_with(tuple(names))
@@ -0,0 +1,96 @@
+import io
+import os
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskCliRunner
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.attachments.cache import AttachmentCache
+from basingse.attachments.cache import get_stats
+from basingse.attachments.cache import TEMPORARY_PREFIX
+from basingse.attachments.ingest import ingest
+
+
+def make_attachment(index: int, size: int = 100) -> Attachment:
+    return ingest(Attachment(filename=f"file-{index}.bin"), io.BytesIO(bytes([index]) * size))
+
+
+def test_lookup_counts_hits_and_misses(app: Flask) -> None:
+    with app.app_context():
+        cache = AttachmentCache()
+        attachment = make_attachment(1)
+        attachment.cached_filepath.unlink()
+
+        assert cache.lookup(attachment).read_bytes() == bytes([1]) * 100
+        assert cache.lookup(attachment).exists()
+        assert (get_stats().misses, get_stats().hits) == (1, 1)
+        assert not any(path.name.startswith(TEMPORARY_PREFIX) for path in cache.directory.iterdir())
+
+
+def test_evict_least_recently_used(app: Flask) -> None:
+    app.config["ATTACHMENTS_CACHE_SIZE_MAX"] = 250
+    with app.app_context():
+        cache = AttachmentCache()
+        first = make_attachment(1)
+        second = make_attachment(2)
+        os.utime(first.cached_filepath, (0, 0))
+        os.utime(second.cached_filepath, (1, 1))
+
+        cache.lookup(first)
+        third = make_attachment(3)
+
+        assert first.cached_filepath.exists(), "Recently used files are kept"
+        assert not second.cached_filepath.exists()
+        assert third.cached_filepath.exists()
+        assert get_stats().evictions == 1
+        assert cache.size() <= 250
+
+
+def test_evict_keeps_new_file(app: Flask) -> None:
+    app.config["ATTACHMENTS_CACHE_SIZE_MAX"] = 50
+    with app.app_context():
+        attachment = make_attachment(1)
+        assert attachment.cached_filepath.exists(), "A file larger than the cache is still served"
+
+
+def test_expire(app: Flask) -> None:
+    with app.app_context():
+        cache = AttachmentCache()
+        attachment = make_attachment(1)
+        abandoned = cache.directory / f"{TEMPORARY_PREFIX}abandoned"
+        abandoned.write_bytes(b"partial")
+        os.utime(attachment.cached_filepath, (0, 0))
+        os.utime(abandoned, (0, 0))
+
+        assert cache.expire() == 2
+        assert not attachment.cached_filepath.exists()
+        assert not abandoned.exists()
+
+
+@pytest.fixture
+def runner(app: Flask) -> FlaskCliRunner:
+    return FlaskCliRunner(app=app)
+
+
+def test_cache_cli(app: Flask, runner: FlaskCliRunner) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = make_attachment(1)
+        session.add(attachment)
+        session.commit()
+        attachment.cached_filepath.unlink()
+
+    result = runner.invoke(args=["attach", "warm"])
+    assert result.exit_code == 0, result.output
+    assert "Warmed 1 attachments" in result.output
+
+    result = runner.invoke(args=["attach", "stats"])
+    assert result.exit_code == 0, result.output
+    assert "Files: 1" in result.output
+
+    result = runner.invoke(args=["attach", "prune"])
+    assert result.exit_code == 0, result.output
+    assert "evicted 0 files" in result.output
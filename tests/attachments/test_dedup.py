@@ -0,0 +1,83 @@
+import io
+
+from flask import Flask
+from flask_attachments import Attachment
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.attachments.dedup import deduplicate
+from basingse.attachments.dedup import detach
+from basingse.attachments.dedup import references
+from basingse.attachments.dedup import release
+from basingse.attachments.ingest import ingest
+from basingse.customize.models import Logo
+from basingse.page.models import Page
+
+LOGO = b"\x89PNG\r\n\x1a\n" + b"logo " * 100
+
+
+def make_attachment() -> Attachment:
+    return ingest(Attachment(filename="logo.png"), io.BytesIO(LOGO))
+
+
+def test_deduplicate(app: Flask) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        original = make_attachment()
+        session.add(original)
+        session.commit()
+
+        duplicate = make_attachment()
+        session.add(duplicate)
+        assert deduplicate(session, duplicate) is original
+        assert duplicate not in session
+
+        other = ingest(Attachment(filename="other.png"), io.BytesIO(b"other"))
+        assert deduplicate(session, other) is other
+
+        renamed = ingest(Attachment(filename="renamed.png"), io.BytesIO(LOGO))
+        assert deduplicate(session, renamed) is renamed, "The uploaded filename is kept"
+
+        retyped = make_attachment()
+        retyped.content_type = "application/octet-stream"
+        assert deduplicate(session, retyped) is retyped, "The uploaded content type is kept"
+
+
+def test_release_shared_attachment(app: Flask) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = make_attachment()
+        first = Logo(small=attachment)
+        second = Logo(large=attachment)
+        session.add_all([attachment, first, second])
+        session.commit()
+
+        assert references(session, attachment) == 2
+
+        detach(first, attachment)
+        assert not release(session, attachment), "Still used by the second logo"
+        session.commit()
+        assert first.small is None
+        assert second.large is attachment
+
+        detach(second, attachment)
+        assert release(session, attachment)
+        session.commit()
+        assert session.scalar(select(func.count()).select_from(Attachment)) == 0
+
+
+def test_page_references(app: Flask) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = make_attachment()
+        session.add(attachment)
+        session.commit()
+
+        page = Page(title="Images", slug="images", contents=f'{{"blocks": [{{"file": {{"id": "{attachment.id}"}}}}]}}')
+        session.add(page)
+        session.commit()
+
+        assert references(session, attachment) == 1
+        assert not release(session, attachment)
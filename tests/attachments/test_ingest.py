@@ -0,0 +1,73 @@
+import hashlib
+import io
+
+import pytest
+from flask import Flask
+from flask_attachments import Attachment
+from flask_attachments import CompressionAlgorithm
+from flask_attachments.extension import settings
+from werkzeug.datastructures import FileStorage
+
+from basingse.attachments.ingest import ingest
+from basingse.attachments.ingest import receive
+from basingse.attachments.ingest import sniff
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"image data " * 1000
+
+
+@pytest.mark.parametrize("compression", list(CompressionAlgorithm))
+def test_ingest(app: Flask, compression: CompressionAlgorithm) -> None:
+    with app.app_context():
+        attachment = Attachment(filename="image.png")
+        ingest(attachment, io.BytesIO(PNG), compression=compression, digest_algorithm="sha256", chunk_size=128)
+
+        assert attachment.content_length == len(PNG)
+        assert attachment.digest == hashlib.sha256(PNG).hexdigest()
+        assert compression.decompress(attachment.contents) == PNG
+
+        assert attachment.cached_filepath.read_bytes() == PNG, "Ingestion warms the cache"
+        assert not list(attachment.cached_filepath.parent.glob(".tmp-*"))
+
+
+def test_ingest_matches_streamed(app: Flask) -> None:
+    with app.app_context():
+        streamed = Attachment()
+        streamed.streamed(io.BytesIO(PNG))
+
+        ingested = ingest(Attachment(), io.BytesIO(PNG))
+        assert ingested.digest == streamed.digest
+        assert ingested.content_length == streamed.content_length
+
+
+def test_ingest_failure_cleans_up(app: Flask) -> None:
+    class Broken(io.RawIOBase):
+        def readable(self) -> bool:
+            return True
+
+        def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+            raise OSError("connection reset")
+
+    with app.app_context():
+        attachment = Attachment(filename="broken.png")
+        with pytest.raises(OSError):
+            ingest(attachment, Broken())
+
+        assert not list(settings.cache_directory().glob(".tmp-*"))
+
+
+def test_receive_sniffs_content_type(app: Flask) -> None:
+    with app.app_context():
+        upload = FileStorage(io.BytesIO(PNG), filename="path/to/upload", content_type="application/octet-stream")
+        attachment = receive(Attachment(), upload)
+
+        assert attachment.filename == "upload"
+        assert attachment.content_type == "image/png"
+
+        upload = FileStorage(io.BytesIO(PNG), filename="upload.txt", content_type="text/plain")
+        assert receive(Attachment(), upload).content_type == "text/plain", "Declared types are kept"
+
+
+def test_sniff() -> None:
+    assert sniff(PNG) == "image/png"
+    assert sniff(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff(b"plain text") is None
@@ -0,0 +1,182 @@
+import io
+import types
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask import render_template
+from flask.testing import FlaskClient
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.attachments import renditions
+from basingse.attachments.ingest import ingest
+from basingse.attachments.renditions import rendition_path
+from basingse.attachments.renditions import srcset
+from basingse.attachments.serve import etag
+from basingse.customize.models import Logo
+from basingse.page.models import Page
+from basingse.page.models.blocks import BlockContent
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def save(attachment: Attachment, data: bytes, app: Flask) -> Attachment:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = ingest(attachment, io.BytesIO(data))
+        session.add(attachment)
+        session.commit()
+        session.refresh(attachment)
+        session.expunge(attachment)
+    return attachment
+
+
+@pytest.fixture
+def picture(app: Flask) -> Attachment:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (1000, 500), (255, 0, 0, 128)).save(buffer, format="PNG")
+    return save(Attachment(filename="picture.png", content_type="image/png"), buffer.getvalue(), app)
+
+
+def test_rendition(app: Flask, client: FlaskClient, picture: Attachment) -> None:
+    response = client.get(f"/attachments/image/{picture.id}/320/")
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.headers["ETag"] == f'"{etag(picture)}-w320"'
+    with Image.open(io.BytesIO(response.data)) as image:
+        assert image.size == (320, 160)
+    response.close()
+
+    with app.app_context():
+        assert rendition_path(picture, 320).exists()
+
+    response = client.get(f"/attachments/image/{picture.id}/320/", headers={"If-None-Match": f'"{etag(picture)}-w320"'})
+    assert response.status_code == 304
+
+
+def test_rendition_webp(client: FlaskClient, picture: Attachment) -> None:
+    response = client.get(f"/attachments/image/{picture.id}/640.webp")
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    with Image.open(io.BytesIO(response.data)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (640, 320)
+    response.close()
+
+
+def test_rendition_never_enlarges(client: FlaskClient, picture: Attachment) -> None:
+    response = client.get(f"/attachments/image/{picture.id}/1920/")
+    with Image.open(io.BytesIO(response.data)) as image:
+        assert image.size == (1000, 500)
+    response.close()
+
+
+def test_rendition_unknown_size_or_format(client: FlaskClient, picture: Attachment) -> None:
+    assert client.get(f"/attachments/image/{picture.id}/123/").status_code == 404
+    assert client.get(f"/attachments/image/{picture.id}/320.tiff").status_code == 404
+    assert client.get(f"/attachments/image/{UUID(int=0)}/320/").status_code == 404
+
+
+def test_rendition_of_other_files(app: Flask, client: FlaskClient) -> None:
+    attachment = save(Attachment(filename="logo.svg", content_type="image/svg+xml"), b"<svg></svg>", app)
+
+    response = client.get(f"/attachments/image/{attachment.id}/320.webp")
+    assert response.status_code == 200
+    assert response.data == b"<svg></svg>", "Images which can't be resized are sent unchanged"
+    response.close()
+
+
+def test_srcset(app: Flask, picture: Attachment) -> None:
+    with app.test_request_context():
+        assert srcset(picture.id) == ", ".join(
+            f"/attachments/image/{picture.id}/{width}/ {width}w" for width in (320, 640, 960, 1280, 1920)
+        )
+
+        app.config["BASINGSE_ATTACHMENTS_RENDITION_WIDTHS"] = (100,)
+        assert srcset(picture.id, "webp") == f"/attachments/image/{picture.id}/100.webp 100w"
+
+
+def test_srcset_only_for_resizable_images(app: Flask, client: FlaskClient) -> None:
+    drawing = save(Attachment(filename="drawing.svg", content_type="image/svg+xml"), b"<svg/>", app)
+    with app.test_request_context():
+        assert srcset(drawing) == ""
+        assert srcset(drawing.id, "webp") == "", "SVGs have no webp renditions"
+        assert srcset(UUID(int=404)) == ""
+
+    with app.app_context():
+        session = svcs.get(Session)
+        page = Page(title="Drawings", slug="drawings")
+        page.blocks = BlockContent.Schema().load(
+            {
+                "blocks": [
+                    {
+                        "type": "image",
+                        "data": {
+                            "file": {"url": f"/attachments/id/{drawing.id}/", "id": str(drawing.id)},
+                            "caption": "A drawing",
+                            "withBorder": False,
+                            "withBackground": False,
+                            "stretched": False,
+                        },
+                    }
+                ]
+            }
+        )
+        page.publish()
+        session.add(page)
+        session.commit()
+
+    response = client.get("/page/drawings/")
+    assert response.status_code == 200
+    assert b"image/webp" not in response.data
+    assert b"srcset" not in response.data
+
+
+def test_srcset_without_pillow(app: Flask, picture: Attachment, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(renditions, "Image", None)
+    with app.test_request_context():
+        assert srcset(picture.id) == ""
+        assert srcset(picture.id, "webp") == ""
+
+
+def test_brand_srcset(app: Flask, picture: Attachment) -> None:
+    logo = Logo(large=picture)
+    site_settings = types.SimpleNamespace(title="Ba Sing Se", logo=logo)
+
+    with app.test_request_context():
+        brand = types.SimpleNamespace(class_=[], url="/", src=picture.link, srcset=None)
+        assert logo.srcset("text") == srcset(picture.id)
+        html = render_template("navbar/_brand.html", brand=brand, site_settings=site_settings)
+    assert f'srcset="/attachments/image/{picture.id}/320/ 320w' in html
+
+
+def test_image_block_srcset(app: Flask, client: FlaskClient, picture: Attachment) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = Page(title="Pictures", slug="pictures")
+        page.blocks = BlockContent.Schema().load(
+            {
+                "blocks": [
+                    {
+                        "type": "image",
+                        "data": {
+                            "file": {"url": f"/attachments/id/{picture.id}/", "id": str(picture.id)},
+                            "caption": "A picture",
+                            "withBorder": False,
+                            "withBackground": False,
+                            "stretched": False,
+                        },
+                    }
+                ]
+            }
+        )
+        page.publish()
+        session.add(page)
+        session.commit()
+
+    response = client.get("/page/pictures/")
+    assert response.status_code == 200
+    assert f'srcset="/attachments/image/{picture.id}/320/ 320w'.encode() in response.data
+    assert f'srcset="/attachments/image/{picture.id}/320.webp 320w'.encode() in response.data
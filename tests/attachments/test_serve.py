@@ -0,0 +1,81 @@
+import io
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.attachments.ingest import ingest
+from basingse.attachments.serve import etag
+
+DATA = b"0123456789" * 100
+
+
+@pytest.fixture
+def attachment(app: Flask) -> Attachment:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = ingest(Attachment(filename="data.bin"), io.BytesIO(DATA))
+        session.add(attachment)
+        session.commit()
+        session.refresh(attachment)
+        session.expunge(attachment)
+    return attachment
+
+
+def url(id: UUID) -> str:
+    return f"/attachments/id/{id}/"
+
+
+def test_send(client: FlaskClient, attachment: Attachment) -> None:
+    response = client.get(url(attachment.id))
+    assert response.status_code == 200
+    assert response.data == DATA
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == f'"{etag(attachment)}"', "Strong ETag from the digest"
+    response.close()
+
+
+def test_send_download(client: FlaskClient, attachment: Attachment) -> None:
+    response = client.get(f"/attachments/download/{attachment.id}/")
+    assert response.status_code == 200
+    assert "attachment" in response.headers["Content-Disposition"]
+    response.close()
+
+
+def test_send_not_found(client: FlaskClient) -> None:
+    response = client.get(url(UUID(int=0)))
+    assert response.status_code == 404
+
+
+def test_send_not_modified(client: FlaskClient, attachment: Attachment) -> None:
+    attachment.cached_filepath.unlink()
+
+    response = client.get(url(attachment.id), headers={"If-None-Match": f'"{etag(attachment)}"'})
+    assert response.status_code == 304
+    assert not attachment.cached_filepath.exists(), "Conditional requests don't warm the cache"
+
+
+def test_send_range(client: FlaskClient, attachment: Attachment) -> None:
+    response = client.get(url(attachment.id), headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == DATA[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(DATA)}"
+    response.close()
+
+
+def test_send_if_range(client: FlaskClient, attachment: Attachment) -> None:
+    headers = {"Range": "bytes=0-9", "If-Range": f'"{etag(attachment)}"'}
+    response = client.get(url(attachment.id), headers=headers)
+    assert response.status_code == 206
+    assert response.data == DATA[:10]
+    response.close()
+
+    headers["If-Range"] = '"stale"'
+    response = client.get(url(attachment.id), headers=headers)
+    assert response.status_code == 200, "A stale If-Range sends the whole file"
+    assert response.data == DATA
+    response.close()
@@ -0,0 +1,117 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask_attachments import Attachment
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.attachments.ingest import ingest
+from basingse.page.cli import page_cli
+from basingse.page.export import export_site
+from basingse.page.export import MANIFEST
+from basingse.page.export import target
+from basingse.page.models import Page
+from basingse.page.models.blocks import BlockContent
+
+
+def image_block(attachment: Attachment) -> dict:
+    return {
+        "type": "image",
+        "data": {
+            "file": {"url": attachment.link, "id": str(attachment.id)},
+            "caption": "Picture",
+            "withBorder": False,
+            "withBackground": False,
+            "stretched": False,
+        },
+    }
+
+
+@pytest.fixture
+def site(app: Flask) -> str:
+    with app.app_context(), app.test_request_context():
+        session = svcs.get(Session)
+        attachment = ingest(Attachment(filename="picture.svg", content_type="image/svg+xml"), io.BytesIO(b"<svg/>"))
+        session.add(attachment)
+        session.flush()
+
+        about = Page(title="About", slug="about")
+        about.blocks = BlockContent.Schema().load(
+            {"blocks": [{"type": "paragraph", "data": {"text": "About us"}}, image_block(attachment)]}
+        )
+        about.publish()
+
+        draft = Page(title="Draft", slug="draft")
+        draft.blocks = BlockContent.Schema().load({"blocks": [{"type": "paragraph", "data": {"text": "Secret"}}]})
+
+        session.add_all([about, draft])
+        session.commit()
+        return attachment.link
+
+
+def test_target() -> None:
+    assert target("/", "text/html") == "index.html"
+    assert target("/page/about/", "text/html") == "page/about/index.html"
+    assert target("/attachments/id/1/", "image/png") == "attachments/id/1/index.png"
+    assert target("/assets/main.js", "text/javascript") == "assets/main.js"
+
+
+def test_export_site(app: Flask, site: str, tmp_path: Path) -> None:
+    output = tmp_path / "site"
+    report = export_site(app, output, workers=1)
+
+    assert not report.failed
+    assert all(error.url.startswith("/static/") for error in report.missing), "Only missing static files"
+    assert [page.url for page in report.pages] == ["/", "/page/about/", "/page/home/"]
+    assert b"About us" in (output / "page/about/index.html").read_bytes()
+    assert not (output / "page/draft").exists(), "Drafts are not exported"
+
+    (attachment,) = [item for item in report.files if item.url == site]
+    assert (output / attachment.path).read_bytes() == b"<svg/>"
+    assert attachment.content_type == "image/svg+xml"
+
+    manifest = json.loads((output / MANIFEST).read_text())
+    assert {entry["url"] for entry in manifest["files"]} >= {"/", "/page/about/", site}
+
+    # Nothing changed, so nothing is written again
+    report = export_site(app, output, workers=1)
+    assert report.written == 0
+
+    with app.app_context():
+        session = svcs.get(Session)
+        page = session.scalars(select(Page).where(Page.slug == "about")).one()
+        page.unpublish()
+        session.commit()
+
+    report = export_site(app, output, workers=1)
+    assert "page/about/index.html" in report.removed
+    assert not (output / "page/about/index.html").exists()
+
+
+def test_export_keeps_failed_pages(app: Flask, site: str, tmp_path: Path) -> None:
+    output = tmp_path / "site"
+    report = export_site(app, output, workers=1)
+    (attachment,) = [item for item in report.files if item.url == site]
+
+    app.view_functions["page.page"] = lambda **kwargs: ("Broken", 500)
+    report = export_site(app, output, workers=1)
+    assert [error.url for error in report.failed] == ["/page/about/", "/page/home/"]
+    assert not report.removed, "Nothing is pruned while pages are failing"
+    assert (output / "page/about/index.html").exists()
+    assert (output / attachment.path).exists(), "Files used by a failed page are kept"
+
+    manifest = {entry["url"]: entry for entry in json.loads((output / MANIFEST).read_text())["files"]}
+    assert manifest["/page/about/"]["path"] == "page/about/index.html"
+    assert manifest[site]["path"] == attachment.path
+
+
+@pytest.mark.usefixtures("site")
+def test_export_static_cli(app: Flask, tmp_path: Path) -> None:
+    result = app.test_cli_runner().invoke(page_cli, ["export-static", str(tmp_path / "site"), "--workers", "4"])
+    assert result.exit_code == 0, result.output
+    assert "Exported 3 pages" in result.output
+    assert "pages/s" in result.output
@@ -0,0 +1,80 @@
+import functools
+from uuid import UUID
+
+import httpx
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from ..auth.conftest import user  # noqa: F401
+from basingse import svcs
+from basingse.auth.models import User
+from basingse.http import HTTPSettings
+from basingse.page.extension import get_extension
+
+IMAGE = b"\x89PNG fake image data" * 10
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/image.png":
+        return httpx.Response(200, content=IMAGE, headers={"content-type": "image/png"})
+    if request.url.path == "/huge.png":
+        return httpx.Response(200, content=b"x" * 1024, headers={"content-type": "image/png"})
+    if request.url.path == "/chunked.png":
+        return httpx.Response(200, content=iter([b"x" * 512, b"x" * 512]), headers={"content-type": "image/png"})
+    return httpx.Response(404)
+
+
+@pytest.fixture
+def remote(app: Flask) -> None:
+    svcs.register_value(app, httpx.Client, httpx.Client(transport=httpx.MockTransport(handler)))
+    svcs.register_value(app, HTTPSettings, HTTPSettings(max_download_size=512))
+
+
+@pytest.fixture
+def headers(app: Flask, user: functools.partial[User]) -> dict[str, str]:  # noqa: F811
+    editor = user("admin")
+    with app.test_request_context("/"):
+        token = get_extension().serializer().dumps(editor.token)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_http_client_is_registered(app: Flask) -> None:
+    with app.app_context():
+        client = svcs.get(httpx.Client)
+        assert client is svcs.get(httpx.Client)
+        assert client.timeout.connect == HTTPSettings().connect_timeout
+
+
+@pytest.mark.usefixtures("remote")
+def test_fetch(app: Flask, client: FlaskClient, headers: dict[str, str]) -> None:
+    response = client.post("/admin/fetch", json={"url": "https://example.test/image.png"}, headers=headers)
+    assert response.status_code == 200, response.json
+    assert response.json is not None
+    assert response.json["success"] == 1
+
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = session.get(Attachment, UUID(response.json["file"]["id"]))
+        assert attachment is not None
+        assert attachment.content_length == len(IMAGE)
+        assert attachment.mimetype == "image/png"
+
+
+@pytest.mark.usefixtures("remote")
+@pytest.mark.parametrize("path", ["/huge.png", "/chunked.png", "/missing.png"])
+def test_fetch_rejected(client: FlaskClient, headers: dict[str, str], path: str) -> None:
+    response = client.post("/admin/fetch", json={"url": f"https://example.test{path}"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json is not None
+    assert response.json["success"] == 0
+
+
+@pytest.mark.usefixtures("remote")
+def test_fetch_deduplicates(client: FlaskClient, headers: dict[str, str]) -> None:
+    first = client.post("/admin/fetch", json={"url": "https://example.test/image.png"}, headers=headers)
+    second = client.post("/admin/fetch", json={"url": "https://example.test/image.png"}, headers=headers)
+    assert first.json is not None and second.json is not None
+    assert first.json["file"]["id"] == second.json["file"]["id"]
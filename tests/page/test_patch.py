@@ -0,0 +1,138 @@
+from typing import Any
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from marshmallow import ValidationError
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.page.models import Page
+from basingse.page.models.blocks import BlockContent
+from basingse.page.patch import apply
+from basingse.page.patch import Operation
+from basingse.page.patch import PatchError
+
+
+def paragraph(id: str, text: str) -> dict[str, Any]:
+    return {"id": id, "type": "paragraph", "data": {"text": text}}
+
+
+def content(*blocks: dict[str, Any]) -> BlockContent:
+    return BlockContent.Schema().load({"blocks": list(blocks), "version": "2.29.0"})
+
+
+def operations(*items: dict[str, Any]) -> list[Operation]:
+    return Operation.Schema(many=True).load(list(items))
+
+
+def texts(content: BlockContent) -> list[tuple[str | None, str]]:
+    return [(block.id, block.data.text) for block in content.blocks]  # type: ignore[attr-defined]
+
+
+def test_apply() -> None:
+    original = content(paragraph("a", "One"), paragraph("b", "Two"), paragraph("c", "Three"))
+    result = apply(
+        original,
+        operations(
+            {"op": "insert", "block": paragraph("d", "Four"), "index": 1},
+            {"op": "update", "block": paragraph("b", "Deux")},
+            {"op": "move", "id": "c", "index": 0},
+            {"op": "delete", "id": "a"},
+            {"op": "insert", "block": paragraph("e", "Five")},
+        ),
+    )
+    assert texts(result) == [("c", "Three"), ("d", "Four"), ("b", "Deux"), ("e", "Five")]
+    assert result.version == "2.29.0"
+    assert result.time is not None
+    assert len(original.blocks) == 3, "The original content is not changed"
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "update", "block": paragraph("z", "Missing")},
+        {"op": "delete", "id": "z"},
+        {"op": "move", "id": "a", "index": 2},
+        {"op": "insert", "block": paragraph("a", "Duplicate")},
+        {"op": "insert", "block": paragraph("z", "Far away"), "index": 5},
+    ],
+)
+def test_apply_invalid(operation: dict[str, Any]) -> None:
+    with pytest.raises(PatchError):
+        apply(content(paragraph("a", "One"), paragraph("b", "Two")), operations(operation))
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "replace", "id": "a"},
+        {"op": "update", "id": "a"},
+        {"op": "insert", "block": {"type": "paragraph", "data": {"text": "No id"}}},
+        {"op": "move", "id": "a"},
+        {"op": "delete"},
+    ],
+)
+def test_operation_validation(operation: dict[str, Any]) -> None:
+    with pytest.raises(ValidationError):
+        operations(operation)
+
+
+@pytest.fixture
+def page(app: Flask) -> UUID:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = Page(title="Blocks", slug="blocks")
+        page.blocks = content(paragraph("a", "One"), paragraph("b", "Two"))
+        session.add(page)
+        session.commit()
+        return page.id
+
+
+def stored(app: Flask, id: UUID) -> Page:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = session.get(Page, id, execution_options={"include_unpublished": True})
+        assert page is not None
+        return page
+
+
+def test_patch_blocks(app: Flask, client: FlaskClient, page: UUID) -> None:
+    url = f"/admin/pages/{page}/blocks/"
+    headers = {"Accept": "application/json"}
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.json is not None
+    version = response.json["version"]
+    assert response.headers["ETag"] == f'"{version}"'
+    assert [block["id"] for block in response.json["contents"]["blocks"]] == ["a", "b"]
+
+    body = {"operations": [{"op": "update", "block": paragraph("b", "Deux")}, {"op": "delete", "id": "a"}]}
+    response = client.patch(url, json=body, headers={**headers, "If-Match": f'"{version}"'})
+    assert response.status_code == 200, response.json
+    assert response.json is not None
+    assert response.json["version"] != version
+    assert response.json["blocks"] == 1
+    assert response.json["version"] == stored(app, page).contents_version
+    assert texts(stored(app, page).blocks) == [("b", "Deux")]
+
+    # A client which edited the old version is rejected
+    response = client.patch(url, json={"operations": []}, headers={**headers, "If-Match": f'"{version}"'})
+    assert response.status_code == 412
+
+    response = client.patch(url, json={"operations": [{"op": "delete", "id": "a"}]}, headers=headers)
+    assert response.status_code == 400
+    assert response.json is not None
+    assert "No block with id 'a'" in response.json["error"]
+
+    response = client.patch(url, json={"operations": [{"op": "replace"}]}, headers=headers)
+    assert response.status_code == 400
+    assert texts(stored(app, page).blocks) == [("b", "Deux")]
+
+
+def test_edit_form_enables_block_saves(client: FlaskClient, page: UUID) -> None:
+    response = client.get(f"/admin/pages/{page}/edit/")
+    assert response.status_code == 200
+    assert f'data-blocks-url="/admin/pages/{page}/blocks/"'.encode() in response.data
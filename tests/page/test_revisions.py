@@ -0,0 +1,177 @@
+import random
+from typing import Any
+from uuid import UUID
+
+import pytest
+from flask import Flask
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.page import revisions as history
+from basingse.page.cli import page_cli
+from basingse.page.models import Page
+from basingse.page.models import PageRevision
+from basingse.page.models.blocks import BlockContent
+from basingse.page.patch import apply
+from basingse.page.patch import Operation
+from basingse.page.revisions import diff
+from basingse.page.revisions import prune
+from basingse.page.revisions import reconstruct
+from basingse.page.settings import PageSettings
+from basingse.page.settings import SETTINGS_KEY
+
+
+def paragraph(id: str, text: str) -> dict[str, Any]:
+    return {"id": id, "type": "paragraph", "data": {"text": text}}
+
+
+def content(*blocks: dict[str, Any]) -> BlockContent:
+    return BlockContent.Schema().load({"blocks": list(blocks), "version": "2.29.0"})
+
+
+def long_page(edit: int) -> BlockContent:
+    blocks = [paragraph(f"b{index}", f"Paragraph {index} " + "lorem ipsum " * 20) for index in range(20)]
+    blocks[edit % 20] = paragraph(f"b{edit % 20}", f"Edit {edit}")
+    return content(*blocks)
+
+
+def save(app: Flask, id: UUID | None, blocks: BlockContent) -> UUID:
+    with app.app_context():
+        session = svcs.get(Session)
+        if id is None:
+            page = Page(title="History", slug="history")
+            session.add(page)
+        else:
+            page = session.get_one(Page, id, execution_options={"include_unpublished": True})
+        page.blocks = blocks
+        session.commit()
+        return page.id
+
+
+def revisions(app: Flask, id: UUID) -> list[tuple[int, bool]]:
+    with app.app_context():
+        query = select(PageRevision.number, PageRevision.snapshot).where(PageRevision.page_id == id)
+        return [tuple(row) for row in svcs.get(Session).execute(query.order_by(PageRevision.number))]
+
+
+def test_record_retries_taken_numbers(app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    id = save(app, None, content(paragraph("a", "One")))
+    save(app, id, content(paragraph("a", "Two")))
+
+    # As if another save recorded a revision between reading the latest number and inserting this one
+    latest = history._latest
+    stale = iter([(1, 1)])
+    monkeypatch.setattr(
+        history, "_latest", lambda connection, page_id: next(stale, None) or latest(connection, page_id)
+    )
+
+    save(app, id, content(paragraph("a", "Three")))
+    assert [number for number, _ in revisions(app, id)] == [1, 2, 3]
+    with app.app_context():
+        assert reconstruct(svcs.get(Session), id, 3).blocks == content(paragraph("a", "Three")).blocks
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_diff(seed: int) -> None:
+    rng = random.Random(seed)
+    old = content(*(paragraph(f"b{index}", f"Text {index}") for index in range(8)))
+    blocks = [paragraph(f"b{index}", f"Text {index}") for index in rng.sample(range(8), 5)]
+    blocks[0]["data"]["text"] = "Changed"
+    blocks.insert(rng.randrange(len(blocks)), paragraph("new", "New"))
+    new = content(*blocks)
+
+    operations = diff(old, new)
+    assert operations is not None
+    assert apply(old, Operation.Schema(many=True).load(operations)).blocks == new.blocks
+
+
+def test_diff_requires_ids() -> None:
+    assert diff(content(paragraph("a", "One")), content({"type": "paragraph", "data": {"text": "No id"}})) is None
+    assert diff(content(paragraph("a", "One")), content(paragraph("b", "Two"), paragraph("b", "Two"))) is None
+
+
+def test_revisions(app: Flask) -> None:
+    app.extensions[SETTINGS_KEY] = PageSettings(revision_snapshot_interval=5)
+
+    versions = [long_page(edit) for edit in range(12)]
+    id = None
+    for version in versions:
+        id = save(app, id, version)
+    assert id is not None
+
+    assert [number for number, snapshot in revisions(app, id) if snapshot] == [1, 6, 11]
+    assert len(revisions(app, id)) == 12
+
+    with app.app_context():
+        session = svcs.get(Session)
+        for number, version in enumerate(versions, start=1):
+            assert reconstruct(session, id, number) == version
+        assert reconstruct(session, id).blocks == versions[-1].blocks
+
+        with pytest.raises(LookupError):
+            reconstruct(session, id, 13)
+
+        stored = session.scalar(select(func.sum(func.length(PageRevision.data))).where(PageRevision.page_id == id))
+        full = sum(len(BlockContent.Schema().dumps(version)) for version in versions)
+        assert stored < full / 3, "Deltas are a fraction of full copies"
+
+
+def test_revisions_unchanged(app: Flask) -> None:
+    id = save(app, None, long_page(0))
+    with app.app_context():
+        session = svcs.get(Session)
+        page = session.get_one(Page, id, execution_options={"include_unpublished": True})
+        page.title = "Renamed"
+        session.commit()
+
+    assert revisions(app, id) == [(1, True)], "Only changes to the contents are recorded"
+
+
+def test_prune(app: Flask) -> None:
+    versions = [long_page(edit) for edit in range(6)]
+    id = None
+    for version in versions:
+        id = save(app, id, version)
+    assert id is not None
+
+    with app.app_context():
+        session = svcs.get(Session)
+        assert prune(session, keep=10) == (0, 0)
+        assert prune(session, keep=2) == (4, 1)
+        session.commit()
+
+    assert revisions(app, id) == [(5, True), (6, False)]
+    with app.app_context():
+        session = svcs.get(Session)
+        assert reconstruct(session, id, 5).blocks == versions[4].blocks
+        assert reconstruct(session, id, 6).blocks == versions[5].blocks
+
+
+def test_prune_cli(app: Flask) -> None:
+    id = None
+    for edit in range(4):
+        id = save(app, id, long_page(edit))
+    assert id is not None
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(page_cli, ["revisions", "prune", "--keep", "1", "--older-than", "1"])
+    assert result.exit_code == 0, result.output
+    assert "Removed 0 revisions from 0 pages" in result.output, "Recent revisions are kept"
+
+    result = runner.invoke(page_cli, ["revisions", "prune", "--keep", "1"])
+    assert result.exit_code == 0, result.output
+    assert "Removed 3 revisions from 1 pages" in result.output
+    assert revisions(app, id) == [(4, True)]
+
+
+def test_revisions_deleted_with_page(app: Flask) -> None:
+    id = save(app, None, long_page(0))
+    id = save(app, id, long_page(1))
+    with app.app_context():
+        session = svcs.get(Session)
+        session.delete(session.get_one(Page, id, execution_options={"include_unpublished": True}))
+        session.commit()
+
+    assert revisions(app, id) == []
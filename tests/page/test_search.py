@@ -0,0 +1,131 @@
+from typing import Any
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.page.cli import page_cli
+from basingse.page.models import Page
+from basingse.page.models.blocks import BlockContent
+from basingse.page.search import extract_text
+from basingse.page.search import page_search
+from basingse.page.search import search
+
+
+def content(*paragraphs: str) -> BlockContent:
+    data: dict[str, Any] = {"blocks": [{"type": "paragraph", "data": {"text": text}} for text in paragraphs]}
+    return BlockContent.Schema().load(data)
+
+
+def add_page(app: Flask, title: str, slug: str, *paragraphs: str, publish: bool = True) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = Page(title=title, slug=slug)
+        page.blocks = content(*paragraphs)
+        if publish:
+            page.publish()
+        session.add(page)
+        session.commit()
+
+
+def titles(app: Flask, terms: str, include_unpublished: bool = False) -> list[str]:
+    with app.app_context():
+        session = svcs.get(Session)
+        query = search(session, terms).execution_options(include_unpublished=include_unpublished)
+        return [page.title for page in session.scalars(query)]
+
+
+@pytest.fixture
+def pages(app: Flask) -> None:
+    add_page(app, "Gardening", "gardening", "How to grow <b>tomatoes</b> in containers.")
+    add_page(app, "Tomatoes", "tomatoes", "Everything about tomatoes.", "Tomatoes &amp; basil.")
+    add_page(app, "Cooking", "cooking", "Recipes for pasta.")
+    add_page(app, "Secret tomatoes", "secret", "A draft about tomatoes.", publish=False)
+
+
+def test_extract_text() -> None:
+    data = {
+        "blocks": [
+            {"type": "header", "data": {"text": "Title", "level": 1}},
+            {"type": "paragraph", "data": {"text": "Some <i>emphasis</i> &amp; more"}},
+            {"type": "horizontalRule", "data": {}},
+        ]
+    }
+    assert extract_text(BlockContent.Schema().load(data)) == "Title\nSome emphasis & more"
+
+
+@pytest.mark.usefixtures("pages")
+def test_search_ranked(app: Flask) -> None:
+    assert titles(app, "tomatoes") == ["Tomatoes", "Gardening"], "Title matches rank first, drafts are hidden"
+    assert titles(app, "tomato") == ["Tomatoes", "Gardening"], "Words are stemmed"
+    assert titles(app, "past") == ["Cooking"], "The last word matches as a prefix"
+    assert titles(app, "tomatoes", include_unpublished=True) == ["Tomatoes", "Secret tomatoes", "Gardening"]
+    assert titles(app, 'grow" OR "pasta') == [], "Query syntax is matched literally"
+    assert titles(app, "  ") == []
+
+
+@pytest.mark.usefixtures("pages")
+def test_search_index_updates(app: Flask) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = session.scalars(select(Page).where(Page.slug == "cooking")).one()
+        page.blocks = content("Recipes for tomato soup.")
+        session.commit()
+
+    assert titles(app, "tomatoes") == ["Tomatoes", "Cooking", "Gardening"]
+    assert titles(app, "pasta") == []
+
+    with app.app_context():
+        session = svcs.get(Session)
+        session.delete(session.scalars(select(Page).where(Page.slug == "tomatoes")).one())
+        session.commit()
+
+    assert titles(app, "tomatoes") == ["Cooking", "Gardening"]
+
+
+@pytest.mark.usefixtures("pages")
+def test_search_view(client: FlaskClient) -> None:
+    response = client.get("/search/?q=tomatoes")
+    assert response.status_code == 200
+    assert b'href="/page/tomatoes/"' in response.data
+    assert b"/page/secret/" not in response.data
+
+    response = client.get("/search/?q=tomatoes", headers={"Accept": "application/json"})
+    assert response.json is not None
+    assert [result["slug"] for result in response.json["results"]] == ["tomatoes", "gardening"]
+
+
+@pytest.mark.usefixtures("pages")
+def test_admin_search(client: FlaskClient) -> None:
+    response = client.get("/admin/pages/list/?q=tomatoes", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert response.json is not None
+    assert [page["slug"] for page in response.json["data"]] == ["tomatoes", "secret", "gardening"]
+
+
+@pytest.mark.usefixtures("pages")
+def test_reindex(app: Flask) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        session.execute(page_search.delete())
+        session.commit()
+
+    assert titles(app, "tomatoes") == []
+
+    result = app.test_cli_runner().invoke(page_cli, ["reindex"])
+    assert result.exit_code == 0, result.output
+    assert "Indexed 4 pages" in result.output
+
+    assert titles(app, "tomatoes") == ["Tomatoes", "Gardening"]
+    with app.app_context():
+        assert svcs.get(Session).scalar(select(func.count()).select_from(page_search)) == 4
+
+
+def test_admin_search_box(client: FlaskClient) -> None:
+    response = client.get("/admin/pages/list/?q=tomatoes")
+    assert response.status_code == 200
+    assert b'name="q" value="tomatoes"' in response.data
@@ -1,4 +1,7 @@
 import dataclasses as dc
+import json
+from pathlib import Path
+from types import ModuleType
 from typing import Any
 from typing import cast
 
@@ -8,6 +11,11 @@ from flask import Flask
 from basingse.autoimport import AutoImport
 from basingse.autoimport import AutoImportModuleRecord
 from basingse.autoimport import DEFAULT_AVOID
+from basingse.autoimport import discover
+from basingse.autoimport import deferrable
+from basingse.autoimport import ManifestEntry
+from basingse.autoimport import read_manifest
+from basingse.autoimport import write_manifest
 
 
 @dc.dataclass
@@ -21,6 +29,11 @@ class FakeModule:
     initialized: bool = False
 
 
+@dc.dataclass
+class FakeDeferredModule(FakeModule):
+    __autoimport_defer__: bool = True
+
+
 class FakeModuleWithInit(FakeModule):
     def init_app(self, app: Any) -> None:
         self.initialized = True
@@ -81,6 +94,11 @@ def test_imports(monkeypatch: pytest.MonkeyPatch) -> None:
     assert len(record) == 2
     assert record.avoid == DEFAULT_AVOID
 
+    assert record["with_init"].import_time >= 0
+    assert record["simple"].init_time == 0
+    assert record.duration >= sum(module.duration for module in record.modules)
+    assert record.started_at > 0
+
 
 def test_imports_via_init_app(monkeypatch: pytest.MonkeyPatch) -> None:
     setup = FakeSetup()
@@ -146,7 +164,95 @@ def test_imports_avoid(monkeypatch: pytest.MonkeyPatch) -> None:
             AutoImportModuleRecord(name="foo", skipped=True, initialized=True),
             "<foo skipped>",
         ),
+        (
+            AutoImportModuleRecord(name="foo", skipped=False, initialized=False, deferred=True),
+            "<foo deferred>",
+        ),
     ],
 )
 def test_module_record_repr(record: AutoImportModuleRecord, expected: str) -> None:
     assert repr(record) == expected
+
+
+@pytest.fixture
+def setup(monkeypatch: pytest.MonkeyPatch) -> FakeSetup:
+    setup = FakeSetup()
+    setup.modules["pkg.simple"] = FakeModule()
+    setup.modules["pkg.lazy"] = FakeDeferredModule()
+    setup.modules["pkg.with_init"] = FakeModuleWithInit()
+    setup.modules["pkg.tests"] = FakeModule()
+    monkeypatch.setattr("basingse.autoimport.find_modules", setup.find_modules)
+    monkeypatch.setattr("basingse.autoimport.import_string", setup.import_string)
+    return setup
+
+
+def test_manifest_roundtrip(setup: FakeSetup, tmp_path: Path) -> None:
+    path = str(tmp_path / "autoimport.json")
+    write_manifest(path, "pkg", discover("pkg", DEFAULT_AVOID))
+
+    assert read_manifest(path, "pkg") == [
+        ManifestEntry("pkg.simple", init_app=False, defer=False),
+        ManifestEntry("pkg.lazy", init_app=False, defer=True),
+        ManifestEntry("pkg.with_init", init_app=True, defer=False),
+    ]
+    assert read_manifest(path, "other") is None
+    assert read_manifest(str(tmp_path / "missing.json"), "pkg") is None
+
+
+def test_imports_from_manifest(setup: FakeSetup, tmp_path: Path) -> None:
+    path = str(tmp_path / "autoimport.json")
+    write_manifest(
+        path,
+        "pkg",
+        [
+            ManifestEntry("pkg.simple", init_app=False, defer=False),
+            ManifestEntry("pkg.lazy", init_app=False, defer=True),
+            ManifestEntry("pkg.with_init", init_app=True, defer=True),
+        ],
+    )
+    setup._calls.clear()
+
+    app = cast(Flask, FakeFlask())
+    record = AutoImport(manifest=path, defer=True).auto_import(app, "pkg")
+
+    assert setup._calls == [], "Expected no package discovery"
+    assert setup["pkg.with_init"].initialized, "Modules with init_app are never deferred"
+    assert record["pkg.with_init"].initialized
+    assert not record["pkg.simple"].deferred, "Modules are only deferred when they opt in"
+    assert record["pkg.lazy"].deferred
+    assert record.import_deferred() == ["pkg.lazy"]
+
+
+def test_only_opted_in_modules_are_deferred(setup: FakeSetup, tmp_path: Path) -> None:
+    # A module which only adds routes to a blueprint defined elsewhere registers them when imported
+    views = ModuleType("pkg.views")
+    setup.modules["pkg.views"] = cast(FakeModule, views)
+
+    path = str(tmp_path / "autoimport.json")
+    write_manifest(path, "pkg", discover("pkg", DEFAULT_AVOID))
+    assert not deferrable(views)
+    assert deferrable(setup["pkg.lazy"])
+
+    record = AutoImport(manifest=path, defer=True).auto_import(cast(Flask, FakeFlask()), "pkg")
+    assert record["pkg.lazy"].deferred
+    assert not record["pkg.views"].deferred
+    assert not record["pkg.simple"].deferred
+
+
+def test_old_manifests_are_not_deferred(setup: FakeSetup, tmp_path: Path) -> None:
+    path = tmp_path / "autoimport.json"
+    path.write_text(
+        json.dumps({"name": "pkg", "modules": [{"name": "pkg.lazy", "init_app": False, "registers": False}]})
+    )
+
+    record = AutoImport(manifest=str(path), defer=True).auto_import(cast(Flask, FakeFlask()), "pkg")
+    assert not record["pkg.lazy"].deferred, "Manifests without opt-ins can't be trusted to defer"
+
+
+def test_imports_from_missing_manifest(setup: FakeSetup, tmp_path: Path) -> None:
+    app = cast(Flask, FakeFlask())
+    record = AutoImport(manifest=str(tmp_path / "missing.json"), defer=True).auto_import(app, "pkg")
+
+    assert len(setup._calls) == 1, "Expected to fall back to package discovery"
+    assert not record["pkg.simple"].deferred, "Modules can't be deferred without a manifest"
+    assert record["pkg.tests"].skipped
@@ -1,7 +1,9 @@
 import functools
+from pathlib import Path
 
 import pytest
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from pytest_basingse.templates import TemplatesFixture
 from sqlalchemy.orm import Session
 
@@ -10,8 +12,10 @@ from basingse import svcs
 from basingse.app import configure_app
 from basingse.auth.models import User
 from basingse.auth.testing import LoginClient
+from basingse.autoimport import read_manifest
 from basingse.customize.models import SiteSettings
 from basingse.customize.services import get_site_settings
+from basingse.views import CoreSettings
 
 
 @pytest.fixture
@@ -111,3 +115,34 @@ def test_model_cli(app: Flask) -> None:
     result = runner.invoke(init)
 
     assert result.exit_code == 0, result.output
+
+
+def test_compile_templates(app: Flask, tmp_path: Path) -> None:
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["basingse", "compile-templates"])
+    assert result.exit_code != 0, "Expected an error without a bytecode cache"
+
+    result = runner.invoke(args=["basingse", "compile-templates", "--directory", str(tmp_path / "jinja")])
+    assert result.exit_code == 0, result.output
+    assert "Compiled" in result.output
+
+    assert isinstance(app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+    assert len(list((tmp_path / "jinja").glob("__jinja2_*.cache"))) > 10
+
+
+def test_core_bytecode_cache(tmp_path: Path) -> None:
+    app = Flask(__name__)
+    CoreSettings(bytecode_cache=str(tmp_path / "jinja")).init_app(app)
+    assert isinstance(app.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+    assert (tmp_path / "jinja").is_dir()
+
+
+def test_autoimport_manifest(app: Flask, tmp_path: Path) -> None:
+    runner = app.test_cli_runner()
+    output = tmp_path / "autoimport.json"
+    result = runner.invoke(args=["basingse", "autoimport-manifest", "--name", "basingse.utils", "-o", str(output)])
+    assert result.exit_code == 0, result.output
+
+    entries = read_manifest(str(output), "basingse.utils")
+    assert entries is not None
+    assert "basingse.utils.urls" in {entry.name for entry in entries}
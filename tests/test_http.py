@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+from basingse.http import BoundedReader
+from basingse.http import DownloadTooLarge
+from basingse.http import DownloadTooSlow
+
+
+def test_bounded_reader() -> None:
+    reader = BoundedReader(iter([b"hello ", b"world"]), max_size=None, timeout=None)
+    assert io.BufferedReader(reader).read() == b"hello world"
+
+
+def test_bounded_reader_too_large() -> None:
+    reader = BoundedReader(iter([b"hello ", b"world"]), max_size=8, timeout=None)
+    with pytest.raises(DownloadTooLarge):
+        reader.read(16)
+        reader.read(16)
+
+
+def test_bounded_reader_too_slow() -> None:
+    reader = BoundedReader(iter([b"hello ", b"world"]), max_size=None, timeout=-1)
+    with pytest.raises(DownloadTooSlow):
+        reader.read(16)
@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+
+#: Upper bound on the CPU time to import basingse.app, in seconds. This is deliberately generous,
+#: it is meant to catch a heavy dependency being imported eagerly, not small regressions.
+IMPORT_BUDGET = 1.0
+
+PROBE = """
+import json, sys, time
+start = time.process_time()
+import basingse.app
+elapsed = time.process_time() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+LAZY_MODULES = [
+    "grpc",
+    "opentelemetry.exporter.otlp.proto.grpc.trace_exporter",
+    "opentelemetry.exporter.otlp.proto.http.trace_exporter",
+    "opentelemetry.exporter.richconsole",
+    "opentelemetry.instrumentation.flask",
+    "opentelemetry.instrumentation.sqlalchemy",
+    "opentelemetry.instrumentation.system_metrics",
+    "opentelemetry.sdk.trace",
+    "basingse.opentelemetry.settings",
+]
+
+
+def probe() -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, check=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_is_lazy() -> None:
+    # Run twice so that the timing isn't dominated by compiling bytecode.
+    probe()
+    result = probe()
+
+    imported = set(result["modules"]).intersection(LAZY_MODULES)
+    assert not imported, f"Expected lazy imports, found {imported}"
+    assert result["elapsed"] < IMPORT_BUDGET
@@ -1,9 +1,19 @@
+import time
+
 import pytest
+from flask import Flask
 from jinja2 import Undefined
+from markdown_it import MarkdownIt
 from markupsafe import Markup
 
+from basingse import svcs
+from basingse.markdown import fingerprint
+from basingse.markdown import get_markdown
+from basingse.markdown import Markdown
+from basingse.markdown import MarkdownOptions
 from basingse.markdown import md
 from basingse.markdown import render
+from basingse.markdown import RenderCache
 
 
 @pytest.mark.parametrize(
@@ -24,3 +34,86 @@ def test_markdown(source: str, expected: str) -> None:
 def test_render_filter() -> None:
     assert render(None) == Undefined()
     assert render("Hello World") == Markup("<p>Hello World</p>\n")
+
+
+def test_render_cache() -> None:
+    renderer = Markdown(cache_size=2)
+
+    assert renderer.render("# One") == "<h1>One</h1>\n"
+    assert renderer.render("# One") == "<h1>One</h1>\n"
+    assert (renderer.cache.stats.hits, renderer.cache.stats.misses) == (1, 1)
+
+    renderer.render("# Two")
+    renderer.render("# One")
+    renderer.render("# Three")
+    assert len(renderer.cache) == 2
+    assert renderer.cache.stats.evictions == 1
+
+    # "# Two" was the least recently used, so it was evicted
+    renderer.render("# Two")
+    assert renderer.cache.stats.misses == 4
+
+
+def test_render_cache_disabled() -> None:
+    renderer = Markdown(cache_size=0)
+    renderer.render("Hello")
+    renderer.render("Hello")
+    assert len(renderer.cache) == 0
+    assert renderer.cache.stats.misses == 2
+
+
+def test_render_cache_key() -> None:
+    assert RenderCache(1, fingerprint(md)).key("text") == RenderCache(1, fingerprint(md)).key("text")
+    assert RenderCache(1, fingerprint(md)).key("text") != RenderCache(1, fingerprint(md)).key("other")
+    assert fingerprint(md) != fingerprint(MarkdownIt())
+
+
+def test_render_in_pool() -> None:
+    renderer = Markdown(pool_threshold=10, workers=1, timeout=30)
+    try:
+        assert renderer.render("> A long blockquote") == md.render("> A long blockquote")
+        assert renderer._pool is not None
+    finally:
+        renderer.shutdown()
+    assert renderer._pool is None
+
+
+def test_render_timeout() -> None:
+    renderer = Markdown(pool_threshold=0, workers=1, timeout=0)
+    try:
+        workers = list(renderer.pool()._pool)  # type: ignore[attr-defined]
+        assert workers and all(worker.is_alive() for worker in workers)
+        assert renderer.render("<b>bold</b>") == "<pre>&lt;b&gt;bold&lt;/b&gt;</pre>"
+        assert renderer.cache.stats.timeouts == 1
+        assert len(renderer.cache) == 0
+        assert renderer._pool is None, "The pool with the stuck worker is replaced"
+        assert not any(worker.is_alive() for worker in workers), "The stuck worker is terminated"
+
+        # Shown as text straight away, without tying up another worker
+        assert renderer.render("<b>bold</b>") == "<pre>&lt;b&gt;bold&lt;/b&gt;</pre>"
+        assert renderer.cache.stats.timeouts == 1
+        assert renderer._pool is None
+    finally:
+        renderer.shutdown()
+
+
+def test_render_timeout_expires() -> None:
+    renderer = Markdown(pool_threshold=0, workers=1, timeout=30, retry_after=60)
+    key = renderer.cache.key("Hello")
+    renderer._timeouts[key] = time.monotonic() - 1
+    try:
+        assert not renderer.timed_out(key)
+        assert renderer.render("Hello") == "<p>Hello</p>\n"
+    finally:
+        renderer.shutdown()
+
+
+def test_render_with_app_options() -> None:
+    app = Flask(__name__)
+    svcs.init_app(app)
+    MarkdownOptions(cache_size=8).init_app(app)
+
+    with app.app_context():
+        assert get_markdown().cache.size == 8
+        assert render("Hello World") == Markup("<p>Hello World</p>\n")
+        assert get_markdown().cache.stats.misses == 1
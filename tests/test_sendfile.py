@@ -0,0 +1,68 @@
+import io
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_attachments import Attachment
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.assets import AssetManifest
+from basingse.assets import Assets
+from basingse.attachments.ingest import ingest
+from basingse.sendfile import SendfileSettings
+
+
+def test_sendfile_header(tmp_path: Path) -> None:
+    path = tmp_path / "files" / "a.txt"
+
+    assert SendfileSettings(mode="x-sendfile").header(path) == ("X-Sendfile", str(path))
+
+    accel = SendfileSettings(mode="x-accel-redirect", locations={str(tmp_path / "files"): "/_files/"})
+    assert accel.header(path) == ("X-Accel-Redirect", "/_files/a.txt")
+    assert accel.header(tmp_path / "other.txt") is None, "Files outside of a location aren't offloaded"
+
+    assert SendfileSettings().header(path) is None
+
+
+def test_sendfile_invalid_mode(app: Flask) -> None:
+    with pytest.raises(ValueError):
+        SendfileSettings(mode="x-magic").init_app(app)
+
+
+def test_offload_attachment(app: Flask, client: FlaskClient) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        attachment = ingest(Attachment(filename="data.txt"), io.BytesIO(b"hello world"))
+        session.add(attachment)
+        session.commit()
+        id, directory = attachment.id, attachment.cached_filepath.parent
+        filename = attachment.cached_filepath.name
+
+    SendfileSettings(mode="x-accel-redirect", locations={str(directory): "/_attachments"}).init_app(app)
+
+    response = client.get(f"/attachments/download/{id}/")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Accel-Redirect"] == f"/_attachments/{filename}"
+    assert response.headers["Content-Length"] == str(len(b"hello world"))
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert "data.txt" in response.headers["Content-Disposition"]
+
+
+def test_offload_asset(app: Flask, client: FlaskClient, tmp_path: Path) -> None:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "main.abcdef0123456789abcd.js").write_text("console.log('hello');")
+    (tmp_path / "assets" / "manifest.json").write_text('{"main.js": "main.abcdef0123456789abcd.js"}')
+    SendfileSettings(mode="x-sendfile").init_app(app)
+
+    with app.app_context():
+        assets = svcs.get(Assets)
+        assets.add(AssetManifest(location=tmp_path))
+        url = assets.url("main.js")
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Sendfile"] == str((tmp_path / "assets" / "main.abcdef0123456789abcd.js").resolve())
@@ -0,0 +1,131 @@
+import datetime as dt
+import xml.etree.ElementTree as ET
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from basingse import svcs
+from basingse.page.models import Page
+from basingse.publish.sitemap import get_sitemap
+from basingse.publish.sitemap import SitemapSettings
+
+NS = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9", "atom": "http://www.w3.org/2005/Atom"}
+
+
+def add_pages(app: Flask, count: int) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        for index in range(count):
+            page = Page(title=f"Page {index}", slug=f"page-{index}", contents='{"blocks": []}')
+            page.publish()
+            session.add(page)
+        session.commit()
+
+
+def locations(client: FlaskClient, url: str) -> list[str]:
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == "application/xml"
+    return [loc.text or "" for loc in ET.fromstring(response.data).iterfind(".//sm:loc", NS)]
+
+
+def test_sitemap(app: Flask, client: FlaskClient) -> None:
+    add_pages(app, 3)
+    with app.app_context():
+        session = svcs.get(Session)
+        session.add(Page(title="Draft", slug="draft", contents='{"blocks": []}'))
+        session.commit()
+
+    urls = locations(client, "/sitemap.xml")
+    assert sorted(urls) == [f"http://basingse.test/page/page-{index}/" for index in range(3)]
+
+
+def test_sitemap_cache(app: Flask, client: FlaskClient) -> None:
+    add_pages(app, 2)
+
+    response = client.get("/sitemap.xml")
+    etag = response.headers["ETag"]
+    assert client.get("/sitemap.xml", headers={"If-None-Match": etag}).status_code == 304
+    assert len(get_sitemap(app).documents) == 1, "The document was cached while it was streamed"
+
+    with app.app_context():
+        session = svcs.get(Session)
+        page = session.scalars(select(Page).where(Page.slug == "page-0")).one()
+        page.unpublish()
+        session.commit()
+
+    response = client.get("/sitemap.xml", headers={"If-None-Match": etag})
+    assert response.status_code == 200, "Unpublishing invalidates the cache"
+    assert [loc.text for loc in ET.fromstring(response.data).iterfind(".//sm:loc", NS)] == [
+        "http://basingse.test/page/page-1/"
+    ]
+
+
+def test_sitemap_cache_is_bounded(app: Flask, client: FlaskClient) -> None:
+    add_pages(app, 1)
+    get_sitemap(app).cache_size = 2
+
+    for host in ("one.test", "two.test", "three.test"):
+        assert client.get("/sitemap.xml", base_url=f"http://{host}").status_code == 200
+    assert list(get_sitemap(app).documents) == ["http://two.test/sitemap", "http://three.test/sitemap"]
+
+
+def test_sitemap_scheduled(app: Flask, client: FlaskClient) -> None:
+    with app.app_context():
+        session = svcs.get(Session)
+        page = Page(title="Soon", slug="soon", contents='{"blocks": []}')
+        page.schedule(dt.datetime.now(dt.UTC) + dt.timedelta(hours=1))
+        session.add(page)
+        session.commit()
+
+    assert locations(client, "/sitemap.xml") == []
+
+    with app.app_context():
+        session = svcs.get(Session)
+        # Simulate time passing, without going through the ORM
+        session.execute(
+            update(Page)
+            .values(published_at=dt.datetime.now(dt.UTC).replace(tzinfo=None) - dt.timedelta(hours=1))
+            .execution_options(include_unpublished=True)
+        )
+        session.commit()
+
+    assert locations(client, "/sitemap.xml") == ["http://basingse.test/page/soon/"]
+
+
+def test_sitemap_index(app: Flask, client: FlaskClient) -> None:
+    app.extensions["basingse.sitemap.settings"] = SitemapSettings(max_urls=2)
+    add_pages(app, 5)
+
+    sitemaps = locations(client, "/sitemap.xml")
+    assert sitemaps == [f"http://basingse.test/sitemap-{page}.xml" for page in (1, 2, 3)]
+
+    urls = [url for page in (1, 2, 3) for url in locations(client, f"/sitemap-{page}.xml")]
+    assert sorted(urls) == [f"http://basingse.test/page/page-{index}/" for index in range(5)]
+
+    assert client.get("/sitemap-4.xml").status_code == 404
+    assert client.get("/sitemap-0.xml").status_code == 404
+
+
+def test_sitemap_settings(app: Flask) -> None:
+    with pytest.raises(ValueError):
+        SitemapSettings(max_urls=50_001).init_app(app)
+
+
+def test_feed(app: Flask, client: FlaskClient) -> None:
+    app.extensions["basingse.sitemap.settings"] = SitemapSettings(feed_size=2, feed_title="News")
+    add_pages(app, 3)
+
+    response = client.get("/feed.xml")
+    assert response.status_code == 200
+    assert response.mimetype == "application/atom+xml"
+
+    feed = ET.fromstring(response.data)
+    assert feed.findtext("atom:title", namespaces=NS) == "News"
+    entries = feed.findall("atom:entry", NS)
+    assert len(entries) == 2
+    assert all((entry.findtext("atom:title", namespaces=NS) or "").startswith("Page ") for entry in entries)
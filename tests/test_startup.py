@@ -0,0 +1,97 @@
+import time
+
+import pytest
+from flask import Flask
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from basingse import startup
+from basingse.autoimport import AutoImportModuleRecord
+from basingse.autoimport import AutoImportRecord
+from basingse.settings import BaSingSe
+from basingse.settings import Context
+from basingse.startup import emit_span
+from basingse.startup import get_startup_record
+from basingse.startup import StartupRecord
+
+
+def test_startup_record(app: Flask) -> None:
+    record = get_startup_record(app)
+    assert record is not None
+
+    names = [extension.name for extension in record.extensions]
+    assert "sqlalchemy" in names
+    assert "autoimport" not in names, "autoimport is disabled for tests"
+    assert record.duration >= sum(extension.duration for extension in record.extensions)
+
+
+def test_startup_record_import_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    def slow() -> Context:
+        time.sleep(0.01)
+        return Context()
+
+    monkeypatch.setitem(BaSingSe.EXTENSIONS, "slow", slow)
+    basingse = BaSingSe().enable("slow")
+
+    app = Flask(__name__)
+    basingse.init_app(app)
+    record = get_startup_record(app)
+    assert record is not None
+
+    (timing,) = record.extensions
+    assert timing.name == "slow"
+    assert timing.import_time >= 0.01
+    assert timing.total == timing.import_time + timing.duration
+
+
+def test_startup_report(app: Flask) -> None:
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["basingse", "startup-report"])
+    assert result.exit_code == 0, result.output
+    assert "init_app" in result.output
+    assert "sqlalchemy" in result.output
+
+
+def test_startup_span(monkeypatch: pytest.MonkeyPatch) -> None:
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(startup, "tracer", provider.get_tracer(__name__))
+
+    app = Flask(__name__)
+    record = StartupRecord()
+    with record.timing("core"):
+        pass
+    with record.timing("autoimport"):
+        app.extensions["autoimport"] = AutoImportRecord(
+            "myapp",
+            set(),
+            [
+                AutoImportModuleRecord("myapp.views", skipped=False, initialized=True, import_time=0.1, init_time=0.1),
+                AutoImportModuleRecord("myapp.tests", skipped=True, initialized=False),
+            ],
+            duration=0.2,
+            started_at=record.started_at,
+        )
+    record.duration = 0.5
+
+    emit_span(app, record)
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {"basingse.init_app", "init core", "init autoimport", "import myapp.views"}
+
+    root = spans["basingse.init_app"]
+    assert root.end_time is not None and root.start_time is not None
+    assert root.end_time - root.start_time == 500_000_000
+
+    for name in ("init core", "init autoimport"):
+        parent = spans[name].parent
+        assert (
+            parent is not None and parent.span_id == root.get_span_context().span_id
+        ), f"{name} is a child of the root"
+
+    views = spans["import myapp.views"]
+    assert views.parent is not None and views.parent.span_id == spans["init autoimport"].get_span_context().span_id
+    assert views.start_time == record.started_at, "Modules start when the auto import started"
+    assert views.end_time == record.started_at + 200_000_000
+    assert views.attributes is not None and views.attributes["import_time"] == 0.1
@@ -0,0 +1,189 @@
+import concurrent.futures
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from flask import current_app
+from flask import Flask
+
+from basingse import svcs
+from basingse.tasks import DurableTaskExecutor
+from basingse.tasks import InlineTaskExecutor
+from basingse.tasks import PoolTaskExecutor
+from basingse.tasks import Task
+from basingse.tasks import TaskExecutor
+from basingse.tasks import TaskSettings
+from basingse.tasks import TaskStatus
+
+CALLS: dict[str, int] = {}
+
+
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def flaky(key: str, failures: int) -> str:
+    CALLS[key] = CALLS.get(key, 0) + 1
+    if CALLS[key] <= failures:
+        raise RuntimeError(f"failure {CALLS[key]}")
+    return current_app.name
+
+
+def wait(executor: TaskExecutor, task: Task, timeout: float = 10.0) -> Task:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        current = executor.get(task.id)
+        assert current is not None
+        if current.status in (TaskStatus.SUCCEEDED, TaskStatus.FAILED):
+            return current
+        time.sleep(0.01)
+    raise AssertionError(f"Task {task.name} did not finish")
+
+
+def test_inline_executor() -> None:
+    executor = InlineTaskExecutor()
+
+    task = executor.submit(add, 1, b=2)
+    assert task.status == TaskStatus.SUCCEEDED
+    assert task.result == 3
+    assert task.name == "tests.test_tasks:add"
+    assert executor.get(task.id) is task
+
+
+def test_inline_executor_retries(app: Flask) -> None:
+    executor = InlineTaskExecutor()
+
+    with app.app_context():
+        task = executor.submit(flaky, "inline-retry", 2, retries=2)
+    assert task.status == TaskStatus.SUCCEEDED
+    assert task.attempts == 3
+
+    with app.app_context():
+        task = executor.submit(flaky, "inline-fail", 5, retries=1)
+    assert task.status == TaskStatus.FAILED
+    assert task.attempts == 2
+    assert task.error is not None and "failure 2" in task.error
+    assert task.finished is not None
+
+
+def test_inline_executor_backoff(app: Flask, monkeypatch: pytest.MonkeyPatch) -> None:
+    sleeps: list[float] = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    executor = InlineTaskExecutor(backoff=0.5)
+
+    with app.app_context():
+        task = executor.submit(flaky, "inline-backoff", 3, retries=3)
+    assert task.status == TaskStatus.SUCCEEDED
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_task_executor_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        TaskExecutor()  # type: ignore[abstract]
+
+
+def test_thread_executor(app: Flask) -> None:
+    executor = PoolTaskExecutor(concurrent.futures.ThreadPoolExecutor(2), app=app)
+    try:
+        task = wait(executor, executor.submit(flaky, "thread", 1, retries=1))
+        assert task.status == TaskStatus.SUCCEEDED
+        assert task.result == app.name, "Tasks run in an application context"
+        assert task.attempts == 2
+
+        task = wait(executor, executor.submit(flaky, "thread-fail", 5))
+        assert task.status == TaskStatus.FAILED
+        assert task.attempts == 1
+    finally:
+        executor.shutdown()
+
+
+def test_durable_executor(app: Flask, tmp_path: Path) -> None:
+    executor = DurableTaskExecutor(tmp_path / "tasks.sqlite3", app, poll_interval=0.01)
+    try:
+        task = wait(executor, executor.submit(flaky, "durable", 1, retries=1))
+        assert task.status == TaskStatus.SUCCEEDED
+        assert task.attempts == 2
+
+        task = wait(executor, executor.submit("tests.test_tasks:add", 1, 2))
+        assert task.status == TaskStatus.SUCCEEDED
+
+        task = wait(executor, executor.submit("tests.test_tasks:missing"))
+        assert task.status == TaskStatus.FAILED
+        assert task.error is not None and "ImportString" in task.error
+    finally:
+        executor.shutdown()
+
+
+def test_durable_executor_backoff(app: Flask, tmp_path: Path) -> None:
+    executor = DurableTaskExecutor(tmp_path / "tasks.sqlite3", app, poll_interval=0.01, backoff=60)
+    try:
+        task = executor.submit(flaky, "durable-backoff", 1, retries=1)
+        deadline = time.monotonic() + 10
+        while (current := executor.get(task.id)) is not None and current.attempts == 0:
+            assert time.monotonic() < deadline, "Task was not attempted"
+            time.sleep(0.01)
+
+        time.sleep(0.1)
+        current = executor.get(task.id)
+        assert current is not None
+        assert current.status == TaskStatus.PENDING, "Retry waits for the backoff"
+        assert current.attempts == 1
+        run_after = executor._connection().execute("SELECT run_after FROM task WHERE id = ?", (task.id,)).fetchone()
+        assert run_after[0] > time.time() + 50
+    finally:
+        executor.shutdown()
+
+
+def test_durable_executor_connection_per_process(app: Flask, tmp_path: Path) -> None:
+    executor = DurableTaskExecutor(tmp_path / "tasks.sqlite3", app)
+    assert not hasattr(executor._local, "connection"), "Connections are opened lazily"
+
+    connection = executor._connection()
+    assert executor._connection() is connection
+
+    # As if this thread had been copied into a forked process
+    executor._local.pid = -1
+    assert executor._connection() is not connection
+
+
+def test_durable_executor_recovers_running_tasks(app: Flask, tmp_path: Path) -> None:
+    path = tmp_path / "tasks.sqlite3"
+    executor = DurableTaskExecutor(path, app)
+    executor.shutdown()
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "INSERT INTO task (id, name, arguments, status, created) VALUES (?, ?, ?, ?, ?)",
+            ("interrupted", "tests.test_tasks:add", '{"args": [1, 2], "kwargs": {}}', "running", time.time()),
+        )
+
+    executor = DurableTaskExecutor(path, app, poll_interval=0.01)
+    try:
+        task = executor.get("interrupted")
+        assert task is not None and task.status == TaskStatus.PENDING
+
+        executor.start()
+        assert wait(executor, task).status == TaskStatus.SUCCEEDED
+    finally:
+        executor.shutdown()
+
+
+def test_task_settings(app: Flask, tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        TaskSettings(backend="celery").executor(app)
+
+    app.instance_path = str(tmp_path)
+    executor = TaskSettings(backend="durable").executor(app)
+    try:
+        assert isinstance(executor, DurableTaskExecutor)
+        assert executor.path == tmp_path / "tasks.sqlite3"
+    finally:
+        executor.shutdown()
+
+
+def test_task_executor_service(app: Flask) -> None:
+    with app.app_context():
+        executor = svcs.get(TaskExecutor)
+        assert isinstance(executor, PoolTaskExecutor)
+        task = wait(executor, executor.submit(add, 2, 3))
+        assert task.result == 5
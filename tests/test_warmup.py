@@ -0,0 +1,46 @@
+import gc
+
+from flask import Flask
+
+from basingse.autoimport import AutoImportModuleRecord
+from basingse.autoimport import AutoImportRecord
+from basingse.models.schema import build_model_form
+from basingse.warmup import warmup
+
+
+def test_warmup(app: Flask) -> None:
+    build_model_form.cache_clear()
+
+    report = warmup(app, freeze=False)
+    assert "user" in report.admins
+    assert "page" in report.admins
+    assert report.manifests >= 1
+    assert report.templates > 0
+    assert report.frozen == 0
+    assert build_model_form.cache_info().currsize >= 2
+
+
+def test_warmup_freeze(app: Flask) -> None:
+    try:
+        report = warmup(app, templates=False)
+        assert report.templates == 0
+        assert report.frozen > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_warmup_cli(app: Flask) -> None:
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["basingse", "warmup", "--no-templates"])
+    assert result.exit_code == 0, result.output
+    assert "Warmed up" in result.output
+
+
+def test_warmup_imports_deferred(app: Flask) -> None:
+    app.extensions["autoimport"] = AutoImportRecord(
+        "basingse",
+        set(),
+        [AutoImportModuleRecord("basingse.htmx", skipped=False, initialized=False, deferred=True)],
+    )
+    report = warmup(app, templates=False, freeze=False)
+    assert report.modules == ["basingse.htmx"]